@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks da calculadora
+Mede cada função da calculadora.py com várias classes de operandos (inteiros
+pequenos e grandes, floats, domínios extremos e caminhos de erro) e as
+transições da máquina de estados do teclado (teclado.py), isoladas e em
+reprodução de teclas, as matrizes pequenas (Python puro) e grandes (NumPy)
+de matrizes.py, as reduções de reducoes.py (soma, produto e produto
+escalar, contra o encadeamento de adicao e multiplicacao) e a interface Streamlit: ``teclar`` e
+``format_display`` (e o motor de formatação por trás dele, inclusive em
+lote). Também mede o tempo de importação de motor.py em um interpretador
+novo (caso "importacao/motor")
+
+As reduções também têm a precisão medida: o erro relativo de cada uma
+contra o resultado exato (em frações) e o limite teórico do método, no
+relatório ("precisao_reducoes") e em uma tabela na saída de erro.
+
+O resultado é um JSON com o tempo por chamada de cada caso (o mínimo de
+várias repetições, a medida mais estável), que pode ser guardado como base
+e comparado com execuções futuras:
+
+    python benchmark_calculadora.py --salvar base.json
+    python benchmark_calculadora.py --comparar base.json --limite 0.10
+
+Na comparação, casos mais lentos que a base além do limite (10% por padrão)
+são marcados como regressão e o programa termina com código 1. Os casos da
+interface só rodam se o Streamlit estiver instalado; o módulo é importado
+em "bare mode", sem servidor, com o histórico em memória.
+"""
+
+import argparse
+import functools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+from decimal import Decimal
+from fractions import Fraction
+
+import calculadora
+import formatacao
+import matrizes
+import reducoes
+import teclado
+
+REPETICOES_PADRAO = 5
+LIMITE_PADRAO = 0.10
+
+
+def _capturando(funcao):
+    """Envolve uma função cujo caso de teste mede o caminho de erro"""
+    def chamar(*args):
+        try:
+            funcao(*args)
+        except ValueError:
+            pass
+    return chamar
+
+
+def casos_calculadora():
+    """Casos de calculadora.py: nome -> (função, argumentos)"""
+    grande = 10 ** 50
+    c = calculadora
+    return {
+        "adicao/int_pequeno": (c.adicao, (2, 3)),
+        "adicao/int_grande": (c.adicao, (grande, grande + 1)),
+        "adicao/float": (c.adicao, (1.5, 2.25)),
+        "subtracao/int_pequeno": (c.subtracao, (7, 3)),
+        "subtracao/int_grande": (c.subtracao, (grande, 3)),
+        "subtracao/float": (c.subtracao, (0.3, 0.1)),
+        "multiplicacao/int_pequeno": (c.multiplicacao, (6, 7)),
+        "multiplicacao/int_grande": (c.multiplicacao, (grande, grande)),
+        "multiplicacao/float": (c.multiplicacao, (1.1, 3.3)),
+        "divisao/int_pequeno": (c.divisao, (10, 4)),
+        "divisao/int_grande": (c.divisao, (grande, 7)),
+        "divisao/float": (c.divisao, (1.0, 3.0)),
+        "divisao/erro_zero": (_capturando(c.divisao), (1, 0)),
+        "potencia/int_pequeno": (c.potencia, (2, 10)),
+        "potencia/int_grande": (c.potencia, (3, 1000)),
+        "potencia/float": (c.potencia, (1.0001, 10000.0)),
+        "potencia/expoente_negativo": (c.potencia, (2, -3)),
+        "raiz_quadrada/int_pequeno": (c.raiz_quadrada, (16,)),
+        "raiz_quadrada/float": (c.raiz_quadrada, (2.0,)),
+        "raiz_quadrada/float_extremo": (c.raiz_quadrada, (1e300,)),
+        "raiz_quadrada/erro_negativo": (_capturando(c.raiz_quadrada), (-1,)),
+        "raiz_n_esima/int_pequeno": (c.raiz_n_esima, (27, 3)),
+        "raiz_n_esima/float": (c.raiz_n_esima, (2.0, 7.5)),
+        "raiz_n_esima/float_indice_inteiro": (c.raiz_n_esima, (2.0, 3)),
+        "raiz_n_esima/negativo_impar": (c.raiz_n_esima, (-2.0, 5)),
+        "raiz_n_esima/int_grande": (c.raiz_n_esima, (grande + 1, 3)),
+        "raiz_n_esima/erro_indice_zero": (_capturando(c.raiz_n_esima), (8, 0)),
+        "resto_divisao/int_pequeno": (c.resto_divisao, (17, 5)),
+        "resto_divisao/int_grande": (c.resto_divisao, (grande + 3, 97)),
+        "resto_divisao/float_negativo": (c.resto_divisao, (-7.5, 2.0)),
+        "divisao_inteira/int_pequeno": (c.divisao_inteira, (17, 5)),
+        "divisao_inteira/int_grande": (c.divisao_inteira, (grande, 97)),
+        "divisao_inteira/float_negativo": (c.divisao_inteira, (-7.5, 2.0)),
+        "fatorial/int_pequeno": (c.fatorial, (10,)),
+        "fatorial/int_grande": (c.fatorial, (1000,)),
+        "fatorial/float_inteiro": (c.fatorial, (20.0,)),
+        "fatorial/erro_negativo": (_capturando(c.fatorial), (-1,)),
+        "logaritmo/base_10": (c.logaritmo, (1000,)),
+        "logaritmo/base_2": (c.logaritmo, (1024, 2)),
+        "logaritmo/float_minusculo": (c.logaritmo, (1e-300,)),
+        "logaritmo/int_grande": (c.logaritmo, (grande,)),
+        "logaritmo/erro_zero": (_capturando(c.logaritmo), (0,)),
+        "seno/angulo_notavel": (c.seno, (30,)),
+        "seno/float": (c.seno, (12.345,)),
+        "seno/angulo_enorme": (c.seno, (1e15,)),
+        "cosseno/angulo_notavel": (c.cosseno, (60,)),
+        "cosseno/float": (c.cosseno, (12.345,)),
+        "tangente/angulo_notavel": (c.tangente, (45,)),
+        "tangente/proximo_de_90": (c.tangente, (89.999999,)),
+    }
+
+
+def casos_formatacao():
+    """Casos do motor de formatação: nome -> (função, argumentos)"""
+    resultados = [(-1) ** i * (i + 1) / 7 * 10.0 ** (i % 25 - 12) for i in range(1000)]
+    return {
+        "formatacao/display_float": (formatacao.formatar_display, (1 / 3,)),
+        "formatacao/lote_auto_1000": (formatacao.formatar_lote, (resultados,)),
+        "formatacao/lote_engenharia_1000": (formatacao.formatar_lote, (resultados, "engenharia")),
+        "formatacao/lote_pt_br_texto_1000": (
+            lambda valores: formatacao.formatar_lote(valores, localidade="pt_BR", separador="\n"),
+            (resultados,),
+        ),
+    }
+
+
+def casos_teclado():
+    """Casos da máquina de estados do teclado: nome -> (função, argumentos)"""
+    def estado(display="0", anterior=None, operacao=None, digitos=0, modo_angulo="DEG"):
+        return teclado.Estado(display, anterior, operacao, digitos=digitos, modo_angulo=modo_angulo)
+
+    decimal = estado("2.25", Decimal("1.5"), "+", digitos=30)
+    # Roteiro de digitação e memória, sem cálculos: mede a própria máquina
+    edicao = ["1", "2", "3", "⌫", "4", ".", "5", "±", "M+", "MR", "C", "MC"] * 1000
+    # Contas completas: cada "=" e cada operador depois do primeiro calcula
+    contas = ["1", "2", "8", "+", "7", ".", "5", "=", "×", "3", "="] * 100
+    return {
+        "teclado/aplicar_digito": (estado("12").aplicar, ("7",)),
+        "teclado/aplicar_adicao_float": (estado("2.25", 1.5, "+").aplicar, ("=",)),
+        "teclado/aplicar_divisao_float": (estado("3", 1.0, "÷").aplicar, ("=",)),
+        "teclado/aplicar_erro_divisao_zero": (estado("0", 1.0, "÷").aplicar, ("=",)),
+        "teclado/aplicar_adicao_decimal_30": (decimal.aplicar, ("=",)),
+        "teclado/aplicar_sin_deg": (estado("30").aplicar, ("sin",)),
+        "teclado/aplicar_sin_rad": (estado("0.5", modo_angulo="RAD").aplicar, ("sin",)),
+        "teclado/aplicar_fatorial_real": (estado("5.5").aplicar, ("n!",)),
+        "teclado/aplicar_ln_erro": (estado("0").aplicar, ("ln",)),
+        "teclado/reproduzir_edicao_12000": (teclado.reproduzir, (edicao,)),
+        "teclado/reproduzir_contas_1100": (teclado.reproduzir, (contas,)),
+    }
+
+
+def casos_matrizes():
+    """Casos de matrizes.py, no caminho puro e no NumPy: nome -> (função, argumentos)"""
+    pequena = [[2.0, 1.0, 0.5], [1.0, 3.0, 0.25], [0.5, 0.25, 4.0]]
+    grande = [[1.0 / (i + j + 1) + (i == j) for j in range(64)] for i in range(64)]
+    return {
+        "matrizes/produto_3x3": (matrizes.produto, (pequena, pequena)),
+        "matrizes/determinante_3x3": (matrizes.determinante, (pequena,)),
+        "matrizes/resolver_3x3": (matrizes.resolver, (pequena, [1.0, 2.0, 3.0])),
+        "matrizes/inversa_3x3": (matrizes.inversa, (pequena,)),
+        "matrizes/elementos_adicao_3x3": (matrizes.adicao, (pequena, pequena)),
+        "matrizes/produto_64x64": (matrizes.produto, (grande, grande)),
+        "matrizes/resolver_64x64": (matrizes.resolver, (grande, [1.0] * 64)),
+    }
+
+
+# Tamanho das sequências das reduções
+ELEMENTOS_REDUCAO = 100_000
+FATORES_PRODUTO = 1000
+
+
+def dados_reducoes():
+    """Sequências mal condicionadas para as reduções, sempre as mesmas
+
+    As parcelas variam 16 ordens de grandeza e se cancelam em grande parte;
+    os fatores ficam perto de 1, mas os produtos parciais da primeira metade
+    passam do maior float.
+    """
+    gerador = random.Random(2024)
+    parcelas = [gerador.gauss(0, 1) * 10.0 ** gerador.randint(-8, 8) for _ in range(ELEMENTOS_REDUCAO)]
+    outros = [gerador.gauss(0, 1) for _ in range(ELEMENTOS_REDUCAO)]
+    fatores = ([gerador.uniform(1e3, 1e4) for _ in range(FATORES_PRODUTO // 2)]
+               + [gerador.uniform(1e-4, 1e-3) for _ in range(FATORES_PRODUTO // 2)])
+    return parcelas, outros, fatores
+
+
+def _cadeia_adicao(valores):
+    return functools.reduce(calculadora.adicao, valores)
+
+
+def _cadeia_multiplicacao(valores):
+    return functools.reduce(calculadora.multiplicacao, valores)
+
+
+def _cadeia_produto_escalar(a, b):
+    return functools.reduce(calculadora.adicao, map(calculadora.multiplicacao, a, b))
+
+
+def casos_reducoes():
+    """Casos de reducoes.py e do encadeamento das operações binárias: nome -> (função, argumentos)"""
+    parcelas, outros, fatores = dados_reducoes()
+    n, m = ELEMENTOS_REDUCAO, FATORES_PRODUTO
+    casos = {
+        f"reducoes/cadeia_adicao_{n}": (_cadeia_adicao, (parcelas,)),
+        f"reducoes/soma_exata_{n}": (reducoes.soma, (parcelas,)),
+        f"reducoes/soma_pareada_{n}": (reducoes.soma, (parcelas, "pareada")),
+        f"reducoes/cadeia_multiplicacao_{m}": (_cadeia_multiplicacao, (fatores,)),
+        f"reducoes/produto_{m}": (reducoes.produto, (fatores,)),
+        f"reducoes/cadeia_produto_escalar_{n}": (_cadeia_produto_escalar, (parcelas, outros)),
+        f"reducoes/produto_escalar_{n}": (reducoes.produto_escalar, (parcelas, outros)),
+    }
+    try:
+        import numpy as np
+    except ImportError:
+        return casos
+    casos[f"reducoes/soma_exata_array_{n}"] = (reducoes.soma, (np.array(parcelas),))
+    casos[f"reducoes/soma_pareada_array_{n}"] = (reducoes.soma, (np.array(parcelas), "pareada"))
+    return casos
+
+
+def precisao_reducoes():
+    """Erro relativo de cada redução contra o valor exato, e o limite teórico
+
+    O limite é o pior caso da análise de erro (ε = 2^-53): n·ε·Σ|x|/|Σx|
+    para a soma encadeada, (128 + log₂ n)·ε·Σ|x|/|Σx| para a pareada,
+    ε/2 para a exata e n·ε para os produtos.
+    """
+    parcelas, outros, fatores = dados_reducoes()
+    epsilon = 2.0 ** -53
+    n = len(parcelas)
+
+    def erro(valor, exato):
+        return abs(float(Fraction(valor) - exato) / exato) if math.isfinite(valor) else math.inf
+
+    soma = sum(map(Fraction, parcelas))
+    condicao_soma = math.fsum(map(abs, parcelas)) / abs(float(soma))
+    escalar = sum(Fraction(x) * Fraction(y) for x, y in zip(parcelas, outros))
+    condicao_escalar = math.fsum(abs(x * y) for x, y in zip(parcelas, outros)) / abs(float(escalar))
+    produto = math.prod(map(Fraction, fatores))
+    medidas = {
+        "cadeia_adicao": (_cadeia_adicao(parcelas), soma, n * epsilon * condicao_soma),
+        "soma_exata": (reducoes.soma(parcelas), soma, epsilon / 2),
+        "soma_pareada": (reducoes.soma(parcelas, "pareada"), soma,
+                         (reducoes.BLOCO_PAREADO + math.log2(n)) * epsilon * condicao_soma),
+        "cadeia_multiplicacao": (_cadeia_multiplicacao(fatores), produto, len(fatores) * epsilon),
+        "produto": (reducoes.produto(fatores), produto, len(fatores) * epsilon),
+        "cadeia_produto_escalar": (_cadeia_produto_escalar(parcelas, outros), escalar,
+                                   n * epsilon * condicao_escalar),
+        "produto_escalar": (reducoes.produto_escalar(parcelas, outros), escalar,
+                            epsilon / 2 * (condicao_escalar + 1)),
+    }
+    return {nome: {"erro_relativo": erro(valor, exato), "limite": limite}
+            for nome, (valor, exato, limite) in medidas.items()}
+
+
+def importar_streamlit():
+    """Importa a interface Streamlit em bare mode; devolve None se indisponível"""
+    # O histórico da interface fica em memória durante o benchmark
+    os.environ["CALCULADORA_HISTORICO"] = ":memory:"
+    try:
+        import streamlit
+        import streamlit.logger
+    except ImportError:
+        return None
+    # Fora de "streamlit run" cada acesso ao estado da sessão emite um aviso;
+    # importar o app restaura o nível de log, então ele é ajustado depois
+    logging.disable(logging.WARNING)
+    try:
+        import calculadora_streamlit
+    finally:
+        logging.disable(logging.NOTSET)
+    streamlit.logger.set_log_level(logging.ERROR)
+    return calculadora_streamlit
+
+
+def casos_streamlit(interface):
+    """Casos das funções da interface Streamlit: nome -> (função, argumentos, preparo)
+
+    O preparo ajusta o estado da sessão uma vez, antes da medida: em bare
+    mode cada escrita no estado custa ~10 µs, mais que as próprias funções.
+    """
+    estado = interface.st.session_state
+
+    def preparar(precisao=0, calculadora=None):
+        def ajustar():
+            estado.precisao = precisao
+            estado.calculadora = calculadora or teclado.Estado(digitos=precisao)
+        return ajustar
+
+    def escrever_display(valor):
+        estado.calculadora = teclado.Estado(valor)
+
+    teclar = interface.teclar
+    format_display = interface.format_display
+    return {
+        "estado/escrita": (escrever_display, ("30",), preparar()),
+        # O display para de crescer em 12 dígitos, então cada chamada faz o mesmo trabalho
+        "teclar/digito": (teclar, ("7",), preparar()),
+        # A tecla grava no estado o seu resultado, e as seguintes partem dele (ver "estado/")
+        "teclar/sin_deg": (teclar, ("sin",), preparar(calculadora=teclado.Estado("30"))),
+        "teclar/raiz_quadrada": (teclar, ("√",), preparar(calculadora=teclado.Estado("2"))),
+        "format_display/float_curto": (format_display, (2.5,), preparar()),
+        "format_display/float_longo": (format_display, (1 / 3,), preparar()),
+        "format_display/float_grande": (format_display, (1.2345678901234e20,), preparar()),
+        "format_display/float_minusculo": (format_display, (1e-12,), preparar()),
+        "format_display/infinito": (format_display, (float("inf"),), preparar()),
+        "format_display/int": (format_display, (120,), preparar()),
+        "format_display/decimal_30": (format_display, (Decimal(1) / Decimal(7),), preparar(30)),
+    }
+
+
+def medir_caso(funcao, args, repeticoes=REPETICOES_PADRAO):
+    """Mede um caso e devolve os tempos por chamada, em nanossegundos"""
+    timer = timeit.Timer("funcao(*args)", globals={"funcao": funcao, "args": args})
+    # autorange escolhe quantas chamadas somam ao menos 0,2 s
+    numero, _ = timer.autorange()
+    tempos = [total / numero * 1e9 for total in timer.repeat(repeticoes, numero)]
+    return {
+        "ns_por_chamada": min(tempos),
+        "mediana_ns": statistics.median(tempos),
+        "chamadas": numero,
+        "repeticoes": repeticoes,
+    }
+
+
+# Módulos cuja importação é medida: nome do caso -> módulo
+IMPORTACOES = {"importacao/motor": "motor"}
+
+_MEDIR_IMPORTACAO = (
+    "import time; inicio = time.perf_counter_ns(); import {}; "
+    "print(time.perf_counter_ns() - inicio)"
+)
+
+
+def medir_importacao(modulo, repeticoes=REPETICOES_PADRAO):
+    """Mede a importação de um módulo em interpretadores novos, em nanossegundos"""
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    tempos = [
+        int(subprocess.run([sys.executable, "-c", _MEDIR_IMPORTACAO.format(modulo)], cwd=diretorio,
+                           capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeticoes)
+    ]
+    return {
+        "ns_por_chamada": min(tempos),
+        "mediana_ns": statistics.median(tempos),
+        "chamadas": 1,
+        "repeticoes": repeticoes,
+    }
+
+
+def ambiente():
+    """Descreve onde o benchmark rodou, para dar contexto à comparação"""
+    return {
+        "python": platform.python_version(),
+        "implementacao": platform.python_implementation(),
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+    }
+
+
+def executar(filtro=None, repeticoes=REPETICOES_PADRAO, incluir_streamlit=True, progresso=None):
+    """Executa os casos (os que contêm ``filtro`` no nome) e devolve o relatório"""
+    casos = casos_calculadora()
+    casos.update(casos_formatacao())
+    casos.update(casos_teclado())
+    casos.update(casos_matrizes())
+    casos.update(casos_reducoes())
+    if incluir_streamlit:
+        interface = importar_streamlit()
+        if interface is not None:
+            casos.update(casos_streamlit(interface))
+    resultados = {}
+    for nome, (funcao, args, *preparo) in casos.items():
+        if filtro and filtro not in nome:
+            continue
+        for preparar in preparo:
+            preparar()
+        resultados[nome] = medir_caso(funcao, args, repeticoes)
+        if progresso is not None:
+            progresso(nome, resultados[nome])
+    for nome, modulo in IMPORTACOES.items():
+        if filtro and filtro not in nome:
+            continue
+        resultados[nome] = medir_importacao(modulo, repeticoes)
+        if progresso is not None:
+            progresso(nome, resultados[nome])
+    relatorio = {"ambiente": ambiente(), "resultados": resultados}
+    if any(nome.startswith("reducoes/") for nome in resultados):
+        relatorio["precisao_reducoes"] = precisao_reducoes()
+    return relatorio
+
+
+def comparar(atual, base, limite=LIMITE_PADRAO):
+    """Compara dois relatórios; devolve a lista de (nome, base, atual, razão, regressão)"""
+    linhas = []
+    for nome, medida in atual["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            continue
+        razao = medida["ns_por_chamada"] / anterior["ns_por_chamada"]
+        linhas.append((nome, anterior["ns_por_chamada"], medida["ns_por_chamada"], razao, razao > 1 + limite))
+    return linhas
+
+
+def main(argv=None):
+    """Interpreta a linha de comando e executa o benchmark"""
+    parser = argparse.ArgumentParser(description="Microbenchmarks das operações da calculadora")
+    parser.add_argument("-k", "--filtro", help="executa só os casos cujo nome contém este texto")
+    parser.add_argument("-r", "--repeticoes", type=int, default=REPETICOES_PADRAO,
+                        help=f"repetições de cada medida (padrão: {REPETICOES_PADRAO})")
+    parser.add_argument("--sem-streamlit", action="store_true", help="não mede as funções da interface")
+    parser.add_argument("--salvar", metavar="ARQUIVO", help="grava o relatório em JSON")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="compara com um relatório salvo antes")
+    parser.add_argument("--limite", type=float, default=LIMITE_PADRAO,
+                        help=f"lentidão tolerada na comparação, como fração (padrão: {LIMITE_PADRAO})")
+    parser.add_argument("--json", action="store_true", help="escreve o relatório em JSON na saída padrão")
+    args = parser.parse_args(argv)
+
+    def progresso(nome, medida):
+        print(f"{nome:<45} {medida['ns_por_chamada']:>12.1f} ns", file=sys.stderr)
+
+    relatorio = executar(args.filtro, args.repeticoes, not args.sem_streamlit,
+                         None if args.json else progresso)
+    if "precisao_reducoes" in relatorio and not args.json:
+        print(f"\n{'redução':<25} {'erro relativo':>14} {'limite':>10}", file=sys.stderr)
+        for nome, medida in relatorio["precisao_reducoes"].items():
+            print(f"{nome:<25} {medida['erro_relativo']:>14.2e} {medida['limite']:>10.2e}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    linhas = comparar(relatorio, base, args.limite)
+    regressoes = [linha for linha in linhas if linha[4]]
+    saida = sys.stderr if args.json else sys.stdout
+    print(f"\n{'caso':<45} {'base (ns)':>12} {'atual (ns)':>12} {'razão':>7}", file=saida)
+    for nome, anterior, atual, razao, regressao in linhas:
+        marca = "  REGRESSÃO" if regressao else ""
+        print(f"{nome:<45} {anterior:>12.1f} {atual:>12.1f} {razao:>7.2f}{marca}", file=saida)
+    if regressoes:
+        print(f"\nErro: {len(regressoes)} casos mais lentos que a base além de {args.limite:.0%}", file=saida)
+        return 1
+    print(f"\nNenhuma regressão acima de {args.limite:.0%}", file=saida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,40 @@ Calculadora Simples em Python
 Suporta todas as operações matemáticas básicas
 """
 
+import importlib
+import itertools
 import math
+import sys
+
+# Resultados inteiros até este tamanho (em bits) levam microssegundos: as
+# operações nem consultam o modelo de custo (custo.py) antes de calcular
+BITS_SEM_VERIFICACAO = 1 << 16
+
+
+class _MotorAdiado:
+    """Módulo importado no primeiro acesso a um atributo
+
+    Os motores (fatoriais, raízes, trigonometria, modelo de custo) só são
+    importados quando uma operação os usa: quem importa o registro de
+    operações ou o motor.py não paga por eles. No primeiro acesso o módulo
+    toma o lugar deste objeto nas globais, então as chamadas seguintes são
+    uma consulta de global comum, sem import.
+    """
+
+    __slots__ = ("_nome",)
+
+    def __init__(self, nome):
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        modulo = globals()[self._nome] = importlib.import_module(self._nome)
+        return getattr(modulo, atributo)
+
+
+custo = _MotorAdiado("custo")
+fatoriais = _MotorAdiado("fatoriais")
+raizes = _MotorAdiado("raizes")
+trigonometria = _MotorAdiado("trigonometria")
 
 
 def adicao(a, b):
@@ -23,79 +56,178 @@ def multiplicacao(a, b):
     return a * b
 
 
-def divisao(a, b):
-    """Realiza a divisão de dois números"""
+def validar_divisor(a, b):
+    """Verifica se o divisor é diferente de zero"""
     if b == 0:
         raise ValueError("Erro: Divisão por zero não é permitida!")
+
+
+def validar_raiz_quadrada(a):
+    """Verifica se o radicando da raiz quadrada não é negativo"""
+    if a < 0:
+        raise ValueError("Erro: Não é possível calcular raiz quadrada de número negativo!")
+
+
+def validar_raiz_n_esima(a, n):
+    """Verifica o radicando e o índice da raiz n-ésima"""
+    if a < 0 and n % 2 == 0:
+        raise ValueError("Erro: Não é possível calcular raiz par de número negativo!")
+    if n == 0:
+        raise ValueError("Erro: Índice da raiz não pode ser zero!")
+    if a < 0 and fatoriais.inteiro_ou_none(n) is None:
+        raise ValueError("Erro: Raiz de número negativo resulta em número complexo!")
+    if a == 0 and n < 0:
+        raise ValueError("Erro: Zero não pode ser elevado a expoente negativo!")
+
+
+def validar_fatorial(n):
+    """Verifica se o fatorial está definido para n"""
+    if n < 0:
+        raise ValueError("Erro: Fatorial não é definido para números negativos!")
+    if fatoriais.inteiro_ou_none(n) is None:
+        raise ValueError("Erro: Fatorial só é definido para números inteiros!")
+
+
+def validar_logaritmo(a, base=10):
+    """Verifica o logaritmando e a base do logaritmo"""
+    if a <= 0:
+        raise ValueError("Erro: Logaritmo só é definido para números positivos!")
+    if base <= 0 or base == 1:
+        raise ValueError("Erro: Base do logaritmo deve ser positiva e diferente de 1!")
+
+
+def divisao(a, b):
+    """Realiza a divisão de dois números"""
+    validar_divisor(a, b)
     return a / b
 
 
 def potencia(a, b):
     """Eleva 'a' à potência de 'b'"""
-    return a ** b
+    if a.__class__ is int and b.__class__ is int and b * a.bit_length() > BITS_SEM_VERIFICACAO:
+        # Recusa antes de calcular inteiros enormes (ex.: 9 ** 9 ** 9)
+        custo.verificar("potencia", a, b)
+    try:
+        return a ** b
+    except ZeroDivisionError:
+        raise ValueError("Erro: Zero não pode ser elevado a expoente negativo!") from None
+    except OverflowError:
+        # Float fora do intervalo: o modelo de custo dá a mensagem com o tamanho
+        custo.verificar("potencia", a, b)
+        # Sobra o expoente inteiro maior que um float com resultado abaixo
+        # do menor float (ex.: 0.5 ** 10 ** 400): zero, com o sinal da potência
+        return a ** (b % 2) * 0.0
+
+
+def validar_potencia_modular(a, b, m):
+    """Verifica os operandos da potência modular"""
+    if m == 0:
+        raise ValueError("Erro: O módulo não pode ser zero!")
+    if b < 0 and math.gcd(int(a), int(m)) != 1:
+        raise ValueError("Erro: A base não tem inverso para este módulo!")
+
+
+def potencia_modular(a, b, m):
+    """Calcula (a ^ b) mod m sem montar a potência inteira"""
+    return custo.modular("potencia", (a, b), m)
 
 
 def raiz_quadrada(a):
     """Calcula a raiz quadrada de um número"""
-    if a < 0:
-        raise ValueError("Erro: Não é possível calcular raiz quadrada de número negativo!")
+    validar_raiz_quadrada(a)
     return math.sqrt(a)
 
 
 def raiz_n_esima(a, n):
-    """Calcula a raiz n-ésima de um número"""
-    if a < 0 and n % 2 == 0:
-        raise ValueError("Erro: Não é possível calcular raiz par de número negativo!")
-    if n == 0:
-        raise ValueError("Erro: Índice da raiz não pode ser zero!")
-    return a ** (1 / n)
+    """Calcula a raiz n-ésima de um número (raiz real para índice ímpar)"""
+    validar_raiz_n_esima(a, n)
+    return raizes.raiz_real(a, n)
 
 
 def resto_divisao(a, b):
     """Calcula o resto da divisão (módulo)"""
-    if b == 0:
-        raise ValueError("Erro: Divisão por zero não é permitida!")
+    validar_divisor(a, b)
     return a % b
 
 
 def divisao_inteira(a, b):
     """Realiza a divisão inteira de dois números"""
-    if b == 0:
-        raise ValueError("Erro: Divisão por zero não é permitida!")
+    validar_divisor(a, b)
     return a // b
 
 
 def fatorial(n):
     """Calcula o fatorial de um número"""
-    if n < 0:
-        raise ValueError("Erro: Fatorial não é definido para números negativos!")
-    if not isinstance(n, int):
-        raise ValueError("Erro: Fatorial só é definido para números inteiros!")
-    return math.factorial(n)
+    validar_fatorial(n)
+    return fatoriais.fatorial_exato(n)
 
 
 def logaritmo(a, base=10):
     """Calcula o logaritmo de um número"""
-    if a <= 0:
-        raise ValueError("Erro: Logaritmo só é definido para números positivos!")
-    if base <= 0 or base == 1:
-        raise ValueError("Erro: Base do logaritmo deve ser positiva e diferente de 1!")
+    validar_logaritmo(a, base)
     return math.log(a, base)
 
 
+# Graus inteiros vêm das tabelas exatas de trigonometria.py (sen(180°) é 0,
+# não 1.2e-16); os demais ângulos vão direto a math. Zero em float fica de
+# fora das tabelas para math preservar o sinal de -0.0
+_ERRO_ANGULO_INFINITO = "Erro: Funções trigonométricas não são definidas para ângulo infinito!"
+
+
 def seno(angulo_graus):
     """Calcula o seno de um ângulo em graus"""
-    return math.sin(math.radians(angulo_graus))
+    if angulo_graus.__class__ is int or (
+            angulo_graus.__class__ is float and angulo_graus.is_integer() and angulo_graus):
+        return trigonometria.TABELAS_VOLTA["DEG"][0][int(angulo_graus % 360)]
+    try:
+        return math.sin(math.radians(angulo_graus))
+    except ValueError:
+        raise ValueError(_ERRO_ANGULO_INFINITO) from None
 
 
 def cosseno(angulo_graus):
     """Calcula o cosseno de um ângulo em graus"""
-    return math.cos(math.radians(angulo_graus))
+    if angulo_graus.__class__ is int or (
+            angulo_graus.__class__ is float and angulo_graus.is_integer() and angulo_graus):
+        return trigonometria.TABELAS_VOLTA["DEG"][1][int(angulo_graus % 360)]
+    try:
+        return math.cos(math.radians(angulo_graus))
+    except ValueError:
+        raise ValueError(_ERRO_ANGULO_INFINITO) from None
 
 
 def tangente(angulo_graus):
     """Calcula a tangente de um ângulo em graus"""
-    return math.tan(math.radians(angulo_graus))
+    if angulo_graus.__class__ is int or (
+            angulo_graus.__class__ is float and angulo_graus.is_integer() and angulo_graus):
+        resultado = trigonometria.TABELAS_VOLTA["DEG"][2][int(angulo_graus % 360)]
+        if resultado is None:
+            raise ValueError(trigonometria.ERRO_TANGENTE)
+        return resultado
+    try:
+        return math.tan(math.radians(angulo_graus))
+    except ValueError:
+        raise ValueError(_ERRO_ANGULO_INFINITO) from None
+
+
+# Opções do menu: número -> (título, nome da operação no registro)
+MENU = {
+    "1": ("Adição (+)", "adicao"),
+    "2": ("Subtração (-)", "subtracao"),
+    "3": ("Multiplicação (*)", "multiplicacao"),
+    "4": ("Divisão (/)", "divisao"),
+    "5": ("Potenciação (^)", "potencia"),
+    "6": ("Raiz Quadrada (√)", "raiz_quadrada"),
+    "7": ("Raiz N-ésima", "raiz_n_esima"),
+    "8": ("Resto da Divisão (Módulo %)", "resto_divisao"),
+    "9": ("Divisão Inteira (//)", "divisao_inteira"),
+    "10": ("Fatorial (!)", "fatorial"),
+    "11": ("Logaritmo", "logaritmo"),
+    "12": ("Seno", "seno"),
+    "13": ("Cosseno", "cosseno"),
+    "14": ("Tangente", "tangente"),
+    "15": ("Potência Modular (a^b mod m)", "potencia_modular"),
+}
 
 
 def exibir_menu():
@@ -103,24 +235,81 @@ def exibir_menu():
     print("\n" + "="*50)
     print("          CALCULADORA SIMPLES")
     print("="*50)
-    print("1.  Adição (+)")
-    print("2.  Subtração (-)")
-    print("3.  Multiplicação (*)")
-    print("4.  Divisão (/)")
-    print("5.  Potenciação (^)")
-    print("6.  Raiz Quadrada (√)")
-    print("7.  Raiz N-ésima")
-    print("8.  Resto da Divisão (Módulo %)")
-    print("9.  Divisão Inteira (//)")
-    print("10. Fatorial (!)")
-    print("11. Logaritmo")
-    print("12. Seno")
-    print("13. Cosseno")
-    print("14. Tangente")
+    for opcao, (titulo, _) in MENU.items():
+        print(f"{opcao + '.':<4}{titulo}")
+    print("H.  Histórico")
+    print("P.  Planilha")
+    print("E.  Estatísticas")
     print("0.  Sair")
     print("="*50)
 
 
+def exibir_historico(armazem, quantidade=10):
+    """Exibe os últimos cálculos guardados no arquivo do histórico"""
+    registros = list(itertools.islice(armazem.buscar(tamanho_pagina=quantidade), quantidade))
+    if not registros:
+        print("\nO histórico está vazio.")
+        return
+    print(f"\nÚltimos {len(registros)} cálculos:")
+    for registro in reversed(registros):
+        print(f"  {registro}")
+
+
+def exibir_celulas(folha, nomes):
+    """Mostra o valor (ou o erro) das células da planilha"""
+    for nome in nomes:
+        celula = folha[nome]
+        print(f"  {nome} = {celula.erro if celula.erro is not None else celula.valor}")
+
+
+def editar_planilha(folha):
+    """Edita a planilha linha a linha, até uma linha vazia"""
+    print("\nPlanilha: 'nome = fórmula' define uma célula (ex.: b = sqrt(a) * 2),")
+    print("'del nome' remove, '?' mostra todas e uma linha vazia volta ao menu.")
+    while True:
+        linha = input("planilha> ").strip()
+        if not linha:
+            return
+        try:
+            if linha == "?":
+                nomes = [celula.nome for celula in folha]
+                if not nomes:
+                    print("  A planilha está vazia.")
+            elif linha.startswith("del "):
+                nome = linha[4:].strip()
+                nomes = folha.remover(nome)
+                print(f"  Célula {nome} removida")
+            else:
+                nomes = folha.executar(linha)
+        except ValueError as e:
+            print(f"  {e}")
+            continue
+        exibir_celulas(folha, nomes)
+
+
+def exibir_estatisticas(resumo):
+    """Mostra contagem, soma, média, variância, extremos e quantis de um resumo"""
+    for nome, valor in resumo.tabela():
+        print(f"  {nome + ':':<15}{valor}")
+
+
+def coletar_estatisticas(resumo):
+    """Lê números linha a linha, até uma linha vazia, e mostra o resumo"""
+    print("\nEstatísticas: digite números separados por espaço ou vírgula,")
+    print("quantas linhas quiser; uma linha vazia mostra o resumo.")
+    import estatisticas
+    for numero in itertools.count(1):
+        linha = input("estatísticas> ").strip()
+        if not linha:
+            break
+        try:
+            # A linha inteira é validada antes de entrar no resumo
+            resumo.atualizar(list(estatisticas.ler_numeros([linha], numero)))
+        except ValueError as e:
+            print(f"  {e}")
+    exibir_estatisticas(resumo)
+
+
 def obter_numero(mensagem="Digite um número: "):
     """Obtém um número válido do usuário"""
     while True:
@@ -139,8 +328,39 @@ def obter_numero_inteiro(mensagem="Digite um número inteiro: "):
             print("Erro: Por favor, digite um número inteiro válido!")
 
 
-def main():
-    """Função principal da calculadora"""
+def obter_operandos(operacao):
+    """Pede ao usuário os operandos de uma operação do registro"""
+    argumentos = []
+    opcionais_desde = operacao.aridade - len(operacao.padroes)
+    for indice, rotulo in enumerate(operacao.rotulos):
+        mensagem = f"Digite {rotulo}: "
+        if indice >= opcionais_desde:
+            valor = input(mensagem).strip()
+            if valor == "":
+                break
+            argumentos.append(float(valor))
+        elif operacao.inteiro:
+            argumentos.append(obter_numero_inteiro(mensagem))
+        else:
+            argumentos.append(obter_numero(mensagem))
+    return argumentos
+
+
+def executar_menu():
+    """Laço interativo do menu da calculadora"""
+    # Importações locais: o registro de operações depende deste módulo, e
+    # quem só usa as operações não precisa carregar o SQLite do histórico
+    import estatisticas
+    import historico
+    import operacoes
+    import planilha
+
+    # Despacho pré-calculado: opção do menu -> operação
+    despacho = {opcao: operacoes.obter(nome) for opcao, (_, nome) in MENU.items()}
+    armazem = historico.ArmazemSQLite(historico.caminho_padrao())
+    calculos = historico.Historico(armazem)
+    folha = planilha.Planilha()
+
     print("Bem-vindo à Calculadora Simples!")
     
     while True:
@@ -152,91 +372,30 @@ def main():
             break
         
         try:
-            if escolha == "1":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = adicao(a, b)
-                print(f"\nResultado: {a} + {b} = {resultado}")
-            
-            elif escolha == "2":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = subtracao(a, b)
-                print(f"\nResultado: {a} - {b} = {resultado}")
-            
-            elif escolha == "3":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = multiplicacao(a, b)
-                print(f"\nResultado: {a} × {b} = {resultado}")
-            
-            elif escolha == "4":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = divisao(a, b)
-                print(f"\nResultado: {a} ÷ {b} = {resultado}")
-            
-            elif escolha == "5":
-                a = obter_numero("Digite a base: ")
-                b = obter_numero("Digite o expoente: ")
-                resultado = potencia(a, b)
-                print(f"\nResultado: {a} ^ {b} = {resultado}")
-            
-            elif escolha == "6":
-                a = obter_numero("Digite o número: ")
-                resultado = raiz_quadrada(a)
-                print(f"\nResultado: √{a} = {resultado}")
-            
-            elif escolha == "7":
-                a = obter_numero("Digite o número: ")
-                n = obter_numero("Digite o índice da raiz: ")
-                resultado = raiz_n_esima(a, n)
-                print(f"\nResultado: {n}√{a} = {resultado}")
-            
-            elif escolha == "8":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = resto_divisao(a, b)
-                print(f"\nResultado: {a} % {b} = {resultado}")
-            
-            elif escolha == "9":
-                a = obter_numero("Digite o primeiro número: ")
-                b = obter_numero("Digite o segundo número: ")
-                resultado = divisao_inteira(a, b)
-                print(f"\nResultado: {a} // {b} = {resultado}")
-            
-            elif escolha == "10":
-                n = obter_numero_inteiro("Digite um número inteiro: ")
-                resultado = fatorial(n)
-                print(f"\nResultado: {n}! = {resultado}")
-            
-            elif escolha == "11":
-                a = obter_numero("Digite o número: ")
-                base = input("Digite a base do logaritmo (Enter para base 10): ").strip()
-                if base == "":
-                    base = 10
-                else:
-                    base = float(base)
-                resultado = logaritmo(a, base)
-                print(f"\nResultado: log_{base}({a}) = {resultado}")
-            
-            elif escolha == "12":
-                angulo = obter_numero("Digite o ângulo em graus: ")
-                resultado = seno(angulo)
-                print(f"\nResultado: sen({angulo}°) = {resultado}")
-            
-            elif escolha == "13":
-                angulo = obter_numero("Digite o ângulo em graus: ")
-                resultado = cosseno(angulo)
-                print(f"\nResultado: cos({angulo}°) = {resultado}")
-            
-            elif escolha == "14":
-                angulo = obter_numero("Digite o ângulo em graus: ")
-                resultado = tangente(angulo)
-                print(f"\nResultado: tan({angulo}°) = {resultado}")
-            
-            else:
+            if escolha.upper() == "H":
+                exibir_historico(armazem)
+                input("\nPressione Enter para continuar...")
+                continue
+            if escolha.upper() == "P":
+                editar_planilha(folha)
+                continue
+            if escolha.upper() == "E":
+                coletar_estatisticas(estatisticas.Resumo())
+                input("\nPressione Enter para continuar...")
+                continue
+            operacao = despacho.get(escolha)
+            if operacao is None:
                 print("\nOpção inválida! Por favor, escolha uma opção do menu.")
+            else:
+                argumentos = obter_operandos(operacao)
+                resultado = operacao(*argumentos)
+                descricao = operacao.descrever(*argumentos)
+                print(f"\nResultado: {descricao} = {historico.texto_resultado(resultado)}")
+                try:
+                    calculos.registrar(operacao.nome, argumentos, resultado, descricao)
+                except Exception as e:
+                    # O resultado já foi exibido; só o histórico fica sem ele
+                    print(f"\nAviso: o cálculo não foi guardado no histórico ({e})")
         
         except ValueError as e:
             print(f"\n{e}")
@@ -246,6 +405,53 @@ def main():
         input("\nPressione Enter para continuar...")
 
 
+def main(argv=None):
+    """Função principal da calculadora"""
+    import argparse
+
+    import estatisticas
+    import metricas
+
+    parser = argparse.ArgumentParser(description="Calculadora Simples")
+    parser.add_argument("--metricas", choices=("prometheus", "json"),
+                        help="conta chamadas, erros e latência das operações e mostra ao sair")
+    parser.add_argument("--perfil", choices=("cprofile", "amostragem"),
+                        help="mede onde o tempo é gasto e mostra o relatório ao sair")
+    parser.add_argument("--estatisticas", metavar="ARQUIVO",
+                        help="resume os números do arquivo ('-' lê a entrada padrão) em uma passada e sai")
+    args = parser.parse_args(argv)
+
+    if args.estatisticas:
+        try:
+            if args.estatisticas == "-":
+                exibir_estatisticas(estatisticas.resumir(estatisticas.ler_numeros(sys.stdin)))
+            else:
+                with open(args.estatisticas, encoding="utf-8") as arquivo:
+                    exibir_estatisticas(estatisticas.resumir(estatisticas.ler_numeros(arquivo)))
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"{e}\n")
+        return
+
+    if args.metricas:
+        metricas.ativar()
+    try:
+        if args.perfil == "cprofile":
+            with metricas.perfil():
+                executar_menu()
+        elif args.perfil == "amostragem":
+            with metricas.Amostrador() as amostrador:
+                try:
+                    executar_menu()
+                finally:
+                    print(amostrador.relatorio(), file=sys.stderr)
+        else:
+            executar_menu()
+    finally:
+        if args.metricas == "json":
+            print(metricas.texto_json(), file=sys.stderr)
+        elif args.metricas:
+            print(metricas.texto_prometheus(), end="", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
-
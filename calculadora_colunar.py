@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Avaliação colunar fora da memória
+Aplica uma operação da calculadora, ou uma fórmula, a colunas guardadas em
+arquivos binários maiores que a RAM, sem carregá-las por inteiro
+
+As colunas são arquivos ``.npy`` ou binários crus de float64 ou int64
+(``dados.bin:int64``; sem o sufixo, float64), abertos por mapeamento de
+memória. O cálculo anda em blocos do tamanho do cache, distribuídos por um
+pool de threads (o NumPy solta o GIL nos laços), com as funções de
+calculadora_vetorial.py: nenhum objeto Python é criado por elemento. O
+resultado é escrito, também por mapeamento, em um ``.npy`` de float64.
+
+    python calculadora_colunar.py -o soma.npy adicao a.npy b.bin:int64
+    python calculadora_colunar.py -o r.npy potencia base.npy 2
+    python calculadora_colunar.py -o f.npy -e "sqrt(x) * 2 + log(y, 2)" x=x.npy y=y.npy
+
+O progresso fica em ``<saída>.progresso``: a cada segundo, os blocos já
+concluídos em sequência são gravados no disco e marcados ali. Se o cálculo
+for interrompido, rodar o mesmo comando de novo retoma do último bloco
+concluído; ao terminar, o arquivo de progresso é apagado.
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+
+import numpy as np
+
+import calculadora_vetorial
+import expressoes
+import operacoes
+
+# Tipos aceitos nos arquivos binários crus
+TIPOS = ("float64", "int64")
+
+# Bytes que os operandos, o resultado e os temporários de um bloco devem
+# ocupar juntos, para o bloco caber no cache L2 de um núcleo
+TAMANHO_CACHE = 1 << 20
+# Temporários de uma operação, em colunas (máscaras de erro, resultado parcial)
+_TEMPORARIOS = 3
+MENOR_BLOCO = 1024
+
+# Intervalo mínimo entre duas gravações do progresso, em segundos
+INTERVALO_PROGRESSO = 1.0
+
+MODOS_ERRO = ("nan", "levantar")
+
+
+@dataclasses.dataclass(frozen=True)
+class Relatorio:
+    """Resumo de uma avaliação: linhas, tempo e vazão
+
+    ``retomadas`` são as linhas que já estavam prontas de uma execução
+    interrompida e não foram recalculadas.
+    """
+
+    linhas: int
+    retomadas: int
+    blocos: int
+    segundos: float
+
+    @property
+    def calculadas(self):
+        """Linhas calculadas nesta execução"""
+        return self.linhas - self.retomadas
+
+    @property
+    def linhas_por_segundo(self):
+        """Vazão desta execução"""
+        return self.calculadas / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        texto = (f"{self.calculadas} linhas em {self.segundos:.2f} s "
+                 f"({self.linhas_por_segundo:,.0f} linhas/s)").replace(",", ".")
+        if self.retomadas:
+            texto += f"; retomado da linha {self.retomadas}"
+        return texto
+
+
+def abrir_coluna(especificacao):
+    """Abre uma coluna por mapeamento de memória, só para leitura
+
+    ``especificacao`` é o caminho de um ``.npy`` ou de um binário cru,
+    opcionalmente com o tipo: ``"dados.bin:int64"``.
+    """
+    caminho, _, tipo = especificacao.rpartition(":")
+    if not caminho or tipo not in TIPOS:
+        caminho, tipo = especificacao, "float64"
+    try:
+        if caminho.endswith(".npy"):
+            coluna = np.load(caminho, mmap_mode="r")
+        else:
+            coluna = np.memmap(caminho, dtype=tipo, mode="r")
+    except OSError as e:
+        raise ValueError(f"Erro: Não foi possível abrir a coluna {caminho!r}: {e.strerror or e}") from None
+    if coluna.ndim != 1:
+        raise ValueError(f"Erro: A coluna {caminho!r} deve ter uma dimensão, tem {coluna.ndim}")
+    if coluna.dtype.kind not in "fiub":
+        raise ValueError(f"Erro: A coluna {caminho!r} não é numérica: {coluna.dtype}")
+    return coluna
+
+
+def _operando(valor):
+    """Coluna aberta, número (repetido em todas as linhas) ou especificação de arquivo"""
+    if isinstance(valor, (np.ndarray, int, float)):
+        return valor
+    try:
+        return float(valor)
+    except ValueError:
+        return abrir_coluna(valor)
+
+
+def linhas_por_bloco(colunas, tamanho_cache=TAMANHO_CACHE):
+    """Linhas de um bloco para que operandos, resultado e temporários caibam no cache"""
+    return max(MENOR_BLOCO, tamanho_cache // (8 * (colunas + 1 + _TEMPORARIOS)))
+
+
+def _preparar_operacao(chave, operandos, erros):
+    operacao = operacoes.obter(chave)
+    funcao = getattr(calculadora_vetorial, operacao.nome, None)
+    if funcao is None:
+        raise ValueError(f"Erro: Operação sem versão vetorizada: {operacao.nome!r}")
+    operacao.verificar_quantidade(len(operandos))
+    return partial(funcao, erros=erros), [_operando(valor) for valor in operandos], operacao.nome
+
+
+def _preparar_formula(texto, colunas, erros):
+    expressao = expressoes.compilar_vetorial(texto, erros=erros)
+    faltando = [nome for nome in expressao.variaveis if nome not in colunas]
+    if faltando:
+        raise ValueError(f"Erro: Coluna não informada para a variável: {', '.join(faltando)}")
+    return expressao.funcao, [_operando(colunas[nome]) for nome in expressao.variaveis], texto
+
+
+def _tamanho(argumentos):
+    tamanhos = {len(valor) for valor in argumentos if isinstance(valor, np.ndarray)}
+    if not tamanhos:
+        raise ValueError("Erro: Informe pelo menos uma coluna em arquivo!")
+    if len(tamanhos) > 1:
+        raise ValueError(f"Erro: As colunas têm tamanhos diferentes: {sorted(tamanhos)}")
+    return tamanhos.pop()
+
+
+def _assinatura(descricao, argumentos, linhas, bloco):
+    """Identifica o cálculo, para só retomar o progresso do mesmo cálculo"""
+    operandos = []
+    for valor in argumentos:
+        if isinstance(valor, np.memmap) and valor.filename:
+            estado = os.stat(valor.filename)
+            operandos.append([valor.filename, estado.st_size, estado.st_mtime_ns])
+        elif isinstance(valor, np.ndarray):
+            operandos.append(["array", len(valor), str(valor.dtype)])
+        else:
+            operandos.append(valor)
+    return {"calculo": descricao, "operandos": operandos, "linhas": linhas, "bloco": bloco}
+
+
+def _ler_progresso(caminho, assinatura):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            progresso = json.load(arquivo)
+    except (OSError, ValueError):
+        return 0
+    if progresso.get("assinatura") != assinatura:
+        # Progresso de outro cálculo: recomeça do zero
+        return 0
+    return progresso.get("concluidas", 0)
+
+
+def _gravar_progresso(caminho, assinatura, concluidas):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({"assinatura": assinatura, "concluidas": concluidas}, arquivo)
+    # Troca atômica: uma interrupção no meio deixa o progresso anterior
+    os.replace(temporario, caminho)
+
+
+def _reabrir_saida(caminho, linhas):
+    """Saída de uma execução interrompida, ou None se ela não serve mais"""
+    try:
+        saida = np.load(caminho, mmap_mode="r+")
+    except (OSError, ValueError):
+        return None
+    return saida if saida.shape == (linhas,) and saida.dtype == np.float64 else None
+
+
+def _calcular_bloco(funcao, argumentos, saida, inicio, fim):
+    fatias = [valor[inicio:fim] if isinstance(valor, np.ndarray) else valor for valor in argumentos]
+    saida[inicio:fim] = funcao(*fatias)
+
+
+def avaliar(saida, operacao=None, operandos=(), formula=None, colunas=None, erros="nan",
+            linhas_bloco=None, threads=None, retomar=True, progresso=None):
+    """Avalia uma operação ou fórmula sobre colunas e grava o resultado em ``saida``
+
+    Com ``operacao`` (nome ou símbolo do registro), ``operandos`` são as
+    colunas (especificações de arquivo ou arrays) ou números, na ordem da
+    operação; com ``formula``, ``colunas`` liga cada variável a uma coluna.
+    ``erros`` é ``"nan"`` (elementos inválidos viram NaN) ou ``"levantar"``.
+    ``progresso``, se dado, é chamado com (linhas concluídas, total) a cada
+    gravação do progresso. Devolve um ``Relatorio``.
+    """
+    if erros not in MODOS_ERRO:
+        raise ValueError(f"Erro: Modo de erros inválido: {erros!r}")
+    if (operacao is None) == (formula is None):
+        raise ValueError("Erro: Informe uma operação ou uma fórmula!")
+    if linhas_bloco is not None and linhas_bloco <= 0:
+        raise ValueError(f"Erro: O bloco deve ter pelo menos uma linha: {linhas_bloco}")
+    if threads is not None and threads <= 0:
+        raise ValueError(f"Erro: O número de threads deve ser positivo: {threads}")
+    if operacao is not None:
+        funcao, argumentos, descricao = _preparar_operacao(operacao, list(operandos), erros)
+    else:
+        funcao, argumentos, descricao = _preparar_formula(formula, colunas or {}, erros)
+    linhas = _tamanho(argumentos)
+    bloco = linhas_bloco or linhas_por_bloco(sum(isinstance(valor, np.ndarray) for valor in argumentos))
+    total_blocos = -(-linhas // bloco)
+
+    caminho_progresso = saida + ".progresso"
+    assinatura = _assinatura(descricao, argumentos, linhas, bloco)
+    retomadas = min(_ler_progresso(caminho_progresso, assinatura), linhas) if retomar else 0
+    destino = _reabrir_saida(saida, linhas) if retomadas else None
+    if destino is None:
+        retomadas = 0
+        destino = np.lib.format.open_memmap(saida, mode="w+", dtype=np.float64, shape=(linhas,))
+        if os.path.exists(caminho_progresso):
+            os.remove(caminho_progresso)
+
+    # ``proximo`` é o primeiro bloco ainda não concluído em sequência; os
+    # blocos terminam fora de ordem, então os concluídos à frente esperam
+    proximo = retomadas // bloco
+    concluidos = set()
+    threads = threads or os.cpu_count() or 1
+    inicio_tempo = time.perf_counter()
+    ultima_gravacao = inicio_tempo
+
+    def marcar():
+        destino.flush()
+        concluidas = min(proximo * bloco, linhas)
+        _gravar_progresso(caminho_progresso, assinatura, concluidas)
+        if progresso is not None:
+            progresso(concluidas, linhas)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pendentes = {}
+        seguinte = proximo
+        try:
+            while proximo < total_blocos:
+                # Poucos blocos em voo por thread: a memória não cresce com o arquivo
+                while seguinte < total_blocos and len(pendentes) < 2 * threads:
+                    inicio = seguinte * bloco
+                    tarefa = pool.submit(_calcular_bloco, funcao, argumentos, destino,
+                                         inicio, min(inicio + bloco, linhas))
+                    pendentes[tarefa] = seguinte
+                    seguinte += 1
+                prontas, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for tarefa in prontas:
+                    indice = pendentes.pop(tarefa)
+                    tarefa.result()
+                    concluidos.add(indice)
+                while proximo in concluidos:
+                    concluidos.discard(proximo)
+                    proximo += 1
+                agora = time.perf_counter()
+                if agora - ultima_gravacao >= INTERVALO_PROGRESSO:
+                    marcar()
+                    ultima_gravacao = agora
+        except BaseException:
+            for tarefa in pendentes:
+                tarefa.cancel()
+            # Guarda o que já foi concluído em sequência, para retomar depois
+            for tarefa in list(pendentes):
+                if not tarefa.cancelled() and tarefa.exception() is None:
+                    concluidos.add(pendentes[tarefa])
+            while proximo in concluidos:
+                proximo += 1
+            marcar()
+            raise
+
+    destino.flush()
+    segundos = time.perf_counter() - inicio_tempo
+    if os.path.exists(caminho_progresso):
+        os.remove(caminho_progresso)
+    if progresso is not None:
+        progresso(linhas, linhas)
+    return Relatorio(linhas, retomadas, total_blocos, segundos)
+
+
+def _inteiro_positivo(texto):
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"não é um número inteiro: {texto!r}") from None
+    if valor <= 0:
+        raise argparse.ArgumentTypeError(f"deve ser positivo: {texto!r}")
+    return valor
+
+
+def _coluna_nomeada(texto):
+    nome, igual, especificacao = texto.partition("=")
+    if not igual or not nome.strip() or not especificacao.strip():
+        raise argparse.ArgumentTypeError(f"use nome=arquivo: {texto!r}")
+    return nome.strip(), especificacao.strip()
+
+
+def main(argv=None):
+    """Ponto de entrada da avaliação colunar"""
+    parser = argparse.ArgumentParser(
+        description="Aplica uma operação ou fórmula a colunas em arquivos maiores que a memória")
+    parser.add_argument("argumentos", nargs="+", metavar="ARG",
+                        help="operação seguida das colunas/números, ou, com --expressao, nome=arquivo")
+    parser.add_argument("-o", "--saida", required=True, help="arquivo .npy de resultados (float64)")
+    parser.add_argument("-e", "--expressao", help="fórmula cujas variáveis são colunas (ex.: \"sqrt(x) * y\")")
+    parser.add_argument("--erros", choices=MODOS_ERRO, default="nan",
+                        help="elementos inválidos viram NaN ou interrompem o cálculo (padrão: nan)")
+    parser.add_argument("-b", "--bloco", type=_inteiro_positivo, metavar="LINHAS",
+                        help="linhas por bloco (padrão: o que cabe no cache)")
+    parser.add_argument("-t", "--threads", type=_inteiro_positivo, help="threads (padrão: um por núcleo)")
+    parser.add_argument("--recomecar", action="store_true",
+                        help="ignora o progresso de uma execução interrompida")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.expressao is not None:
+            colunas = dict(_coluna_nomeada(texto) for texto in args.argumentos)
+            relatorio = avaliar(args.saida, formula=args.expressao, colunas=colunas, erros=args.erros,
+                                linhas_bloco=args.bloco, threads=args.threads, retomar=not args.recomecar)
+        else:
+            relatorio = avaliar(args.saida, operacao=args.argumentos[0], operandos=args.argumentos[1:],
+                                erros=args.erros, linhas_bloco=args.bloco, threads=args.threads,
+                                retomar=not args.recomecar)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(relatorio, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo em lote da calculadora
+Lê operações linha a linha (arquivo ou stdin) e escreve os resultados em
+fluxo, em CSV ou JSONL, sem nenhuma interação com o usuário
+
+Cada linha de entrada tem o nome (ou símbolo) de uma operação do registro
+seguido dos operandos, separados por espaços ou vírgulas:
+
+    divisao 10 4
+    raiz_quadrada,16
+    logaritmo 8 2
+
+Com ``--precisao N`` os operandos são lidos como Decimal e as operações são
+feitas com N dígitos significativos (veja precisao.py).
+
+Linhas vazias e iniciadas por '#' são ignoradas. Erros de uma linha são
+registrados na coluna "erro" da saída e o processamento continua; resultados
+complexos, infinitos ou NaN também são erros da linha. Inteiros enormes
+(fatoriais exatos) são escritos por extenso. A leitura
+e a escrita são feitas em fluxo, então a memória usada não depende do
+tamanho da entrada.
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+
+from decimal import Decimal
+
+import formatacao
+import operacoes
+import precisao
+
+TAMANHO_BUFFER = 1 << 20
+
+
+def converter_operando(texto):
+    """Converte um operando em int quando possível, senão em float"""
+    if texto.lstrip("+-").isdigit():
+        return int(texto)
+    try:
+        return float(texto)
+    except ValueError:
+        raise ValueError(f"Erro: Operando inválido: {texto!r}") from None
+
+
+def converter_operando_decimal(texto):
+    """Converte um operando em Decimal, sem passar por float"""
+    try:
+        return Decimal(texto)
+    except ArithmeticError:
+        raise ValueError(f"Erro: Operando inválido: {texto!r}") from None
+
+
+def verificar_resultado(resultado):
+    """Recusa resultados que não são números reais finitos
+
+    Complexos (ex.: potência de base negativa com expoente fracionário),
+    infinitos e NaN viram ValueError com a mensagem da calculadora.
+    """
+    if isinstance(resultado, complex):
+        raise ValueError("Erro: O resultado é um número complexo!")
+    if isinstance(resultado, float):
+        finito, nan = math.isfinite(resultado), math.isnan(resultado)
+    elif isinstance(resultado, Decimal):
+        finito, nan = resultado.is_finite(), resultado.is_nan()
+    else:
+        return resultado
+    if nan:
+        raise ValueError("Erro: O resultado é indefinido (NaN)!")
+    if not finito:
+        raise ValueError("Erro: Resultado fora do intervalo representável!")
+    return resultado
+
+
+def _serializar(resultado):
+    """Resultado verificado, pronto para CSV ou JSON"""
+    resultado = verificar_resultado(resultado)
+    if isinstance(resultado, Decimal):
+        return str(resultado)
+    if isinstance(resultado, int) and resultado.bit_length() > formatacao.MAIOR_INTEIRO_TEXTO:
+        return formatacao.texto_inteiro(resultado)
+    return resultado
+
+
+def mensagem_erro(e):
+    """Mensagem da calculadora para um erro de cálculo"""
+    if isinstance(e, ZeroDivisionError):
+        return "Erro: Divisão por zero não é permitida!"
+    if isinstance(e, ArithmeticError):
+        return "Erro: Resultado fora do intervalo representável!"
+    return str(e)
+
+
+def processar_linha(linha, contexto=None):
+    """Interpreta e calcula uma linha; devolve (operação, operandos, resultado)
+
+    Com um ``contexto`` decimal a operação é feita no modo de precisão.
+    """
+    partes = linha.replace(",", " ").split()
+    operacao = operacoes.obter(partes[0])
+    operandos = partes[1:]
+    operacao.verificar_quantidade(len(operandos))
+    if contexto is not None:
+        argumentos = [converter_operando_decimal(op) for op in operandos]
+        return operacao.nome, operandos, precisao.executar(operacao.nome, *argumentos, contexto=contexto)
+    argumentos = [converter_operando(op) for op in operandos]
+    return operacao.nome, operandos, operacao(*argumentos)
+
+
+def processar(entrada, saida, formato="csv", contexto=None):
+    """Processa todas as linhas de ``entrada`` escrevendo em ``saida``
+
+    Devolve a quantidade de linhas processadas e de linhas com erro.
+    """
+    if formato == "csv":
+        escritor = csv.writer(saida)
+        escritor.writerow(("linha", "operacao", "operandos", "resultado", "erro"))
+
+        def escrever(numero, nome, operandos, resultado, erro):
+            escritor.writerow((numero, nome, " ".join(operandos), resultado, erro))
+    elif formato == "jsonl":
+        def escrever(numero, nome, operandos, resultado, erro):
+            registro = {"linha": numero, "operacao": nome, "operandos": operandos}
+            if erro:
+                registro["erro"] = erro
+            else:
+                registro["resultado"] = resultado
+            saida.write(json.dumps(registro, ensure_ascii=False, allow_nan=False))
+            saida.write("\n")
+    else:
+        raise ValueError(f"Erro: Formato de saída desconhecido: {formato!r}")
+
+    total = erros = 0
+    for numero, linha in enumerate(entrada, 1):
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        total += 1
+        try:
+            nome, operandos, resultado = processar_linha(linha, contexto)
+            resultado = _serializar(resultado)
+        except (ValueError, ArithmeticError) as e:
+            erros += 1
+            partes = linha.replace(",", " ").split()
+            escrever(numero, partes[0], partes[1:], "", mensagem_erro(e))
+        else:
+            escrever(numero, nome, operandos, resultado, "")
+    return total, erros
+
+
+def main(argv=None):
+    """Ponto de entrada do modo em lote"""
+    parser = argparse.ArgumentParser(description="Calculadora em lote: uma operação por linha")
+    parser.add_argument("entrada", nargs="?", default="-",
+                        help="arquivo de operações (padrão: stdin)")
+    parser.add_argument("-o", "--saida", default="-",
+                        help="arquivo de resultados (padrão: stdout)")
+    parser.add_argument("-f", "--formato", choices=("csv", "jsonl"), default="csv",
+                        help="formato da saída (padrão: csv)")
+    parser.add_argument("-p", "--precisao", type=int, metavar="DIGITOS",
+                        help="calcula em Decimal com esse número de dígitos significativos")
+    args = parser.parse_args(argv)
+    contexto = precisao.criar_contexto(args.precisao) if args.precisao else None
+
+    if args.entrada == "-":
+        entrada = open(sys.stdin.fileno(), encoding="utf-8", buffering=TAMANHO_BUFFER, closefd=False)
+    else:
+        entrada = open(args.entrada, encoding="utf-8", buffering=TAMANHO_BUFFER)
+    if args.saida == "-":
+        saida = open(sys.stdout.fileno(), "w", encoding="utf-8", newline="",
+                     buffering=TAMANHO_BUFFER, closefd=False)
+    else:
+        saida = open(args.saida, "w", encoding="utf-8", newline="", buffering=TAMANHO_BUFFER)
+
+    with entrada, saida:
+        total, erros = processar(entrada, saida, args.formato, contexto)
+    print(f"{total} operações processadas, {erros} com erro", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
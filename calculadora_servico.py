@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serviço HTTP da calculadora
+Expõe as operações do registro em HTTP/JSON para outros sistemas, com
+asyncio e só a biblioteca padrão; tudo roda localmente
+
+Rotas:
+
+- ``POST /calcular``: uma operação
+  ``{"operacao": "divisao", "operandos": [10, 4]}`` ->
+  ``{"operacao": "divisao", "descricao": "10 ÷ 4", "resultado": 2.5}``;
+  com ``"modulo": m`` potências e produtos de inteiros são calculados
+  módulo m
+- ``POST /lote``: milhares de operações numa requisição
+  ``{"operacoes": [{"operacao": "+", "operandos": [1, 2]}, ...]}`` ->
+  ``{"resultados": [...], "sucessos": N, "falhas": M}``; cada item do
+  lote tem seu próprio resultado ou erro
+- ``GET /operacoes``: operações disponíveis e suas aridades
+- ``GET /saude``: verificação de funcionamento
+- ``GET /metricas``: chamadas, erros e latência por operação deste processo
+  (com ``--metricas``; veja metricas.py)
+
+A operação pode ser indicada pelo nome ou pelo símbolo. Com ``"precisao": N``
+os operandos são lidos como Decimal (números ou textos, como "0.1") e o
+cálculo é feito com N dígitos; os resultados Decimal voltam como texto.
+Resultados complexos, infinitos ou NaN são erros de domínio.
+
+Os erros são estruturados e carregam as mensagens da calculadora:
+
+    {"erro": {"codigo": "dominio", "mensagem": "Erro: Divisão por zero não é permitida!"}}
+
+As conexões são persistentes (HTTP/1.1 keep-alive) e aceitam pipelining:
+as requisições enviadas em sequência são respondidas na mesma ordem. Com
+``--workers N`` o serviço roda em N processos que dividem a mesma porta
+(SO_REUSEPORT), um por núcleo.
+
+    python calculadora_servico.py --porta 8080 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+from decimal import Decimal
+from http import HTTPStatus
+
+import custo
+import execucao
+import formatacao
+import metricas
+import operacoes
+import precisao
+from calculadora_lote import converter_operando, converter_operando_decimal, verificar_resultado
+
+PORTA_PADRAO = 8080
+TAMANHO_MAXIMO_CORPO = 16 << 20
+OPERACOES_POR_LOTE = 100_000
+PRECISAO_MAXIMA = 1000
+# Tempo máximo que uma conexão persistente fica ociosa, em segundos
+TEMPO_OCIOSO = 30
+# Itens do lote calculados antes de devolver o controle ao laço de eventos
+FATIA_LOTE = 256
+
+
+class ErroRequisicao(Exception):
+    """Erro que vira uma resposta HTTP com o corpo de erro estruturado"""
+
+    def __init__(self, status, codigo, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+
+def corpo_erro(codigo, mensagem):
+    """Monta o objeto de erro das respostas"""
+    return {"erro": {"codigo": codigo, "mensagem": mensagem}}
+
+
+def serializar_resultado(resultado):
+    """Converte um resultado (já verificado) em valor JSON válido"""
+    if isinstance(resultado, Decimal):
+        return str(resultado)
+    if isinstance(resultado, int) and resultado.bit_length() > formatacao.MAIOR_INTEIRO_TEXTO:
+        # Inteiros enormes não podem ser escritos direto em JSON
+        return formatacao.texto_inteiro(resultado)
+    return resultado
+
+
+def _converter(operandos, contexto):
+    if not isinstance(operandos, list):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "operandos_invalidos",
+                             "Erro: \"operandos\" deve ser uma lista")
+    argumentos = []
+    for operando in operandos:
+        if isinstance(operando, bool) or not isinstance(operando, (int, float, str)):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "operandos_invalidos",
+                                 f"Erro: Operando inválido: {operando!r}")
+        if contexto is not None:
+            argumentos.append(converter_operando_decimal(str(operando)))
+        elif isinstance(operando, str):
+            argumentos.append(converter_operando(operando))
+        else:
+            argumentos.append(operando)
+    return argumentos
+
+
+def _modulo(pedido):
+    modulo = pedido.get("modulo")
+    if modulo is not None and (isinstance(modulo, bool) or not isinstance(modulo, int)):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "operandos_invalidos",
+                             "Erro: \"modulo\" deve ser um número inteiro")
+    return modulo
+
+
+def _executar(operacao, argumentos, contexto, caminho=custo.INLINE, modulo=None):
+    if modulo is not None:
+        resultado = custo.modular(operacao.nome, argumentos, modulo)
+    elif caminho == custo.ISOLADO:
+        resultado = execucao.padrao().executar(operacao.nome, *argumentos, contexto=contexto)
+    elif caminho == custo.APROXIMADO:
+        resultado = custo.aproximar(operacao.nome, *argumentos, contexto=contexto)
+    elif contexto is not None:
+        resultado = precisao.executar(operacao.nome, *argumentos, contexto=contexto)
+    else:
+        resultado = operacao(*argumentos)
+    # Complexos, infinitos e NaN viram ValueError, o erro de domínio do item
+    return serializar_resultado(verificar_resultado(resultado))
+
+
+async def calcular(pedido, contexto=None):
+    """Executa uma operação descrita por ``{"operacao": ..., "operandos": [...]}``
+
+    Devolve o objeto de resposta; erros viram ``ErroRequisicao``. O modelo
+    de custo (custo.py) escolhe o caminho antes de calcular: as operações
+    custosas rodam no pool de processos, com tempo limite, sem bloquear as
+    outras conexões; acima dos limites o resultado vem aproximado ou a
+    operação é recusada. Com ``"modulo": m`` o resultado é calculado módulo
+    m (ex.: potências enormes), sem montar o inteiro.
+    """
+    if not isinstance(pedido, dict) or not isinstance(pedido.get("operacao"), str):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "requisicao_invalida",
+                             "Erro: A operação deve ser um objeto com o campo \"operacao\"")
+    try:
+        operacao = operacoes.obter(pedido["operacao"])
+    except ValueError as e:
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, "operacao_desconhecida", str(e)) from None
+    try:
+        argumentos = _converter(pedido.get("operandos", []), contexto)
+        operacao.verificar_quantidade(len(argumentos))
+    except ValueError as e:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "operandos_invalidos", str(e)) from None
+    modulo = _modulo(pedido)
+    try:
+        caminho = custo.INLINE if modulo is not None else custo.planejar(
+            operacao.nome, *argumentos, contexto=contexto)
+        if caminho == custo.ISOLADO:
+            # A thread espera o worker (e converte resultados enormes) fora do laço de eventos
+            resultado = await asyncio.to_thread(_executar, operacao, argumentos, contexto, caminho)
+        else:
+            resultado = _executar(operacao, argumentos, contexto, caminho, modulo)
+    except ValueError as e:
+        raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, "dominio", str(e)) from None
+    except ZeroDivisionError:
+        raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, "dominio",
+                             "Erro: Divisão por zero não é permitida!") from None
+    except ArithmeticError:
+        raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, "dominio",
+                             "Erro: Resultado fora do intervalo representável!") from None
+    descricao = operacao.descrever(*argumentos)
+    return {
+        "operacao": operacao.nome,
+        "descricao": descricao if modulo is None else f"{descricao} mod {modulo}",
+        "resultado": resultado,
+    }
+
+
+def _contexto(corpo):
+    digitos = corpo.get("precisao")
+    if digitos is None:
+        return None
+    if isinstance(digitos, bool) or not isinstance(digitos, int) or not 1 <= digitos <= PRECISAO_MAXIMA:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "precisao_invalida",
+                             f"Erro: A precisão deve ser um inteiro entre 1 e {PRECISAO_MAXIMA}")
+    return precisao.criar_contexto(digitos)
+
+
+def _objeto(corpo):
+    if not isinstance(corpo, dict):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "requisicao_invalida",
+                             "Erro: O corpo da requisição deve ser um objeto JSON")
+    return corpo
+
+
+async def rota_calcular(corpo):
+    corpo = _objeto(corpo)
+    return HTTPStatus.OK, await calcular(corpo, _contexto(corpo))
+
+
+async def rota_lote(corpo):
+    corpo = _objeto(corpo)
+    pedidos = corpo.get("operacoes")
+    if not isinstance(pedidos, list):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "requisicao_invalida",
+                             "Erro: \"operacoes\" deve ser uma lista")
+    if len(pedidos) > OPERACOES_POR_LOTE:
+        raise ErroRequisicao(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "lote_grande_demais",
+                             f"Erro: O lote aceita até {OPERACOES_POR_LOTE} operações")
+    contexto = _contexto(corpo)
+    resultados = []
+    falhas = 0
+    for indice, pedido in enumerate(pedidos, 1):
+        try:
+            resultados.append(await calcular(pedido, contexto))
+        except ErroRequisicao as e:
+            falhas += 1
+            resultados.append(corpo_erro(e.codigo, e.mensagem))
+        except Exception as e:
+            # Uma falha inesperada afeta só o seu item, não o lote inteiro
+            falhas += 1
+            resultados.append(corpo_erro("erro_interno", f"Erro inesperado: {e}"))
+        if indice % FATIA_LOTE == 0:
+            # Lotes grandes não podem travar as outras conexões
+            await asyncio.sleep(0)
+    return HTTPStatus.OK, {"resultados": resultados, "sucessos": len(pedidos) - falhas, "falhas": falhas}
+
+
+async def rota_operacoes(corpo):
+    lista = [
+        {"nome": op.nome, "simbolo": op.simbolo, "aridade": op.aridade,
+         "opcionais": len(op.padroes), "precisao": op.nome in precisao.OPERACOES}
+        for op in operacoes.listar()
+    ]
+    return HTTPStatus.OK, {"operacoes": lista}
+
+
+async def rota_saude(corpo):
+    return HTTPStatus.OK, {"status": "ok", "pid": os.getpid()}
+
+
+async def rota_metricas(corpo):
+    if not metricas.ativas():
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, "metricas_desligadas",
+                             "Erro: As métricas estão desligadas; inicie o serviço com --metricas")
+    return HTTPStatus.OK, {"pid": os.getpid(), **metricas.estatisticas()}
+
+
+# (método, caminho) -> rota; as rotas GET não leem corpo
+ROTAS = {
+    ("POST", "/calcular"): rota_calcular,
+    ("POST", "/lote"): rota_lote,
+    ("GET", "/operacoes"): rota_operacoes,
+    ("GET", "/saude"): rota_saude,
+    ("GET", "/metricas"): rota_metricas,
+}
+_CAMINHOS = {caminho for _, caminho in ROTAS}
+
+
+def montar_resposta(status, objeto, manter_conexao):
+    """Serializa uma resposta HTTP/1.1 com corpo JSON"""
+    corpo = json.dumps(objeto, ensure_ascii=False, separators=(",", ":")).encode()
+    cabecalho = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(corpo)}\r\n"
+        f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n"
+        "\r\n"
+    )
+    return cabecalho.encode("latin-1") + corpo
+
+
+async def ler_requisicao(leitor):
+    """Lê uma requisição; devolve (método, caminho, versão, cabeçalhos, corpo) ou None no fim"""
+    try:
+        bloco = await asyncio.wait_for(leitor.readuntil(b"\r\n\r\n"), TEMPO_OCIOSO)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ErroRequisicao(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "requisicao_invalida",
+                             "Erro: Cabeçalhos grandes demais") from None
+    linhas = bloco.decode("latin-1").split("\r\n")
+    try:
+        metodo, caminho, versao = linhas[0].split(" ")
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "requisicao_invalida",
+                             "Erro: Linha de requisição inválida") from None
+    cabecalhos = {}
+    for linha in linhas[1:]:
+        if linha:
+            nome, _, valor = linha.partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+    if "chunked" in cabecalhos.get("transfer-encoding", "").lower():
+        raise ErroRequisicao(HTTPStatus.NOT_IMPLEMENTED, "requisicao_invalida",
+                             "Erro: Transfer-Encoding chunked não é suportado; envie Content-Length")
+    try:
+        tamanho = int(cabecalhos.get("content-length", "0"))
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "requisicao_invalida",
+                             "Erro: Content-Length inválido") from None
+    if tamanho > TAMANHO_MAXIMO_CORPO:
+        raise ErroRequisicao(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "corpo_grande_demais",
+                             f"Erro: O corpo da requisição passa de {TAMANHO_MAXIMO_CORPO} bytes")
+    try:
+        corpo = await leitor.readexactly(tamanho) if tamanho else b""
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return metodo, caminho.split("?", 1)[0], versao, cabecalhos, corpo
+
+
+def _manter_conexao(versao, cabecalhos):
+    conexao = cabecalhos.get("connection", "").lower()
+    if versao == "HTTP/1.0":
+        return conexao == "keep-alive"
+    return conexao != "close"
+
+
+async def atender(metodo, caminho, corpo):
+    """Despacha uma requisição para a rota; devolve (status, objeto)"""
+    rota = ROTAS.get((metodo, caminho))
+    if rota is None:
+        if caminho in _CAMINHOS:
+            raise ErroRequisicao(HTTPStatus.METHOD_NOT_ALLOWED, "metodo_nao_permitido",
+                                 f"Erro: Método {metodo} não permitido em {caminho}")
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, "rota_desconhecida", f"Erro: Rota desconhecida: {caminho}")
+    dados = None
+    if metodo == "POST":
+        try:
+            dados = json.loads(corpo)
+        except (ValueError, UnicodeDecodeError):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, "json_invalido",
+                                 "Erro: O corpo da requisição não é um JSON válido") from None
+    return await rota(dados)
+
+
+async def tratar_conexao(leitor, escritor):
+    """Atende as requisições de uma conexão, em ordem, até ela fechar"""
+    try:
+        while True:
+            manter = False
+            try:
+                requisicao = await ler_requisicao(leitor)
+                if requisicao is None:
+                    break
+                metodo, caminho, versao, cabecalhos, corpo = requisicao
+                manter = _manter_conexao(versao, cabecalhos)
+                status, objeto = await atender(metodo, caminho, corpo)
+            except ErroRequisicao as e:
+                status, objeto = e.status, corpo_erro(e.codigo, e.mensagem)
+            except Exception as e:
+                status = HTTPStatus.INTERNAL_SERVER_ERROR
+                objeto = corpo_erro("erro_interno", f"Erro inesperado: {e}")
+            escritor.write(montar_resposta(status, objeto, manter))
+            # drain só espera quando o cliente não está lendo as respostas
+            await escritor.drain()
+            if not manter:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        escritor.close()
+
+
+async def servir(host="127.0.0.1", porta=PORTA_PADRAO, reutilizar_porta=False, pronto=None):
+    """Roda o serviço até ser interrompido"""
+    servidor = await asyncio.start_server(tratar_conexao, host, porta, reuse_port=reutilizar_porta or None)
+    if pronto is not None:
+        pronto(servidor)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def _executar_worker(host, porta):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(servir(host, porta, reutilizar_porta=True))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """Interpreta a linha de comando e inicia o serviço"""
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON da calculadora")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument("-p", "--porta", type=int, default=PORTA_PADRAO, help=f"porta (padrão: {PORTA_PADRAO})")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="processos que atendem a mesma porta (padrão: 1)")
+    parser.add_argument("--metricas", action="store_true",
+                        help="conta chamadas, erros e latência das operações (GET /metricas)")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("é preciso pelo menos 1 worker")
+    if args.metricas:
+        # Ligadas antes de criar os workers, que herdam o registro instrumentado
+        metricas.ativar()
+    print(f"Calculadora em http://{args.host}:{args.porta} com {args.workers} worker(s)", file=sys.stderr)
+    if args.workers == 1:
+        try:
+            asyncio.run(servir(args.host, args.porta))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not hasattr(socket, "SO_REUSEPORT"):
+        print("Erro: Vários workers exigem SO_REUSEPORT, indisponível neste sistema", file=sys.stderr)
+        return 1
+    processos = [
+        multiprocessing.Process(target=_executar_worker, args=(args.host, args.porta), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for processo in processos:
+        processo.start()
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        for processo in processos:
+            processo.terminate()
+        for processo in processos:
+            processo.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
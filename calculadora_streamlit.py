@@ -6,8 +6,19 @@ Interface web moderna para calculadora científica completa
 """
 
 import streamlit as st
-import math
-from typing import Optional
+import io
+import os
+import time
+from datetime import datetime
+
+import estatisticas
+import historico
+import matrizes
+import metricas
+import motor
+import operacoes
+import planilha
+import teclado
 
 # Configuração da página
 st.set_page_config(
@@ -78,471 +89,329 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar estado da sessão
-if 'display' not in st.session_state:
-    st.session_state.display = "0"
-if 'previous_value' not in st.session_state:
-    st.session_state.previous_value = None
-if 'operation' not in st.session_state:
-    st.session_state.operation = None
-if 'waiting_for_operand' not in st.session_state:
-    st.session_state.waiting_for_operand = False
+# Arquivo do histórico, compartilhado por todas as sessões
+@st.cache_resource
+def abrir_armazem():
+    return historico.ArmazemSQLite(historico.caminho_padrao())
+
+# Métricas das operações, ligadas para o processo todo com CALCULADORA_METRICAS=1
+@st.cache_resource
+def ativar_metricas():
+    if os.environ.get("CALCULADORA_METRICAS"):
+        metricas.ativar()
+    return metricas.ativas()
+
+ativar_metricas()
+
+# Inicializar estado da sessão; display, operação pendente, memória e modos
+# ficam no estado do teclado (teclado.py), que não depende do Streamlit
+if 'calculadora' not in st.session_state:
+    st.session_state.calculadora = teclado.Estado()
 if 'history' not in st.session_state:
-    st.session_state.history = []
-if 'memory' not in st.session_state:
-    st.session_state.memory = 0
-if 'angle_mode' not in st.session_state:
-    st.session_state.angle_mode = "DEG"
+    st.session_state.history = historico.Historico(abrir_armazem())
 if 'scientific_mode' not in st.session_state:
     st.session_state.scientific_mode = True
+if 'precisao' not in st.session_state:
+    st.session_state.precisao = 0
+if 'planilha' not in st.session_state:
+    st.session_state.planilha = planilha.Planilha()
+    st.session_state.resultado_planilha = ([], [])
+
+# Opções de precisão: 0 usa float, os demais usam Decimal com esse número de dígitos
+OPCOES_PRECISAO = {0: "Float (padrão)", 30: "30 dígitos", 50: "50 dígitos"}
 
 def format_display(value: float) -> str:
     """Formata o valor para exibição"""
-    if not math.isfinite(value):
-        return "Infinity" if value > 0 else "-Infinity"
-    if math.isnan(value):
-        return "Error"
-    
-    str_value = str(value)
-    if len(str_value) <= 12:
-        return str_value
-    
-    if '.' in str_value:
-        int_part, dec_part = str_value.split('.')
-        available_decimals = 12 - len(int_part) - 1
-        if available_decimals > 0:
-            return f"{value:.{min(available_decimals, len(dec_part))}f}"
-    
-    return f"{value:.5e}"
-
-def to_radians(degrees: float) -> float:
-    """Converte graus para radianos"""
-    return degrees * (math.pi / 180)
-
-def factorial(n: float) -> float:
-    """Calcula o fatorial"""
-    if n < 0 or not n.is_integer():
-        return float('nan')
-    n = int(n)
-    if n == 0 or n == 1:
-        return 1.0
-    result = 1
-    for i in range(2, n + 1):
-        result *= i
-    return float(result)
-
-def input_number(num: str):
-    """Adiciona um número ao display"""
-    if st.session_state.waiting_for_operand:
-        st.session_state.display = num
-        st.session_state.waiting_for_operand = False
-    else:
-        new_display = num if st.session_state.display == "0" else st.session_state.display + num
-        if len(new_display.replace('.', '').replace('-', '')) <= 12:
-            st.session_state.display = new_display
-
-def input_operation(op: str):
-    """Processa uma operação"""
-    try:
-        input_value = float(st.session_state.display)
-        
-        if st.session_state.previous_value is None:
-            st.session_state.previous_value = input_value
-        elif st.session_state.operation:
-            current_value = st.session_state.previous_value or 0
-            new_value = calculate(current_value, input_value, st.session_state.operation)
-            st.session_state.display = format_display(new_value)
-            st.session_state.previous_value = new_value
-            st.session_state.history.append(
-                f"{current_value} {st.session_state.operation} {input_value} = {new_value}"
-            )
-            if len(st.session_state.history) > 10:
-                st.session_state.history.pop(0)
-        
-        st.session_state.waiting_for_operand = True
-        st.session_state.operation = op
-    except Exception as e:
-        st.session_state.display = "Error"
-        st.error(f"Erro: {e}")
-
-def calculate(first: float, second: float, op: str) -> float:
-    """Realiza o cálculo"""
-    try:
-        if op == "+":
-            return first + second
-        elif op == "-":
-            return first - second
-        elif op == "×":
-            return first * second
-        elif op == "÷":
-            if second == 0:
-                raise ValueError("Divisão por zero!")
-            return first / second
-        elif op == "^":
-            return first ** second
-        else:
-            return second
-    except Exception as e:
-        raise ValueError(f"Erro no cálculo: {e}")
-
-def perform_calculation():
-    """Executa o cálculo final"""
-    try:
-        input_value = float(st.session_state.display)
-        if st.session_state.previous_value is not None and st.session_state.operation:
-            new_value = calculate(st.session_state.previous_value, input_value, st.session_state.operation)
-            st.session_state.display = format_display(new_value)
-            st.session_state.history.append(
-                f"{st.session_state.previous_value} {st.session_state.operation} {input_value} = {new_value}"
-            )
-            if len(st.session_state.history) > 10:
-                st.session_state.history.pop(0)
-            st.session_state.previous_value = None
-            st.session_state.operation = None
-            st.session_state.waiting_for_operand = True
-    except Exception as e:
-        st.session_state.display = "Error"
-        st.error(f"Erro: {e}")
-
-def clear():
-    """Limpa a calculadora"""
-    st.session_state.display = "0"
-    st.session_state.previous_value = None
-    st.session_state.operation = None
-    st.session_state.waiting_for_operand = False
+    return motor.formatar_display(value, st.session_state.precisao)
+
+def registrar_historico(chave: str, argumentos: tuple, resultado):
+    """Guarda um cálculo no histórico da sessão (e no arquivo)"""
+    operacao = operacoes.obter(chave)
+    st.session_state.history.registrar(operacao.nome, argumentos, resultado,
+                                       operacao.descrever(*argumentos))
+
+@metricas.medir_caminho("streamlit.teclar")
+def teclar(tecla: str):
+    """Aplica uma tecla ao estado da calculadora e guarda o cálculo feito, se houve"""
+    estado = st.session_state.calculadora.aplicar(tecla)
+    st.session_state.calculadora = estado
+    if estado.calculo is not None:
+        registrar_historico(*estado.calculo)
+
+def mudar_precisao():
+    """Troca o modo de precisão da calculadora, que limpa o display"""
+    teclar(teclado.tecla_precisao(st.session_state.precisao))
 
 def clear_history():
-    """Limpa o histórico"""
-    st.session_state.history = []
+    """Limpa o histórico da sessão; o arquivo do histórico é mantido"""
+    st.session_state.history.limpar()
+
+def toggle_scientific_mode():
+    """Alterna entre os modos científico e básico"""
+    st.session_state.scientific_mode = not st.session_state.scientific_mode
+
+# Teclado: cada botão é o rótulo de uma tecla de teclado.py; None é uma célula vazia
+BOTOES_CIENTIFICOS = (
+    ("DRG", "sin", "cos", "tan", "x^y"),
+    ("ln", "log", "√", "∛", "n!"),
+    ("x²", "x³", "1/x", "e^x", "10^x"),
+    ("MC", "MR", "M+", "M-", "π"),
+)
 
-def backspace():
-    """Remove o último caractere"""
-    if len(st.session_state.display) > 1:
-        st.session_state.display = st.session_state.display[:-1]
-    else:
-        st.session_state.display = "0"
-
-def handle_scientific_function(func: str):
-    """Processa funções científicas"""
-    try:
-        current_value = float(st.session_state.display)
-        result = 0.0
-        
-        if func == "sin":
-            angle = to_radians(current_value) if st.session_state.angle_mode == "DEG" else current_value
-            result = math.sin(angle)
-        elif func == "cos":
-            angle = to_radians(current_value) if st.session_state.angle_mode == "DEG" else current_value
-            result = math.cos(angle)
-        elif func == "tan":
-            angle = to_radians(current_value) if st.session_state.angle_mode == "DEG" else current_value
-            result = math.tan(angle)
-        elif func == "ln":
-            if current_value <= 0:
-                raise ValueError("Logaritmo natural requer número positivo")
-            result = math.log(current_value)
-        elif func == "log":
-            if current_value <= 0:
-                raise ValueError("Logaritmo requer número positivo")
-            result = math.log10(current_value)
-        elif func == "√":
-            if current_value < 0:
-                raise ValueError("Raiz quadrada requer número não negativo")
-            result = math.sqrt(current_value)
-        elif func == "∛":
-            result = current_value ** (1/3)
-        elif func == "x²":
-            result = current_value ** 2
-        elif func == "x³":
-            result = current_value ** 3
-        elif func == "1/x":
-            if current_value == 0:
-                raise ValueError("Divisão por zero")
-            result = 1 / current_value
-        elif func == "!":
-            result = factorial(current_value)
-        elif func == "e":
-            result = math.e
-        elif func == "π":
-            result = math.pi
-        elif func == "e^x":
-            result = math.exp(current_value)
-        elif func == "10^x":
-            result = 10 ** current_value
-        else:
-            result = current_value
-        
-        st.session_state.display = format_display(result)
-        st.session_state.history.append(f"{func}({current_value}) = {result}")
-        if len(st.session_state.history) > 10:
-            st.session_state.history.pop(0)
-        st.session_state.waiting_for_operand = True
-    except Exception as e:
-        st.session_state.display = "Error"
-        st.error(f"Erro: {e}")
+BOTOES_BASICOS = (
+    ("C", "±", "%", "÷", "e"),
+    ("7", "8", "9", "×", None),
+    ("4", "5", "6", "-", None),
+    ("1", "2", "3", "+", None),
+    ("0", ".", "=", None, None),
+)
+
+def render_buttons(linhas):
+    """Desenha linhas de 5 botões; cada clique aplica a tecla pelo callback"""
+    for linha in linhas:
+        for coluna, tecla in zip(st.columns(5), linha):
+            with coluna:
+                if tecla is None:
+                    st.write("")
+                else:
+                    st.button(tecla, on_click=teclar, args=(tecla,))
 
 # Interface principal
 st.title("🔢 Calculadora Científica")
 
-# Controles superiores
-col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-
-with col1:
-    st.write("")
-
-with col2:
-    if st.button("🔄 Básica" if st.session_state.scientific_mode else "🔬 Científica"):
-        st.session_state.scientific_mode = not st.session_state.scientific_mode
-        st.rerun()
-
-with col3:
-    if st.button("⌫"):
-        backspace()
-        st.rerun()
-
-with col4:
-    if st.button("🗑️"):
-        clear_history()
-        st.rerun()
-
-# Histórico
-if st.session_state.history:
-    st.markdown('<div class="history-box">', unsafe_allow_html=True)
-    for entry in st.session_state.history[-5:]:
-        st.text(entry)
-    st.markdown('</div>', unsafe_allow_html=True)
-else:
-    st.markdown('<div class="history-box">Histórico aparecerá aqui</div>', unsafe_allow_html=True)
-
-# Display
-display_info = ""
-if st.session_state.memory != 0:
-    display_info += "M "
-display_info += st.session_state.angle_mode
-if st.session_state.operation and st.session_state.previous_value is not None:
-    display_info += f" | {st.session_state.previous_value} {st.session_state.operation}"
-
-st.markdown(f'<div class="display-box">{st.session_state.display}</div>', unsafe_allow_html=True)
-st.caption(display_info)
-
-# Botões científicos (se ativado)
-if st.session_state.scientific_mode:
-    st.subheader("Funções Científicas")
-    
-    # Linha 1: Trigonometria e modo angular
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        if st.button("DEG/RAD"):
-            st.session_state.angle_mode = "RAD" if st.session_state.angle_mode == "DEG" else "DEG"
-            st.rerun()
-    with col2:
-        if st.button("sin"):
-            handle_scientific_function("sin")
-            st.rerun()
-    with col3:
-        if st.button("cos"):
-            handle_scientific_function("cos")
-            st.rerun()
-    with col4:
-        if st.button("tan"):
-            handle_scientific_function("tan")
-            st.rerun()
-    with col5:
-        if st.button("x^y"):
-            input_operation("^")
-            st.rerun()
-    
-    # Linha 2: Logaritmos e raízes
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        if st.button("ln"):
-            handle_scientific_function("ln")
-            st.rerun()
-    with col2:
-        if st.button("log"):
-            handle_scientific_function("log")
-            st.rerun()
-    with col3:
-        if st.button("√"):
-            handle_scientific_function("√")
-            st.rerun()
-    with col4:
-        if st.button("∛"):
-            handle_scientific_function("∛")
-            st.rerun()
-    with col5:
-        if st.button("n!"):
-            handle_scientific_function("!")
-            st.rerun()
-    
-    # Linha 3: Potências e inversos
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        if st.button("x²"):
-            handle_scientific_function("x²")
-            st.rerun()
-    with col2:
-        if st.button("x³"):
-            handle_scientific_function("x³")
-            st.rerun()
-    with col3:
-        if st.button("1/x"):
-            handle_scientific_function("1/x")
-            st.rerun()
-    with col4:
-        if st.button("e^x"):
-            handle_scientific_function("e^x")
-            st.rerun()
-    with col5:
-        if st.button("10^x"):
-            handle_scientific_function("10^x")
-            st.rerun()
-    
-    # Linha 4: Memória e constantes
-    col1, col2, col3, col4, col5 = st.columns(5)
+# A calculadora é um fragmento: um clique executa o callback do botão e
+# redesenha só este trecho, sem reexecutar o script inteiro (nem o CSS)
+@st.fragment
+def calculator():
+    """Desenha controles, histórico, display e teclado"""
+    # Controles superiores
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+
     with col1:
-        if st.button("MC"):
-            st.session_state.memory = 0
-            st.rerun()
+        st.selectbox(
+            "Precisão",
+            options=list(OPCOES_PRECISAO),
+            format_func=OPCOES_PRECISAO.get,
+            key="precisao",
+            label_visibility="collapsed",
+            on_change=mudar_precisao,
+        )
+
     with col2:
-        if st.button("MR"):
-            st.session_state.display = format_display(st.session_state.memory)
-            st.session_state.waiting_for_operand = True
-            st.rerun()
+        st.button("🔄 Básica" if st.session_state.scientific_mode else "🔬 Científica",
+                  on_click=toggle_scientific_mode)
+
     with col3:
-        if st.button("M+"):
-            st.session_state.memory += float(st.session_state.display)
-            st.rerun()
+        st.button("⌫", on_click=teclar, args=("⌫",))
+
     with col4:
-        if st.button("M-"):
-            st.session_state.memory -= float(st.session_state.display)
-            st.rerun()
-    with col5:
-        if st.button("π"):
-            handle_scientific_function("π")
-            st.rerun()
-
-# Botões básicos
-st.subheader("Operações Básicas")
-
-# Linha 1: Limpar e operações
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    if st.button("C"):
-        clear()
-        st.rerun()
-with col2:
-    if st.button("±"):
-        try:
-            new_value = float(st.session_state.display) * -1
-            st.session_state.display = format_display(new_value)
-            st.rerun()
-        except:
-            pass
-with col3:
-    if st.button("%"):
-        try:
-            new_value = float(st.session_state.display) / 100
-            st.session_state.display = format_display(new_value)
-            st.rerun()
-        except:
-            pass
-with col4:
-    if st.button("÷"):
-        input_operation("÷")
-        st.rerun()
-with col5:
+        st.button("🗑️", on_click=clear_history)
+
+    calculadora = st.session_state.calculadora
+    if calculadora.erro:
+        st.error(calculadora.erro)
+
+    # Histórico
+    if st.session_state.history:
+        st.markdown('<div class="history-box">', unsafe_allow_html=True)
+        for entry in st.session_state.history.recentes(5):
+            st.text(str(entry))
+        st.markdown('</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="history-box">Histórico aparecerá aqui</div>', unsafe_allow_html=True)
+
+    # Display
+    display_info = ""
+    if calculadora.memoria != 0:
+        display_info += "M "
+    display_info += calculadora.modo_angulo
+    if calculadora.digitos:
+        display_info += f" | {calculadora.digitos} dígitos"
+    if calculadora.operacao and calculadora.anterior is not None:
+        display_info += f" | {calculadora.anterior} {calculadora.operacao}"
+
+    st.markdown(f'<div class="display-box">{calculadora.display}</div>', unsafe_allow_html=True)
+    st.caption(display_info)
+
+    # Botões científicos (se ativado)
+    if st.session_state.scientific_mode:
+        st.subheader("Funções Científicas")
+        render_buttons(BOTOES_CIENTIFICOS)
+
+    # Botões básicos
+    st.subheader("Operações Básicas")
     if st.session_state.scientific_mode:
-        if st.button("e"):
-            handle_scientific_function("e")
-            st.rerun()
+        render_buttons(BOTOES_BASICOS)
     else:
-        st.write("")
-
-# Linha 2: Números 7-9 e multiplicação
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    if st.button("7"):
-        input_number("7")
-        st.rerun()
-with col2:
-    if st.button("8"):
-        input_number("8")
-        st.rerun()
-with col3:
-    if st.button("9"):
-        input_number("9")
-        st.rerun()
-with col4:
-    if st.button("×"):
-        input_operation("×")
-        st.rerun()
-with col5:
-    st.write("")
-
-# Linha 3: Números 4-6 e subtração
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    if st.button("4"):
-        input_number("4")
-        st.rerun()
-with col2:
-    if st.button("5"):
-        input_number("5")
-        st.rerun()
-with col3:
-    if st.button("6"):
-        input_number("6")
-        st.rerun()
-with col4:
-    if st.button("-"):
-        input_operation("-")
-        st.rerun()
-with col5:
-    st.write("")
-
-# Linha 4: Números 1-3 e adição
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    if st.button("1"):
-        input_number("1")
-        st.rerun()
-with col2:
-    if st.button("2"):
-        input_number("2")
-        st.rerun()
-with col3:
-    if st.button("3"):
-        input_number("3")
-        st.rerun()
-with col4:
-    if st.button("+"):
-        input_operation("+")
-        st.rerun()
-with col5:
-    st.write("")
-
-# Linha 5: Zero, ponto e igual
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    if st.button("0"):
-        input_number("0")
-        st.rerun()
-with col2:
-    if st.button("."):
-        if "." not in st.session_state.display:
-            input_number(".")
-            st.rerun()
-with col3:
-    if st.button("="):
-        perform_calculation()
-        st.rerun()
-with col4:
-    st.write("")
-with col5:
-    st.write("")
+        render_buttons((BOTOES_BASICOS[0][:4] + (None,),) + BOTOES_BASICOS[1:])
+
+calculator()
+
+# Períodos da busca no histórico, em segundos (None = tudo)
+PERIODOS_HISTORICO = {"Tudo": None, "Últimas 24 horas": 86400, "Últimos 7 dias": 7 * 86400,
+                      "Últimos 30 dias": 30 * 86400}
+REGISTROS_POR_PAGINA = 20
+
+def reiniciar_busca():
+    """Volta a busca no histórico para a primeira página"""
+    st.session_state.paginas_historico = [None]
+
+def avancar_busca(cursor):
+    """Vai para a página seguinte da busca no histórico"""
+    st.session_state.paginas_historico.append(cursor)
+
+def voltar_busca():
+    """Volta para a página anterior da busca no histórico"""
+    st.session_state.paginas_historico.pop()
+
+if 'paginas_historico' not in st.session_state:
+    reiniciar_busca()
+if 'contagem_historico' not in st.session_state:
+    st.session_state.contagem_historico = (None, 0)
+
+def contar_historico(armazem, filtros, chave):
+    """Total da busca, contado de novo só quando os filtros ou o histórico mudam"""
+    if st.session_state.contagem_historico[0] != chave:
+        st.session_state.contagem_historico = (chave, armazem.contar(**filtros))
+    return st.session_state.contagem_historico[1]
+
+@st.fragment
+def busca_historico():
+    """Busca no arquivo do histórico, página a página
+
+    Só os cálculos desta sessão aparecem: o arquivo é compartilhado por
+    todos os usuários do servidor.
+    """
+    with st.expander("🔎 Buscar no histórico"):
+        history = st.session_state.history
+        armazem = history.armazem
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            operacao = st.selectbox("Operação", ["Todas"] + armazem.operacoes(sessao=history.sessao),
+                                    on_change=reiniciar_busca)
+        with col2:
+            periodo = st.selectbox("Período", list(PERIODOS_HISTORICO), on_change=reiniciar_busca)
+        with col3:
+            texto = st.text_input("Contém", on_change=reiniciar_busca)
+
+        filtros = {"operacao": None if operacao == "Todas" else operacao, "texto": texto or None,
+                   "sessao": history.sessao}
+        if PERIODOS_HISTORICO[periodo] is not None:
+            filtros["desde"] = time.time() - PERIODOS_HISTORICO[periodo]
+
+        paginas = st.session_state.paginas_historico
+        registros, cursor = armazem.pagina(**filtros, apos=paginas[-1], tamanho=REGISTROS_POR_PAGINA)
+        # O último registro da sessão muda a cada cálculo guardado
+        ultimo = history.recentes(1)
+        chave = (operacao, periodo, texto, ultimo[-1].id if ultimo else None)
+        st.caption(f"{contar_historico(armazem, filtros, chave)} cálculos encontrados — página {len(paginas)}")
+        for registro in registros:
+            momento = datetime.fromtimestamp(registro.momento).strftime("%d/%m/%Y %H:%M:%S")
+            st.text(f"{momento}  {registro}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("◀ Mais recentes", on_click=voltar_busca, disabled=len(paginas) == 1)
+        with col2:
+            st.button("Mais antigos ▶", on_click=avancar_busca, args=(cursor,), disabled=cursor is None)
+
+busca_historico()
+
+def atualizar_planilha():
+    """Aplica à planilha só as linhas do texto que mudaram"""
+    st.session_state.resultado_planilha = st.session_state.planilha.sincronizar(
+        st.session_state.texto_planilha)
+
+@st.fragment
+def editor_planilha():
+    """Planilha com células nomeadas, recalculadas quando uma delas muda"""
+    with st.expander("📋 Planilha"):
+        st.text_area("Uma célula por linha", key="texto_planilha", on_change=atualizar_planilha,
+                     placeholder="a = 3\nb = sqrt(a) * 2\nc = log(b, 10)")
+        recalculadas, erros = st.session_state.resultado_planilha
+        for erro in erros:
+            st.error(erro)
+        folha = st.session_state.planilha
+        if len(folha):
+            st.caption(f"{len(folha)} células — {len(recalculadas)} recalculadas na última edição")
+            st.table([
+                {"Célula": celula.nome, "Fórmula": celula.texto,
+                 "Valor": celula.erro if celula.erro is not None else format_display(celula.valor)}
+                for celula in folha
+            ])
+
+editor_planilha()
+
+@st.fragment
+def painel_estatisticas():
+    """Contagem, média, variância e quantis de uma lista de números ou de um arquivo"""
+    with st.expander("📊 Estatísticas"):
+        texto = st.text_area("Números separados por espaço, vírgula ou linha", key="texto_estatisticas",
+                             placeholder="2 4 4 4\n5 5 7 9")
+        arquivo = st.file_uploader("Ou um arquivo de texto com os números", type=["txt", "csv"])
+        try:
+            if arquivo is not None:
+                # O arquivo é lido linha a linha: o resumo não guarda os valores
+                linhas = io.TextIOWrapper(arquivo, encoding="utf-8")
+            else:
+                linhas = texto.splitlines()
+            resumo = estatisticas.resumir(estatisticas.ler_numeros(linhas))
+        except (ValueError, UnicodeDecodeError) as e:
+            st.error(str(e) if str(e).startswith("Erro") else f"Erro: {e}")
+            return
+        if resumo.contagem:
+            st.table([
+                {"Estatística": nome, "Valor": str(valor) if nome == "Contagem" else format_display(valor)}
+                for nome, valor in resumo.tabela()
+            ])
+            st.caption("Mediana e percentis são aproximados (t-digest)")
+
+painel_estatisticas()
+
+# Operações do painel de matrizes: rótulo -> (função, usa a matriz B)
+OPERACOES_MATRIZ = {
+    "A + B": (matrizes.adicao, True),
+    "A − B": (matrizes.subtracao, True),
+    "A × B (produto)": (matrizes.produto, True),
+    "A ⊙ B (elemento a elemento)": (lambda a, b: matrizes.elementos("×", a, b), True),
+    "Resolver A·x = B": (matrizes.resolver, True),
+    "det(A)": (matrizes.determinante, False),
+    "A⁻¹ (inversa)": (matrizes.inversa, False),
+    "Aᵀ (transposta)": (matrizes.transposta, False),
+    "‖A‖ (norma)": (matrizes.norma, False),
+}
+
+@st.fragment
+def painel_matrizes():
+    """Operações com matrizes e vetores digitados como texto"""
+    with st.expander("🧮 Matrizes"):
+        st.caption("Uma linha da matriz por linha de texto (ou separadas por \";\"); "
+                   "uma única linha é um vetor")
+        col1, col2 = st.columns(2)
+        with col1:
+            texto_a = st.text_area("Matriz A", key="texto_matriz_a", placeholder="2 1\n1 3")
+        with col2:
+            texto_b = st.text_area("Matriz B", key="texto_matriz_b", placeholder="4\n7")
+        rotulo = st.selectbox("Operação", list(OPERACOES_MATRIZ), key="operacao_matriz")
+        funcao, usa_b = OPERACOES_MATRIZ[rotulo]
+        if not texto_a.strip() or usa_b and not texto_b.strip():
+            return
+        try:
+            a = matrizes.ler(texto_a)
+            resultado = funcao(a, matrizes.ler(texto_b)) if usa_b else funcao(a)
+        except ValueError as e:
+            st.error(str(e) if str(e).startswith("Erro") else f"Erro: {e}")
+            return
+        if isinstance(resultado, list):
+            st.caption(f"Resultado ({'×'.join(map(str, matrizes.dimensoes(resultado)))})")
+        st.code(matrizes.formatar(resultado), language=None)
+
+painel_matrizes()
+
+if metricas.ativas():
+    with st.expander("📈 Métricas das operações"):
+        st.code(metricas.texto_prometheus(), language="text")
 
 # Rodapé
 st.markdown("---")
 st.caption("Calculadora Científica desenvolvida com Streamlit")
-
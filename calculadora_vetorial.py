@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Operações vetorizadas da calculadora
+Aplica as operações de calculadora.py sobre arrays inteiros de uma só vez
+
+Cada função aceita arrays NumPy, listas ou qualquer objeto com protocolo de
+buffer (array.array, memoryview...) e devolve um array float64. A validação
+de domínio também é vetorizada; o parâmetro ``erros`` escolhe o que fazer com
+os elementos inválidos:
+
+- ``"levantar"``: levanta ValueError com a mesma mensagem da versão escalar
+- ``"nan"``: devolve NaN nas posições inválidas
+- ``"mascara"``: devolve um ``numpy.ma.MaskedArray`` com as posições inválidas mascaradas
+
+Assim como no menu da calculadora, os operandos são tratados como float.
+
+Soma, subtração, multiplicação, divisão, módulo, divisão inteira, raiz
+quadrada e fatorial dão exatamente o mesmo resultado da versão escalar. As
+funções transcendentes (potência, raízes, logaritmo e trigonométricas) usam as
+implementações SIMD do NumPy, que podem diferir em 1 ulp da libm; com
+``exato=True`` elas são avaliadas pelas mesmas funções de ``math`` usadas na
+versão escalar, mantendo a validação vetorizada. Todas as funções aceitam
+``exato``; nas que já são exatas ele não muda nada.
+
+Os erros são os da versão escalar (ValueError com a mesma mensagem), com
+duas diferenças deliberadas, porque o resultado é um array float64:
+
+- potência de base negativa com expoente fracionário é erro de domínio,
+  onde a versão escalar devolve um número complexo;
+- fatorial acima de 170!, que a versão escalar devolve como inteiro exato,
+  é erro de "não cabe em um float", como a potência que transborda.
+
+Seno, cosseno e tangente aceitam ``unidade`` ("DEG", "RAD" ou "GRAD") e
+reduzem o ângulo de forma exata, com as tabelas de trigonometria.py. A raiz
+n-ésima dá a raiz real de índice ímpar para negativos e o valor exato para
+potências perfeitas; com ``exato=True`` ela usa a raiz corretamente
+arredondada de raizes.py.
+"""
+
+import math
+
+import numpy as np
+
+import fatoriais
+import raizes
+import trigonometria
+
+MODOS_ERRO = ("levantar", "nan", "mascara")
+
+# Fatoriais representáveis em float64 (0! até 170!) seguidos de infinito
+_TABELA_FATORIAL = np.array(fatoriais.TABELA_FATORIAL + (math.inf,))
+
+_ERRO_FLOAT = "Erro: O resultado não cabe em um float; use o modo de precisão!"
+
+
+def _como_array(valores):
+    """Converte a entrada em array float64 sem copiar quando possível"""
+    return np.asarray(valores, dtype=np.float64)
+
+
+def _exato(funcao, *arrays):
+    """Avalia uma função escalar de ``math`` elemento a elemento"""
+    return np.frompyfunc(funcao, len(arrays), 1)(*arrays).astype(np.float64)
+
+
+def _potencia_escalar(a, b):
+    """Potência com a mesma semântica do operador ** para floats"""
+    try:
+        resultado = a ** b
+    except OverflowError:
+        return math.copysign(math.inf, a) if b == math.floor(b) and b % 2 == 1 else math.inf
+    except (ZeroDivisionError, ValueError):
+        return math.nan
+    return math.nan if isinstance(resultado, complex) else resultado
+
+
+def _resolver(resultado, falhas, erros):
+    """Aplica o modo de erros às posições inválidas do resultado
+
+    ``falhas`` é uma lista de pares (máscara, mensagem), na mesma ordem em
+    que a função escalar faz as verificações.
+    """
+    if erros not in MODOS_ERRO:
+        raise ValueError(f"Erro: Modo de erros inválido: {erros!r}")
+
+    resultado = np.asarray(resultado, dtype=np.float64)
+    invalido = np.zeros(resultado.shape, dtype=bool)
+    for mascara, _ in falhas:
+        invalido |= mascara
+
+    if invalido.any():
+        if erros == "levantar":
+            posicao = np.flatnonzero(invalido)[0]
+            for mascara, mensagem in falhas:
+                if mascara.flat[posicao]:
+                    raise ValueError(mensagem)
+        resultado = np.where(invalido, np.nan, resultado)
+
+    if erros == "mascara":
+        return np.ma.masked_array(resultado, mask=invalido)
+    return resultado
+
+
+def adicao(a, b, erros="levantar", exato=False):
+    """Realiza a adição elemento a elemento"""
+    return _resolver(np.add(_como_array(a), _como_array(b)), [], erros)
+
+
+def subtracao(a, b, erros="levantar", exato=False):
+    """Realiza a subtração elemento a elemento"""
+    return _resolver(np.subtract(_como_array(a), _como_array(b)), [], erros)
+
+
+def multiplicacao(a, b, erros="levantar", exato=False):
+    """Realiza a multiplicação elemento a elemento"""
+    return _resolver(np.multiply(_como_array(a), _como_array(b)), [], erros)
+
+
+def divisao(a, b, erros="levantar", exato=False):
+    """Realiza a divisão elemento a elemento"""
+    a, b = np.broadcast_arrays(_como_array(a), _como_array(b))
+    with np.errstate(all="ignore"):
+        resultado = np.divide(a, b)
+    return _resolver(resultado, [
+        (b == 0, "Erro: Divisão por zero não é permitida!"),
+    ], erros)
+
+
+def potencia(a, b, erros="levantar", exato=False):
+    """Eleva cada elemento de 'a' à potência correspondente de 'b'"""
+    a, b = np.broadcast_arrays(_como_array(a), _como_array(b))
+    with np.errstate(all="ignore"):
+        resultado = _exato(_potencia_escalar, a, b) if exato else np.power(a, b)
+    return _resolver(resultado, [
+        ((a == 0) & (b < 0), "Erro: Zero não pode ser elevado a expoente negativo!"),
+        ((a < 0) & (b != np.floor(b)), "Erro: Base negativa com expoente fracionário resulta em número complexo!"),
+        (np.isinf(resultado) & np.isfinite(a) & np.isfinite(b), _ERRO_FLOAT),
+    ], erros)
+
+
+def raiz_quadrada(a, erros="levantar", exato=False):
+    """Calcula a raiz quadrada de cada elemento"""
+    a = _como_array(a)
+    with np.errstate(all="ignore"):
+        resultado = np.sqrt(a)
+    return _resolver(resultado, [
+        (a < 0, "Erro: Não é possível calcular raiz quadrada de número negativo!"),
+    ], erros)
+
+
+def _raiz_escalar(a, n):
+    """Raiz corretamente arredondada de raizes.py, com NaN no lugar dos erros"""
+    try:
+        return raizes.raiz_real(a, n)
+    except ValueError:
+        return math.nan
+
+
+# Até aqui as potências de inteiros em float64 são exatas
+_MAIOR_INTEIRO_EXATO = 2.0 ** 53
+
+
+def raiz_n_esima(a, n, erros="levantar", exato=False):
+    """Calcula a raiz n-ésima de cada elemento (raiz real para índice ímpar)"""
+    a, n = np.broadcast_arrays(_como_array(a), _como_array(n))
+    inteiro = n == np.floor(n)
+    with np.errstate(all="ignore"):
+        if exato:
+            resultado = _exato(_raiz_escalar, a, n)
+        else:
+            modulo = np.abs(a)
+            resultado = np.power(modulo, 1 / n)
+            # Potências perfeitas (27, 1000...) dão a raiz inteira exata, como na versão escalar
+            candidatas = np.rint(resultado)
+            exatas = inteiro & (n > 0) & (modulo < _MAIOR_INTEIRO_EXATO) & (np.power(candidatas, n) == modulo)
+            resultado = np.where(exatas, candidatas, resultado)
+            # Raiz real de índice ímpar: -(|a| ** (1/n))
+            resultado = np.where(a < 0, -resultado, resultado)
+    return _resolver(resultado, [
+        ((a < 0) & inteiro & (np.fmod(n, 2) == 0), "Erro: Não é possível calcular raiz par de número negativo!"),
+        (n == 0, "Erro: Índice da raiz não pode ser zero!"),
+        ((a < 0) & ~inteiro, "Erro: Raiz de número negativo resulta em número complexo!"),
+        ((a == 0) & (n < 0), "Erro: Zero não pode ser elevado a expoente negativo!"),
+    ], erros)
+
+
+def resto_divisao(a, b, erros="levantar", exato=False):
+    """Calcula o resto da divisão (módulo) elemento a elemento"""
+    a, b = np.broadcast_arrays(_como_array(a), _como_array(b))
+    with np.errstate(all="ignore"):
+        resultado = np.remainder(a, b)
+    return _resolver(resultado, [
+        (b == 0, "Erro: Divisão por zero não é permitida!"),
+    ], erros)
+
+
+def divisao_inteira(a, b, erros="levantar", exato=False):
+    """Realiza a divisão inteira elemento a elemento"""
+    a, b = np.broadcast_arrays(_como_array(a), _como_array(b))
+    with np.errstate(all="ignore"):
+        resultado = np.floor_divide(a, b)
+    return _resolver(resultado, [
+        (b == 0, "Erro: Divisão por zero não é permitida!"),
+    ], erros)
+
+
+def fatorial(n, erros="levantar", exato=False):
+    """Calcula o fatorial de cada elemento
+
+    Acima de 170! o resultado não cabe em float64 e é um erro.
+    """
+    n = _como_array(n)
+    negativo = n < 0
+    fracionario = ~negativo & (n != np.floor(n))
+    indices = np.where(negativo | fracionario, 0, np.minimum(n, fatoriais.MAIOR_FATORIAL_FLOAT + 1))
+    resultado = _TABELA_FATORIAL[indices.astype(np.intp)]
+    return _resolver(resultado, [
+        (negativo, "Erro: Fatorial não é definido para números negativos!"),
+        (fracionario, "Erro: Fatorial só é definido para números inteiros!"),
+        (n > fatoriais.MAIOR_FATORIAL_FLOAT, _ERRO_FLOAT),
+    ], erros)
+
+
+def logaritmo(a, base=10, erros="levantar", exato=False):
+    """Calcula o logaritmo de cada elemento"""
+    a, base = np.broadcast_arrays(_como_array(a), _como_array(base))
+    a_invalido = a <= 0
+    base_invalida = (base <= 0) | (base == 1)
+    if exato:
+        # math.log levanta erro fora do domínio, então trocamos essas posições
+        resultado = _exato(math.log, np.where(a_invalido, 1.0, a), np.where(base_invalida, 2.0, base))
+    else:
+        with np.errstate(all="ignore"):
+            resultado = np.log(a) / np.log(base)
+    return _resolver(resultado, [
+        (a_invalido, "Erro: Logaritmo só é definido para números positivos!"),
+        (base_invalida, "Erro: Base do logaritmo deve ser positiva e diferente de 1!"),
+    ], erros)
+
+
+# Unidade -> tabela de seno dos ângulos inteiros do primeiro quadrante
+_TABELAS_SENO = {unidade: np.array(tabela) for unidade, tabela in trigonometria.TABELAS_SENO.items()}
+
+
+def _seno_cosseno(angulos, unidade, exato):
+    """Seno e cosseno com a redução exata de trigonometria.py, vetorizada
+
+    Devolve ``(seno, cosseno, infinito)``, onde ``infinito`` marca os ângulos
+    infinitos (sem seno nem cosseno).
+    """
+    if unidade not in trigonometria.UNIDADES:
+        raise ValueError(f"Erro: Unidade de ângulo desconhecida: {unidade!r}")
+    x = _como_array(angulos)
+    infinito = np.isinf(x)
+    if unidade == "RAD":
+        with np.errstate(all="ignore"):
+            if exato:
+                # math.sin levanta erro para infinito; a posição já está em ``infinito``
+                x = np.where(infinito, np.nan, x)
+                return _exato(math.sin, x), _exato(math.cos, x), infinito
+            return np.sin(x), np.cos(x), infinito
+
+    quarto = trigonometria.QUARTO_DE_VOLTA[unidade]
+    tabela = _TABELAS_SENO[unidade]
+    with np.errstate(all="ignore"):
+        volta = np.fmod(np.abs(x), 4 * quarto)
+        resto = np.fmod(volta, quarto)
+        quadrante = np.nan_to_num((volta - resto) / quarto).astype(np.intp)
+        # Acima de meio quarto, usa o complemento (a subtração é exata)
+        complemento = 2 * resto > quarto
+        base = np.where(complemento, quarto - resto, resto) * (math.pi / (2 * quarto))
+        seno_base = _exato(math.sin, base) if exato else np.sin(base)
+        cosseno_base = _exato(math.cos, base) if exato else np.cos(base)
+    s = np.where(complemento, cosseno_base, seno_base)
+    c = np.where(complemento, seno_base, cosseno_base)
+
+    # Ângulos inteiros vêm da tabela, com os valores exatos dos ângulos notáveis
+    inteiro = resto == np.floor(resto)
+    if inteiro.any():
+        indice = resto[inteiro].astype(np.intp)
+        s[inteiro] = tabela[indice]
+        c[inteiro] = tabela[quarto - indice]
+
+    # sen e cos de (q × 90° + r) em cada quadrante; somar 0.0 troca -0.0 por 0.0
+    seno_final = np.choose(quadrante, [s, c, -s, -c])
+    cosseno_final = np.choose(quadrante, [c, -s, -c, s])
+    seno_final = np.where(x < 0, -seno_final, seno_final) + 0.0
+    return seno_final, cosseno_final + 0.0, infinito
+
+
+_ERRO_INFINITO = "Erro: Funções trigonométricas não são definidas para ângulo infinito!"
+
+
+def seno(angulo, erros="levantar", exato=False, unidade="DEG"):
+    """Calcula o seno de cada ângulo na unidade dada (DEG, RAD ou GRAD)"""
+    s, _, infinito = _seno_cosseno(angulo, unidade, exato)
+    return _resolver(s, [(infinito, _ERRO_INFINITO)], erros)
+
+
+def cosseno(angulo, erros="levantar", exato=False, unidade="DEG"):
+    """Calcula o cosseno de cada ângulo na unidade dada (DEG, RAD ou GRAD)"""
+    _, c, infinito = _seno_cosseno(angulo, unidade, exato)
+    return _resolver(c, [(infinito, _ERRO_INFINITO)], erros)
+
+
+def tangente(angulo, erros="levantar", exato=False, unidade="DEG"):
+    """Calcula a tangente de cada ângulo na unidade dada (DEG, RAD ou GRAD)"""
+    if unidade == "RAD":
+        x = _como_array(angulo)
+        infinito = np.isinf(x)
+        with np.errstate(all="ignore"):
+            resultado = _exato(math.tan, np.where(infinito, np.nan, x)) if exato else np.tan(x)
+        return _resolver(resultado, [(infinito, _ERRO_INFINITO)], erros)
+    s, c, infinito = _seno_cosseno(angulo, unidade, exato)
+    with np.errstate(all="ignore"):
+        resultado = s / c + 0.0
+    return _resolver(resultado, [
+        (infinito, _ERRO_INFINITO),
+        (c == 0, trigonometria.ERRO_TANGENTE),
+    ], erros)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga da interface Streamlit
+Sobe um servidor local com a calculadora_streamlit.py e simula N sessões
+simultâneas, cada uma com sua própria conexão WebSocket, medindo vazão,
+latência dos cliques (p50/p95/p99) e memória do servidor por sessão
+
+Cada sessão repete roteiros de teclas realistas: digitação de números,
+operadores, funções científicas e memória (M+/M-). Um clique é enviado
+como o navegador faria (o estado do botão numa mensagem de reexecução,
+com o id do fragmento) e a latência vai do envio até o fim da execução
+do script.
+
+    python carga_streamlit.py --sessoes 8 --repeticoes 5
+    python carga_streamlit.py --sessoes 16 --pausa 300 --json --maximo-p95 250
+    python carga_streamlit.py --url ws://servidor:8501/_stcore/stream
+
+O ``AppTest`` do Streamlit não serve aqui: ele usa um runtime global e não
+permite várias sessões simultâneas no mesmo processo. O driver fala o
+protocolo interno do Streamlit (mensagens protobuf BackMsg/ForwardMsg), que
+pode mudar entre versões; ele foi escrito para o Streamlit 1.37 ou superior
+e usa o pacote ``websockets``.
+
+Com ``--maximo-p95`` o programa termina com código 1 se o p95 passar do
+limite (em ms), para detectar regressões na integração contínua.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+APP_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calculadora_streamlit.py")
+
+# Sequências de rótulos de botões, como um usuário as digitaria
+ROTEIROS = {
+    "conta": ["1", "2", "8", "+", "7", ".", "5", "=", "×", "3", "="],
+    "cientifica": ["3", "0", "sin", "x²", "C", "2", "x^y", "1", "0", "=", "log", "n!"],
+    "memoria": ["5", "0", "M+", "C", "2", "0", "M-", "MR", "÷", "4", "=", "MC"],
+    "correcao": ["9", "9", "9", "⌫", "±", "%", "C", "4", "2", "-", "1", "="],
+}
+
+
+def percentil(valores_ordenados, p):
+    """Percentil p (0-100) de uma lista ordenada, por interpolação linear"""
+    if not valores_ordenados:
+        return 0.0
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fracao = posicao - inferior
+    return valores_ordenados[inferior] * (1 - fracao) + valores_ordenados[superior] * fracao
+
+
+def memoria_residente(pid):
+    """Memória residente (VmRSS) de um processo, em bytes; None fora do Linux"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for linha in status:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def porta_livre():
+    """Pede ao sistema uma porta TCP livre"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(app, porta, timeout=60):
+    """Sobe ``streamlit run`` em segundo plano e espera ele responder"""
+    ambiente = dict(os.environ)
+    # O histórico das sessões simuladas não vai para o arquivo do usuário
+    ambiente["CALCULADORA_HISTORICO"] = os.path.join(tempfile.mkdtemp(prefix="carga_"), "historico.sqlite3")
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app,
+         "--server.headless", "true", "--server.port", str(porta),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError(f"Erro: O servidor Streamlit terminou com código {servidor.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{porta}/_stcore/health", timeout=1) as resposta:
+                if resposta.status == 200:
+                    return servidor
+        except OSError:
+            time.sleep(0.2)
+    servidor.terminate()
+    raise RuntimeError("Erro: O servidor Streamlit não respondeu a tempo")
+
+
+class Sessao:
+    """Uma sessão simulada: uma conexão, seus botões e suas latências"""
+
+    def __init__(self, url, indice, timeout):
+        self.url = url
+        self.indice = indice
+        self.timeout = timeout
+        self.latencias = []
+        self.erro = None
+        # Rótulo -> (id do widget, id do fragmento)
+        self._botoes = {}
+        self._conexao = None
+
+    async def abrir(self):
+        """Conecta e faz a primeira execução do script (carregamento da página)"""
+        self._conexao = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        await self._executar(BackMsg())
+
+    async def fechar(self):
+        if self._conexao is not None:
+            await self._conexao.close()
+
+    async def clicar(self, rotulo):
+        """Clica no botão com o rótulo e devolve a latência em segundos"""
+        try:
+            id_botao, fragmento = self._botoes[rotulo]
+        except KeyError:
+            raise ValueError(f"Erro: Botão não encontrado: {rotulo!r}") from None
+        mensagem = BackMsg()
+        widget = mensagem.rerun_script.widget_states.widgets.add()
+        widget.id = id_botao
+        widget.trigger_value = True
+        if fragmento:
+            mensagem.rerun_script.fragment_id = fragmento
+        inicio = time.perf_counter()
+        await self._executar(mensagem)
+        return time.perf_counter() - inicio
+
+    async def _executar(self, mensagem):
+        mensagem.rerun_script.query_string = ""
+        mensagem.rerun_script.page_script_hash = ""
+        await self._conexao.send(mensagem.SerializeToString())
+        while True:
+            resposta = ForwardMsg()
+            resposta.ParseFromString(await asyncio.wait_for(self._conexao.recv(), self.timeout))
+            tipo = resposta.WhichOneof("type")
+            if tipo == "script_finished":
+                return
+            if tipo != "delta" or resposta.delta.WhichOneof("type") != "new_element":
+                continue
+            elemento = resposta.delta.new_element
+            tipo_elemento = elemento.WhichOneof("type")
+            if tipo_elemento == "button":
+                self._botoes[elemento.button.label] = (elemento.button.id, resposta.delta.fragment_id)
+            elif tipo_elemento == "exception":
+                raise RuntimeError(f"Erro: Exceção no app: {elemento.exception.message}")
+
+    async def executar(self, roteiros, repeticoes, pausa):
+        """Percorre os roteiros, começando por um diferente em cada sessão"""
+        nomes = list(roteiros)
+        try:
+            for repeticao in range(repeticoes):
+                nome = nomes[(self.indice + repeticao) % len(nomes)]
+                for rotulo in roteiros[nome]:
+                    self.latencias.append(await self.clicar(rotulo))
+                    if pausa:
+                        await asyncio.sleep(pausa)
+        except Exception as e:
+            self.erro = e
+
+
+async def _medir(url, pid, sessoes, repeticoes, roteiros, pausa, timeout):
+    # Uma sessão de aquecimento carrega os módulos do app antes da medição de memória
+    aquecimento = Sessao(url, -1, timeout)
+    await aquecimento.abrir()
+    await aquecimento.fechar()
+    residente_antes = memoria_residente(pid) if pid else None
+
+    simuladas = [Sessao(url, indice, timeout) for indice in range(sessoes)]
+    try:
+        await asyncio.gather(*(sessao.abrir() for sessao in simuladas))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao.executar(roteiros, repeticoes, pausa) for sessao in simuladas))
+        duracao = time.perf_counter() - inicio
+        residente_depois = memoria_residente(pid) if pid else None
+    finally:
+        await asyncio.gather(*(sessao.fechar() for sessao in simuladas))
+
+    latencias = sorted(latencia for sessao in simuladas for latencia in sessao.latencias)
+    por_sessao = None
+    if residente_antes is not None and residente_depois is not None:
+        por_sessao = (residente_depois - residente_antes) / sessoes / 1024
+    return {
+        "sessoes": sessoes,
+        "interacoes": len(latencias),
+        "duracao_s": duracao,
+        "vazao_por_s": len(latencias) / duracao if duracao else 0.0,
+        "latencia_ms": {
+            "media": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+            "p50": percentil(latencias, 50) * 1000,
+            "p95": percentil(latencias, 95) * 1000,
+            "p99": percentil(latencias, 99) * 1000,
+            "maxima": latencias[-1] * 1000 if latencias else 0.0,
+        },
+        "memoria_servidor_kib": {
+            "antes": residente_antes / 1024 if residente_antes is not None else None,
+            "depois": residente_depois / 1024 if residente_depois is not None else None,
+            "por_sessao": por_sessao,
+        },
+        "erros": [f"sessão {sessao.indice}: {sessao.erro}" for sessao in simuladas if sessao.erro],
+    }
+
+
+def medir(app=APP_PADRAO, sessoes=4, repeticoes=3, roteiros=None, pausa=0.0, timeout=60, url=None):
+    """Executa o teste de carga e devolve um dicionário com o relatório
+
+    Sem ``url``, sobe um servidor local só para o teste (e mede a memória
+    dele); ``pausa`` é o tempo de reflexão entre cliques, em segundos.
+    """
+    if websockets is None:
+        raise RuntimeError("Erro: O teste de carga precisa do pacote websockets (pip install websockets)")
+    roteiros = roteiros or ROTEIROS
+    servidor = None
+    if url is None:
+        porta = porta_livre()
+        servidor = iniciar_servidor(app, porta, timeout)
+        url = f"ws://127.0.0.1:{porta}/_stcore/stream"
+    try:
+        return asyncio.run(_medir(url, servidor and servidor.pid, sessoes, repeticoes, roteiros, pausa, timeout))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+
+def formatar(relatorio):
+    """Monta o relatório em texto"""
+    latencia = relatorio["latencia_ms"]
+    memoria = relatorio["memoria_servidor_kib"]
+    linhas = [
+        f"Sessões simultâneas: {relatorio['sessoes']}",
+        f"Interações:          {relatorio['interacoes']} em {relatorio['duracao_s']:.2f} s",
+        f"Vazão:               {relatorio['vazao_por_s']:.1f} cliques/s",
+        f"Latência (ms):       média {latencia['media']:.1f} | p50 {latencia['p50']:.1f}"
+        f" | p95 {latencia['p95']:.1f} | p99 {latencia['p99']:.1f} | máx {latencia['maxima']:.1f}",
+    ]
+    if memoria["por_sessao"] is not None:
+        linhas.append(f"Memória do servidor: {memoria['antes'] / 1024:.1f} MiB -> {memoria['depois'] / 1024:.1f} MiB"
+                      f" ({memoria['por_sessao']:.0f} KiB por sessão)")
+    for erro in relatorio["erros"]:
+        linhas.append(f"Erro: {erro}")
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    """Interpreta a linha de comando e executa o teste de carga"""
+    parser = argparse.ArgumentParser(description="Teste de carga da calculadora Streamlit com sessões simultâneas")
+    parser.add_argument("--app", default=APP_PADRAO, help="script Streamlit a testar")
+    parser.add_argument("--url", help="testa um servidor já em execução (ws://host:porta/_stcore/stream)")
+    parser.add_argument("-n", "--sessoes", type=int, default=4, help="sessões simultâneas (padrão: 4)")
+    parser.add_argument("-r", "--repeticoes", type=int, default=3,
+                        help="roteiros executados por sessão (padrão: 3)")
+    parser.add_argument("--roteiro", choices=sorted(ROTEIROS), action="append",
+                        help="usa só este roteiro (pode ser repetido)")
+    parser.add_argument("--pausa", type=float, default=0, metavar="MS",
+                        help="tempo de reflexão entre cliques, em ms (padrão: 0, carga máxima)")
+    parser.add_argument("--timeout", type=float, default=60, help="tempo máximo de cada execução, em segundos")
+    parser.add_argument("--json", action="store_true", help="escreve o relatório em JSON")
+    parser.add_argument("--maximo-p95", type=float, metavar="MS",
+                        help="termina com código 1 se o p95 passar deste valor")
+    args = parser.parse_args(argv)
+
+    if args.sessoes < 1 or args.repeticoes < 1:
+        parser.error("sessões e repetições precisam ser pelo menos 1")
+    roteiros = {nome: ROTEIROS[nome] for nome in args.roteiro} if args.roteiro else ROTEIROS
+
+    try:
+        relatorio = medir(args.app, args.sessoes, args.repeticoes, roteiros,
+                          args.pausa / 1000, args.timeout, args.url)
+    except (RuntimeError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2) if args.json else formatar(relatorio))
+
+    if relatorio["erros"]:
+        return 1
+    if args.maximo_p95 is not None and relatorio["latencia_ms"]["p95"] > args.maximo_p95:
+        print(f"Erro: p95 de {relatorio['latencia_ms']['p95']:.1f} ms acima do limite de {args.maximo_p95} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
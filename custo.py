@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo de custo das operações da calculadora
+Estima o tamanho do resultado e o tempo de cálculo só pela magnitude dos
+operandos, antes de calcular, e escolhe como a chamada deve ser avaliada
+
+``9 ** 9 ** 9`` em inteiros tem 369 milhões de dígitos: calcular leva
+minutos e gigabytes. ``estimar`` devolve o log2 do resultado (os bits de um
+inteiro exato) e o tempo estimado, e ``planejar`` escolhe o caminho:
+
+- ``INLINE``: barata, roda no próprio processo
+- ``ISOLADO``: demorada, roda no pool de execucao.py, com tempo limite
+- ``APROXIMADO``: acima dos limites, o resultado vem do espaço log
+  (``aproximar``), como um Decimal com mantissa e expoente, em microssegundos
+- acima dos limites com ``aproximar=False``, ou um float que transbordaria,
+  a chamada é recusada com um ValueError que diz o tamanho estimado
+
+Com um módulo, ``modular`` calcula ``pow(a, b, m)`` e afins sem montar o
+resultado inteiro. Os limites são configuráveis:
+
+    >>> planejar("potencia", 9, 9 ** 9)
+    'aproximado'
+    >>> aproximar("potencia", 9, 9 ** 9)
+    Decimal('4.28124773175747E+369693099')
+    >>> configurar(aproximar=False)
+    >>> planejar("potencia", 9, 9 ** 9)
+    Traceback (most recent call last):
+    ValueError: Erro: Resultado grande demais: cerca de 369.693.100 dígitos; use um módulo ou o resultado aproximado!
+    >>> configurar(aproximar=True)
+    >>> modular("potencia", (9, 9 ** 9), 10 ** 9)
+    627177289
+"""
+
+import dataclasses
+import decimal
+import math
+from decimal import Decimal, localcontext
+
+import fatoriais
+
+INLINE = "inline"
+ISOLADO = "isolado"
+APROXIMADO = "aproximado"
+
+# Maior log2 de um float (acima disso ** e exp levantam OverflowError)
+BITS_FLOAT = 1024
+
+# Algarismos significativos dos resultados aproximados no modo float, e o
+# máximo no modo de precisão (a série de Stirling não vai além)
+DIGITOS_APROXIMACAO = 15
+DIGITOS_MAXIMOS_APROXIMACAO = 80
+
+LOG10_2 = math.log10(2)
+
+# Acima disto (cerca de 10^18 dígitos) o expoente do resultado não cabe nem
+# em um Decimal: não há resultado aproximado nem modo de precisão que sirva
+BITS_MAXIMO_DECIMAL = decimal.MAX_EMAX / LOG10_2
+
+# A multiplicação de inteiros grandes do CPython (Karatsuba) custa ~bits^1,585;
+# segundos por bit^1,585 do resultado, medidos em uma máquina de referência
+# (só a ordem de grandeza importa)
+_EXPOENTE_KARATSUBA = math.log2(3)
+_SEGUNDOS_POR_BIT = {"potencia": 1.5e-11, "multiplicacao": 2e-11, "fatorial": 3e-11}
+
+
+@dataclasses.dataclass(frozen=True)
+class Limites:
+    """Limites do modelo de custo
+
+    ``segundos_inline`` e ``digitos_inline`` (precisão do modo Decimal)
+    separam as chamadas que rodam no próprio processo das que vão para o
+    pool; acima de ``bits_maximo`` ou ``segundos_maximo`` o resultado exato
+    não é calculado: ``aproximar`` escolhe entre o resultado aproximado e
+    a recusa.
+    """
+
+    segundos_inline: float = 0.02
+    digitos_inline: int = 500
+    bits_maximo: int = 1 << 26
+    segundos_maximo: float = 5.0
+    aproximar: bool = True
+
+
+class Estimativa:
+    """Tamanho e custo estimados do resultado de uma chamada
+
+    ``bits`` é o log2 do módulo do resultado (pode ser infinito, quando o
+    expoente não cabe em um float); ``exato`` indica um inteiro exato, que
+    ocupa esses bits na memória, e não um float.
+    """
+
+    __slots__ = ("bits", "segundos", "exato")
+
+    def __init__(self, bits=0.0, segundos=0.0, exato=False):
+        self.bits = bits
+        self.segundos = segundos
+        self.exato = exato
+
+    @property
+    def digitos(self):
+        """Número aproximado de dígitos decimais do resultado
+
+        Só faz sentido até ``BITS_MAXIMO_DECIMAL``; acima disso as mensagens
+        não citam o número.
+        """
+        # A folga compensa o arredondamento de log2 em potências de 10
+        return int(self.bits * LOG10_2 + 1e-9) + 1
+
+    def __repr__(self):
+        return f"Estimativa(bits={self.bits!r}, segundos={self.segundos!r}, exato={self.exato!r})"
+
+
+_limites = Limites()
+
+
+def limites():
+    """Limites em uso"""
+    return _limites
+
+
+def configurar(limites=None, **campos):
+    """Troca os limites em uso (todos, ou só os campos informados)"""
+    global _limites
+    _limites = dataclasses.replace(limites or _limites, **campos)
+
+
+def _inteiro(valor):
+    """O valor como int se ele for inteiro (também 5.0, Decimal e texto), ou None"""
+    if isinstance(valor, int):
+        return valor
+    try:
+        if isinstance(valor, str):
+            valor = Decimal(valor)
+        if isinstance(valor, (float, Decimal)) and valor == valor.to_integral_value():
+            return int(valor)
+    except (ArithmeticError, AttributeError, ValueError):
+        pass
+    return None
+
+
+def _log2(valor):
+    valor = abs(valor)
+    return math.log2(valor) if valor else -math.inf
+
+
+def _segundos(chave, bits):
+    try:
+        return _SEGUNDOS_POR_BIT[chave] * max(bits, 1.0) ** _EXPOENTE_KARATSUBA
+    except OverflowError:
+        # Uma estimativa de custo zerada deixaria o cálculo rodar para sempre
+        return math.inf
+
+
+def _potencia(base, expoente):
+    if not isinstance(base, (int, float)) or not isinstance(expoente, (int, float)):
+        return Estimativa()
+    if expoente == 0 or base in (0, 1, -1):
+        return Estimativa()
+    log = _log2(base)
+    try:
+        bits = expoente * log
+    except OverflowError:
+        # Expoente inteiro maior que qualquer float
+        bits = math.inf if (expoente > 0) == (log > 0) else -math.inf
+    if isinstance(base, int) and isinstance(expoente, int) and expoente > 0:
+        return Estimativa(bits, _segundos("potencia", bits), True)
+    return Estimativa(bits)
+
+
+def _multiplicacao(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        bits = a.bit_length() + b.bit_length()
+        return Estimativa(bits, _segundos("multiplicacao", bits), True)
+    # Em float o produto que transborda vira infinito, sem erro
+    return Estimativa()
+
+
+def _fatorial(n):
+    n = _inteiro(n)
+    if n is None or n < 2:
+        return Estimativa()
+    bits = fatoriais.log_fatorial(n) / math.log(2)
+    # fatorial_exato recusa n acima de LIMITE_EXATO, qualquer que seja o limite
+    segundos = _segundos("fatorial", bits) if n <= fatoriais.LIMITE_EXATO else math.inf
+    return Estimativa(bits, segundos, True)
+
+
+def _exponencial(a):
+    if not isinstance(a, (int, float)):
+        return Estimativa()
+    return Estimativa(a / math.log(2))
+
+
+# Nome da operação -> estimativa a partir dos operandos
+_ESTIMATIVAS = {
+    "potencia": _potencia,
+    "quadrado": lambda a: _potencia(a, 2),
+    "cubo": lambda a: _potencia(a, 3),
+    "potencia_de_dez": lambda a: _potencia(10, a),
+    "multiplicacao": _multiplicacao,
+    "fatorial": _fatorial,
+    "exponencial": _exponencial,
+}
+
+
+def estimar(nome, *args):
+    """Estima o tamanho e o custo do resultado, sem calcular"""
+    estimativa = _ESTIMATIVAS.get(nome)
+    if estimativa is None:
+        return Estimativa()
+    try:
+        return estimativa(*args)
+    except (TypeError, ValueError, ArithmeticError):
+        # Operandos inválidos: a própria operação dá o erro
+        return Estimativa()
+
+
+def _acima_do_maximo(estimativa, limites):
+    return estimativa.exato and (estimativa.bits > limites.bits_maximo
+                                 or estimativa.segundos > limites.segundos_maximo)
+
+
+def _milhares(numero):
+    return f"{numero:,}".replace(",", ".")
+
+
+def _erro_limite(nome, estimativa):
+    if not estimativa.bits <= BITS_MAXIMO_DECIMAL:
+        if nome in _MODULARES:
+            return "Erro: Resultado grande demais até para o resultado aproximado; use um módulo!"
+        return "Erro: Resultado grande demais até para o resultado aproximado!"
+    sugestao = "um módulo ou o resultado aproximado" if nome in _MODULARES else "o resultado aproximado"
+    return f"Erro: Resultado grande demais: cerca de {_milhares(estimativa.digitos)} dígitos; use {sugestao}!"
+
+
+def _verificar_float(estimativa):
+    if not estimativa.exato and estimativa.bits > BITS_FLOAT:
+        if not estimativa.bits <= BITS_MAXIMO_DECIMAL:
+            raise ValueError("Erro: O resultado não cabe em um float nem no modo de precisão!")
+        raise ValueError(f"Erro: O resultado (cerca de 10^{_milhares(estimativa.digitos - 1)}) "
+                         "não cabe em um float; use o modo de precisão!")
+
+
+def verificar(nome, *args):
+    """Recusa, antes de calcular, um resultado acima dos limites
+
+    Inteiros exatos acima dos limites e floats que transbordariam dão
+    ValueError. As próprias operações chamam esta verificação, então
+    expressões e planilhas também ficam protegidas.
+    """
+    estimativa = estimar(nome, *args)
+    if _acima_do_maximo(estimativa, _limites):
+        raise ValueError(_erro_limite(nome, estimativa))
+    _verificar_float(estimativa)
+
+
+def planejar(nome, *args, contexto=None, limites=None):
+    """Escolhe o caminho da chamada: INLINE, ISOLADO ou APROXIMADO
+
+    Levanta ValueError quando o resultado não deve ser calculado.
+    """
+    limites = limites or _limites
+    if nome not in _ESTIMATIVAS:
+        # Operação de custo fixo: só a precisão do modo Decimal conta
+        return ISOLADO if contexto is not None and contexto.prec > limites.digitos_inline else INLINE
+    estimativa = estimar(nome, *args)
+    if _acima_do_maximo(estimativa, limites):
+        if limites.aproximar and nome in _LOG10 and estimativa.bits <= BITS_MAXIMO_DECIMAL:
+            return APROXIMADO
+        raise ValueError(_erro_limite(nome, estimativa))
+    if estimativa.exato and estimativa.segundos > limites.segundos_inline:
+        return ISOLADO
+    if contexto is not None:
+        # Em Decimal o custo depende da precisão, não do tamanho dos operandos
+        return ISOLADO if contexto.prec > limites.digitos_inline else INLINE
+    _verificar_float(estimativa)
+    return INLINE
+
+
+# Bernoulli B2, B4, ..., B20 da série de Stirling; com n ≥ 10⁴ o termo
+# seguinte fica abaixo de 10⁻⁸⁰
+_BERNOULLI = (
+    (1, 6), (-1, 30), (1, 42), (-1, 30), (5, 66), (-691, 2730), (7, 6),
+    (-3617, 510), (43867, 798), (-174611, 330),
+)
+
+# Abaixo disto o log do fatorial vem do fatorial exato, que é barato
+_MENOR_STIRLING = 10_000
+
+
+def _log10_fatorial(n):
+    if n < _MENOR_STIRLING:
+        return Decimal(math.factorial(n)).log10()
+    # Importação local: precisao depende do registro de operações
+    import precisao
+
+    n = Decimal(n)
+    c = decimal.getcontext()
+    ln = n * n.ln() - n + (2 * precisao.pi(c.prec) * n).ln() / 2
+    for k, (numerador, denominador) in enumerate(_BERNOULLI, 1):
+        ln += Decimal(numerador) / (denominador * 2 * k * (2 * k - 1) * n ** (2 * k - 1))
+    return ln / Decimal(10).ln()
+
+
+def _log10_potencia(a, b):
+    return Decimal(b) * Decimal(abs(a)).log10()
+
+
+# Nome da operação -> (log10 do módulo do resultado, resultado negativo?)
+_LOG10 = {
+    "potencia": lambda a, b: (_log10_potencia(a, b), a < 0 and b % 2 == 1),
+    "quadrado": lambda a: (_log10_potencia(a, 2), False),
+    "cubo": lambda a: (_log10_potencia(a, 3), a < 0),
+    "potencia_de_dez": lambda a: (Decimal(a), False),
+    "multiplicacao": lambda a, b: (Decimal(abs(a)).log10() + Decimal(abs(b)).log10(), (a < 0) != (b < 0)),
+    "fatorial": lambda n: (_log10_fatorial(_inteiro(n)), False),
+}
+
+
+def aproximar(nome, *args, contexto=None):
+    """Resultado aproximado, calculado no espaço log, como Decimal
+
+    Tem os dígitos significativos do contexto (modo de precisão) ou
+    ``DIGITOS_APROXIMACAO``, até ``DIGITOS_MAXIMOS_APROXIMACAO``; o
+    expoente pode passar do limite de um float.
+    """
+    funcao = _LOG10.get(nome)
+    if funcao is None:
+        raise ValueError(f"Erro: Operação sem resultado aproximado: {nome}")
+    digitos = min(contexto.prec, DIGITOS_MAXIMOS_APROXIMACAO) if contexto is not None else DIGITOS_APROXIMACAO
+    estimativa = estimar(nome, *args)
+    if not estimativa.bits <= BITS_MAXIMO_DECIMAL:
+        raise ValueError("Erro: Resultado grande demais até para o resultado aproximado!")
+    digitos_expoente = len(str(estimativa.digitos))
+    if digitos_expoente >= len(str(decimal.MAX_EMAX)):
+        raise ValueError("Erro: Resultado grande demais até para o resultado aproximado!")
+    with localcontext() as c:
+        # A parte inteira do log vira o expoente e consome dígitos da precisão
+        c.prec = digitos + digitos_expoente + 10
+        c.Emax, c.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+        log10, negativo = funcao(*args)
+        expoente = int(log10.to_integral_value(rounding=decimal.ROUND_FLOOR))
+        mantissa = ((log10 - expoente) * Decimal(10).ln()).exp()
+        c.prec = digitos
+        resultado = (+mantissa).scaleb(expoente)
+        return -resultado if negativo else resultado
+
+
+def _modular_operandos(args, modulo):
+    inteiros = [_inteiro(valor) for valor in (*args, modulo)]
+    if None in inteiros:
+        raise ValueError("Erro: A forma modular só aceita operandos e módulo inteiros!")
+    if inteiros[-1] == 0:
+        raise ValueError("Erro: O módulo não pode ser zero!")
+    return inteiros
+
+
+# Nome da operação -> forma modular (operandos inteiros, módulo por último)
+_MODULARES = {
+    "potencia": pow,
+    "quadrado": lambda a, m: pow(a, 2, m),
+    "cubo": lambda a, m: pow(a, 3, m),
+    "potencia_de_dez": lambda a, m: pow(10, a, m),
+    "multiplicacao": lambda a, b, m: a * b % m,
+}
+
+
+def modular(nome, args, modulo):
+    """Calcula a operação módulo ``modulo`` sem montar o resultado inteiro"""
+    forma = _MODULARES.get(nome)
+    if forma is None:
+        raise ValueError(f"Erro: Operação sem forma modular: {nome}")
+    inteiros = _modular_operandos(args, modulo)
+    try:
+        return forma(*inteiros)
+    except ValueError:
+        # pow com expoente negativo precisa do inverso da base
+        raise ValueError("Erro: A base não tem inverso para este módulo!") from None
+    except TypeError:
+        raise ValueError(f"Erro: Número de operandos inválido para {nome}: {len(args)}") from None
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estatísticas em fluxo da calculadora
+Contagem, soma, média, variância, mínimo, máximo e quantis de uma sequência
+de qualquer tamanho, em uma única passada e com memória constante
+
+- média e variância pelo método de Welford, estável mesmo com valores
+  grandes e próximos entre si (a fórmula "média dos quadrados menos o
+  quadrado da média" perde todos os dígitos nesse caso);
+- soma compensada (Neumaier), sem o erro acumulado da soma ingênua;
+- quantis aproximados por um t-digest: os valores são agrupados em
+  centroides, pequenos nas caudas e maiores no meio, então p1 e p99 saem
+  com erro bem menor que a mediana; o número de centroides é limitado pela
+  ``compressao``, qualquer que seja o tamanho da sequência.
+
+Os resumos podem ser combinados: workers em paralelo resumem cada um a sua
+parte e o resultado de ``combinar`` é o mesmo resumo da sequência inteira
+(os quantis, aproximadamente).
+
+    >>> r = Resumo()
+    >>> r.atualizar([2, 4, 4, 4, 5, 5, 7, 9])
+    >>> r.media, r.desvio_padrao_populacional, r.mediana
+    (5.0, 2.0, 4.5)
+    >>> parte_1, parte_2 = Resumo(), Resumo()
+    >>> parte_1.atualizar([2, 4, 4, 4])
+    >>> parte_2.atualizar([5, 5, 7, 9])
+    >>> total = combinar(parte_1, parte_2)
+    >>> total.contagem, total.media, total.desvio_padrao_populacional
+    (8, 5.0, 2.0)
+"""
+
+import bisect
+import itertools
+import math
+import re
+
+# Compressão padrão do t-digest: até ~2 × 100 centroides, erro de quantil
+# da ordem de 1% no meio da distribuição e bem menor nas caudas
+COMPRESSAO_PADRAO = 100
+
+# Valores lidos por vez em ``Resumo.atualizar``
+TAMANHO_BLOCO = 4096
+
+# Quantis mostrados por ``tabela``
+QUANTIS_PADRAO = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+_SEPARADORES = re.compile(r"[\s,;]+")
+
+
+class Digesto:
+    """t-digest com fusão em lote: quantis aproximados em memória constante
+
+    Os valores novos vão para um buffer; quando ele enche, buffer e
+    centroides são ordenados juntos e fundidos de novo. O tamanho máximo de
+    cada centroide vem da função de escala k₁ (arco-seno), que deixa os
+    centroides das caudas com poucos valores.
+    """
+
+    __slots__ = ("compressao", "_medias", "_pesos", "_buffer", "_limite_buffer", "minimo", "maximo")
+
+    def __init__(self, compressao=COMPRESSAO_PADRAO):
+        if compressao < 10:
+            raise ValueError("Erro: A compressão do t-digest deve ser pelo menos 10!")
+        self.compressao = compressao
+        self._medias = []
+        self._pesos = []
+        self._buffer = []
+        self._limite_buffer = 32 * compressao
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def __len__(self):
+        """Número de valores resumidos"""
+        self._fundir()
+        return int(sum(self._pesos))
+
+    def adicionar(self, valor):
+        """Inclui um valor"""
+        self._buffer.append(valor)
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+        if len(self._buffer) >= self._limite_buffer:
+            self._fundir()
+
+    def adicionar_varios(self, valores):
+        """Inclui uma lista de valores"""
+        if not valores:
+            return
+        self.minimo = min(self.minimo, min(valores))
+        self.maximo = max(self.maximo, max(valores))
+        for inicio in range(0, len(valores), self._limite_buffer):
+            self._buffer.extend(valores[inicio:inicio + self._limite_buffer])
+            if len(self._buffer) >= self._limite_buffer:
+                self._fundir()
+
+    def _k(self, q):
+        return self.compressao / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k):
+        return (math.sin(k * 2 * math.pi / self.compressao) + 1) / 2
+
+    def _fundir(self, extras=()):
+        """Funde o buffer (e os centroides ``extras``) aos centroides
+
+        Percorre valores e centroides em ordem; cada centroide novo absorve
+        vizinhos enquanto o peso acumulado não passa do limite da função de
+        escala. As sequências de valores soltos entre dois centroides entram
+        de uma vez, por fatia, em vez de um laço por valor.
+        """
+        if not self._buffer and not extras:
+            return
+        valores = self._buffer
+        valores.sort()
+        self._buffer = []
+        centroides = sorted([*zip(self._medias, self._pesos), *extras])
+        total = len(valores) + sum(peso for _, peso in centroides)
+        quantidade = len(valores)
+
+        medias = []
+        pesos = []
+        media = peso = 0
+        acumulado = 0.0
+        limite = 0.0
+        i = j = 0
+        while i < quantidade or j < len(centroides):
+            if j < len(centroides) and (i == quantidade or centroides[j][0] <= valores[i]):
+                valor, w = centroides[j]
+                j += 1
+                if peso and acumulado + peso + w <= limite:
+                    peso += w
+                    # Média ponderada incremental, sem somar os produtos
+                    media += (valor - media) * w / peso
+                    continue
+                fim = i
+            else:
+                # Valores soltos (peso 1) até o próximo centroide
+                fim = bisect.bisect_right(valores, centroides[j][0], i) if j < len(centroides) else quantidade
+                cabem = int(limite - acumulado - peso) if peso else 0
+                if cabem > 0:
+                    fatia = valores[i:i + cabem] if i + cabem < fim else valores[i:fim]
+                    i += len(fatia)
+                    media += (math.fsum(fatia) - len(fatia) * media) / (peso + len(fatia))
+                    peso += len(fatia)
+                    continue
+                valor, w = valores[i], 1
+                i += 1
+            if peso:
+                medias.append(media)
+                pesos.append(peso)
+                acumulado += peso
+            limite = self._q(self._k(acumulado / total) + 1) * total
+            media, peso = valor, w
+        medias.append(media)
+        pesos.append(peso)
+        self._medias = medias
+        self._pesos = pesos
+
+    def quantil(self, q):
+        """Valor aproximado abaixo do qual fica a fração ``q`` dos valores"""
+        if not 0 <= q <= 1:
+            raise ValueError("Erro: O quantil deve estar entre 0 e 1!")
+        self._fundir()
+        medias, pesos = self._medias, self._pesos
+        if not medias:
+            raise ValueError("Erro: Não há valores para calcular o quantil!")
+        if len(medias) == 1 or q == 0:
+            return medias[0] if len(medias) == 1 else self.minimo
+        total = sum(pesos)
+        alvo = q * total
+        # Cada centroide representa seus valores espalhados em torno da
+        # média; entre os centros de dois vizinhos, interpolação linear
+        if alvo < pesos[0] / 2:
+            if pesos[0] == 1:
+                return medias[0]
+            return self.minimo + (medias[0] - self.minimo) * alvo / (pesos[0] / 2)
+        acumulado = pesos[0] / 2
+        for i in range(len(medias) - 1):
+            passo = (pesos[i] + pesos[i + 1]) / 2
+            if acumulado + passo > alvo:
+                # Centroides unitários são valores exatos: sem interpolar entre eles
+                if pesos[i] == 1 and alvo - acumulado < 0.5:
+                    return medias[i]
+                if pesos[i + 1] == 1 and acumulado + passo - alvo < 0.5:
+                    return medias[i + 1]
+                fracao = (alvo - acumulado) / passo
+                return medias[i] + (medias[i + 1] - medias[i]) * fracao
+            acumulado += passo
+        ultimo = pesos[-1]
+        if ultimo == 1:
+            return medias[-1]
+        restante = total - alvo
+        return self.maximo - (self.maximo - medias[-1]) * restante / (ultimo / 2)
+
+    def combinar(self, outro):
+        """Inclui os centroides de outro digesto neste"""
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._fundir(outro.centroides())
+
+    def centroides(self):
+        """Lista de (média, peso) dos centroides"""
+        self._fundir()
+        return list(zip(self._medias, self._pesos))
+
+
+class Resumo:
+    """Estatísticas de uma sequência, atualizadas valor a valor"""
+
+    __slots__ = ("contagem", "media", "_m2", "_soma", "_compensacao", "digesto")
+
+    def __init__(self, compressao=COMPRESSAO_PADRAO):
+        self.contagem = 0
+        self.media = 0.0
+        # Soma dos quadrados dos desvios em relação à média (Welford)
+        self._m2 = 0.0
+        self._soma = 0.0
+        self._compensacao = 0.0
+        self.digesto = Digesto(compressao)
+
+    def _somar(self, x):
+        # Soma de Neumaier: guarda os dígitos perdidos em cada adição
+        soma = self._soma + x
+        if abs(self._soma) >= abs(x):
+            self._compensacao += (self._soma - soma) + x
+        else:
+            self._compensacao += (x - soma) + self._soma
+        self._soma = soma
+
+    def adicionar(self, valor):
+        """Inclui um valor no resumo"""
+        x = float(valor)
+        if x != x:
+            raise ValueError("Erro: NaN não pode entrar nas estatísticas!")
+        self.contagem += 1
+        desvio = x - self.media
+        self.media += desvio / self.contagem
+        self._m2 += desvio * (x - self.media)
+        self._somar(x)
+        self.digesto.adicionar(x)
+
+    def _juntar(self, contagem, media, m2):
+        """Chan et al.: média e M2 de duas partes sem rever os valores"""
+        total = self.contagem + contagem
+        desvio = media - self.media
+        self.media += desvio * contagem / total
+        self._m2 += m2 + desvio * desvio * self.contagem * contagem / total
+        self.contagem = total
+
+    def atualizar(self, valores):
+        """Inclui todos os valores de um iterável, em uma passada
+
+        Os valores são lidos em blocos de ``TAMANHO_BLOCO``: média e M2 de
+        cada bloco (em duas passadas sobre o bloco, que está na memória) são
+        juntados ao resumo de uma vez, o que é bem mais rápido que valor a valor.
+        """
+        iterador = iter(valores)
+        while True:
+            bloco = [float(valor) for valor in itertools.islice(iterador, TAMANHO_BLOCO)]
+            if not bloco:
+                return
+            try:
+                soma = math.fsum(bloco)
+            except (OverflowError, ValueError):
+                # Soma parcial acima do maior float, ou infinitos opostos
+                soma = math.nan
+            if not math.isfinite(soma):
+                if any(x != x for x in bloco):
+                    raise ValueError("Erro: NaN não pode entrar nas estatísticas!")
+                # Com infinitos ou somas que transbordam, vale o resultado de adicionar
+                for x in bloco:
+                    self.adicionar(x)
+                continue
+            media = soma / len(bloco)
+            m2 = math.fsum((x - media) ** 2 for x in bloco)
+            self._juntar(len(bloco), media, m2)
+            self._somar(soma)
+            self.digesto.adicionar_varios(bloco)
+
+    def combinar(self, outro):
+        """Inclui neste resumo os valores resumidos em ``outro``"""
+        if not outro.contagem:
+            return
+        self._juntar(outro.contagem, outro.media, outro._m2)
+        self._somar(outro._soma)
+        self._somar(outro._compensacao)
+        self.digesto.combinar(outro.digesto)
+
+    def _exigir(self, minimo=1):
+        if self.contagem < minimo:
+            raise ValueError(f"Erro: São necessários pelo menos {minimo} valores!")
+
+    @property
+    def soma(self):
+        """Soma dos valores (compensada)"""
+        return self._soma + self._compensacao
+
+    @property
+    def variancia(self):
+        """Variância amostral (divisor n - 1)"""
+        self._exigir(2)
+        return self._m2 / (self.contagem - 1)
+
+    @property
+    def variancia_populacional(self):
+        """Variância populacional (divisor n)"""
+        self._exigir()
+        return self._m2 / self.contagem
+
+    @property
+    def desvio_padrao(self):
+        """Desvio padrão amostral"""
+        return math.sqrt(self.variancia)
+
+    @property
+    def desvio_padrao_populacional(self):
+        """Desvio padrão populacional"""
+        return math.sqrt(self.variancia_populacional)
+
+    @property
+    def minimo(self):
+        """Menor valor"""
+        self._exigir()
+        return self.digesto.minimo
+
+    @property
+    def maximo(self):
+        """Maior valor"""
+        self._exigir()
+        return self.digesto.maximo
+
+    def quantil(self, q):
+        """Quantil aproximado (0 ≤ q ≤ 1) pelo t-digest"""
+        return self.digesto.quantil(q)
+
+    @property
+    def mediana(self):
+        """Mediana aproximada"""
+        return self.quantil(0.5)
+
+    def tabela(self, quantis=QUANTIS_PADRAO):
+        """Lista de (nome, valor) com todas as estatísticas, para exibição"""
+        if not self.contagem:
+            return [("Contagem", 0)]
+        linhas = [
+            ("Contagem", self.contagem),
+            ("Soma", self.soma),
+            ("Média", self.media),
+            ("Variância", self.variancia if self.contagem > 1 else math.nan),
+            ("Desvio padrão", self.desvio_padrao if self.contagem > 1 else math.nan),
+            ("Mínimo", self.minimo),
+            ("Máximo", self.maximo),
+        ]
+        for q in quantis:
+            nome = "Mediana" if q == 0.5 else f"p{q * 100:g}"
+            linhas.append((nome, self.quantil(q)))
+        return linhas
+
+    def __repr__(self):
+        return f"Resumo(contagem={self.contagem}, media={self.media!r})"
+
+
+def combinar(*resumos):
+    """Novo resumo com os valores de todos os resumos dados"""
+    total = Resumo(max((r.digesto.compressao for r in resumos), default=COMPRESSAO_PADRAO))
+    for resumo in resumos:
+        total.combinar(resumo)
+    return total
+
+
+def ler_numeros(linhas, inicio=1):
+    """Números de linhas de texto, separados por espaços, vírgulas ou ";"
+
+    Linhas vazias e comentários (#) são ignorados; um valor que não é número
+    levanta ValueError com o número da linha (contado a partir de ``inicio``).
+    """
+    for numero, linha in enumerate(linhas, inicio):
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        for texto in _SEPARADORES.split(linha):
+            if not texto:
+                continue
+            try:
+                yield float(texto)
+            except ValueError:
+                raise ValueError(f"Erro: Linha {numero}: valor inválido: {texto!r}") from None
+
+
+def resumir(valores, compressao=COMPRESSAO_PADRAO):
+    """Resumo de um iterável de números, em uma passada"""
+    resumo = Resumo(compressao)
+    resumo.atualizar(valores)
+    return resumo
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Execução isolada de operações caras
+Operações que podem levar segundos (fatoriais grandes, potências inteiras
+enormes, precisão muito alta) rodam em processos separados, para que um
+cálculo desgovernado não trave, pelo GIL, as outras sessões do processo
+
+- ``custosa``: classifica uma chamada pelo modelo de custo (custo.py), sem
+  calcular nada; as chamadas baratas continuam rodando no próprio processo
+- ``ExecutorIsolado``: pool de workers com tempo limite por chamada,
+  cancelamento, limite de memória por worker e reciclagem dos workers
+  depois de um número de tarefas; um worker que passa do tempo limite é
+  morto e substituído
+- ``executar``: roda a operação no próprio processo ou no pool padrão,
+  devolve o resultado aproximado ou recusa a chamada, conforme o plano de
+  ``custo.planejar``; com ``modulo``, usa a forma modular
+
+Uma chamada cara e uma barata:
+
+    execucao.executar("fatorial", 50_000)   # em um worker
+    execucao.executar("adicao", 1, 2)       # 3, no próprio processo
+
+Todos os erros chegam como ``ValueError`` com as mensagens da calculadora,
+inclusive tempo limite, cancelamento e falta de memória.
+"""
+
+import atexit
+import signal
+import threading
+import time
+
+import operacoes
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+WORKERS_PADRAO = 2
+# Segundos que uma chamada pode levar antes de o worker ser morto
+TEMPO_LIMITE_PADRAO = 10.0
+# Espaço de endereçamento de cada worker (RLIMIT_AS), em bytes
+MEMORIA_MAXIMA_PADRAO = 1 << 30
+# Tarefas atendidas por um worker antes de ser substituído por um novo
+TAREFAS_POR_WORKER = 200
+
+# Intervalo entre as verificações de cancelamento, em segundos
+_FATIA_ESPERA = 0.05
+
+
+def custosa(chave, *args, contexto=None):
+    """Indica se a chamada pode demorar e deve rodar fora do processo
+
+    A estimativa vem do modelo de custo (custo.py); chamadas que ele recusa
+    não são custosas: a própria execução dá o erro.
+    """
+    import custo
+    try:
+        return custo.planejar(operacoes.obter(chave).nome, *args, contexto=contexto) == custo.ISOLADO
+    except ValueError:
+        return False
+
+
+def _calcular(chave, args, contexto):
+    if contexto is not None:
+        # Importação local: o motor Decimal só é carregado quando usado
+        import precisao
+        return precisao.executar(chave, *args, contexto=contexto)
+    return operacoes.executar(chave, *args)
+
+
+def _calcular_com_limites(chave, args, contexto, limites):
+    import custo
+    # O worker segue os limites do modelo de custo de quem fez o pedido
+    custo.configurar(limites)
+    return _calcular(chave, args, contexto)
+
+
+def _laco_worker(conexao, memoria_maxima):
+    """Atende pedidos (chave, args, contexto, limites) até receber None
+
+    Cada resposta é (sucesso, resultado ou erro, continua); com ``continua``
+    falso o worker termina depois de responder.
+    """
+    # Ctrl+C é tratado pelo processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memoria_maxima and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memoria_maxima, memoria_maxima))
+    while True:
+        try:
+            pedido = conexao.recv()
+        except EOFError:
+            return
+        if pedido is None:
+            return
+        try:
+            conexao.send((True, _calcular_com_limites(*pedido), True))
+        except MemoryError:
+            conexao.send((False, ValueError("Erro: O cálculo passou do limite de memória!"), False))
+            # O heap pode ter ficado fragmentado; o pool cria outro worker
+            return
+        except Exception as e:
+            conexao.send((False, e, True))
+
+
+class _Worker:
+    """Um processo worker e a ponta do pipe usada para falar com ele"""
+
+    def __init__(self, contexto_mp, memoria_maxima):
+        self.conexao, filho = contexto_mp.Pipe()
+        self.processo = contexto_mp.Process(target=_laco_worker, args=(filho, memoria_maxima), daemon=True)
+        self.processo.start()
+        filho.close()
+        self.tarefas = 0
+
+    def encerrar(self, forcar=False):
+        """Termina o processo; ``forcar`` o mata sem esperar a tarefa atual"""
+        if not forcar:
+            try:
+                self.conexao.send(None)
+            except OSError:
+                pass
+            self.processo.join(1)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join()
+        self.conexao.close()
+
+
+class ExecutorIsolado:
+    """Pool de processos que executa operações com tempo limite
+
+    Cada chamada ocupa um worker; com todos ocupados, a chamada espera uma
+    vaga dentro do seu próprio tempo limite. Os workers são criados sob
+    demanda e substituídos depois de ``tarefas_por_worker`` tarefas, de um
+    tempo limite, de um cancelamento ou de falta de memória.
+    """
+
+    def __init__(self, workers=WORKERS_PADRAO, tempo_limite=TEMPO_LIMITE_PADRAO,
+                 memoria_maxima=MEMORIA_MAXIMA_PADRAO, tarefas_por_worker=TAREFAS_POR_WORKER):
+        if workers < 1:
+            raise ValueError("Erro: O pool precisa de pelo menos 1 worker!")
+        self.tempo_limite = tempo_limite
+        self.memoria_maxima = memoria_maxima
+        self.tarefas_por_worker = tarefas_por_worker
+        # Importação local: multiprocessing só é carregado quando há um pool
+        import multiprocessing
+
+        # forkserver não herda as threads nem o estado do processo principal
+        metodos = multiprocessing.get_all_start_methods()
+        self._mp = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+        self._vagas = threading.BoundedSemaphore(workers)
+        self._trava = threading.Lock()
+        self._livres = []
+        self._fechado = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def _obter_worker(self):
+        with self._trava:
+            if self._fechado:
+                raise ValueError("Erro: O executor foi fechado!")
+            if self._livres:
+                return self._livres.pop()
+        return _Worker(self._mp, self.memoria_maxima)
+
+    def _devolver_worker(self, worker):
+        worker.tarefas += 1
+        with self._trava:
+            if not self._fechado and worker.tarefas < self.tarefas_por_worker:
+                self._livres.append(worker)
+                return
+        worker.encerrar()
+
+    def executar(self, chave, *args, contexto=None, tempo_limite=None, cancelado=None):
+        """Executa uma operação em um worker e devolve o resultado
+
+        ``contexto`` usa o modo de precisão; ``cancelado`` é um
+        ``threading.Event`` que, quando ativado, interrompe a chamada.
+        """
+        import custo
+        tempo_limite = self.tempo_limite if tempo_limite is None else tempo_limite
+        prazo = time.monotonic() + tempo_limite
+        if not self._vagas.acquire(timeout=tempo_limite):
+            raise ValueError("Erro: Todos os workers estão ocupados; tente novamente!")
+        try:
+            worker = self._obter_worker()
+            try:
+                worker.conexao.send((chave, args, contexto, custo.limites()))
+                while not worker.conexao.poll(min(_FATIA_ESPERA, max(prazo - time.monotonic(), 0))):
+                    if cancelado is not None and cancelado.is_set():
+                        raise ValueError("Erro: Cálculo cancelado!")
+                    if time.monotonic() >= prazo:
+                        raise ValueError(f"Erro: O cálculo passou do tempo limite de {tempo_limite:g} s!")
+                sucesso, valor, continua = worker.conexao.recv()
+            except (EOFError, OSError):
+                # O worker morreu no meio da tarefa (ex.: morto pelo sistema por falta de memória)
+                worker.encerrar(forcar=True)
+                raise ValueError("Erro: O cálculo foi interrompido; o worker terminou inesperadamente!") from None
+            except BaseException:
+                worker.encerrar(forcar=True)
+                raise
+            if continua:
+                self._devolver_worker(worker)
+            else:
+                worker.encerrar()
+        finally:
+            self._vagas.release()
+        if sucesso:
+            return valor
+        raise valor
+
+    def fechar(self):
+        """Encerra os workers livres; os ocupados terminam ao fim da tarefa"""
+        with self._trava:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+        for worker in livres:
+            worker.encerrar()
+
+
+_padrao = None
+_trava_padrao = threading.Lock()
+
+
+def padrao():
+    """Pool compartilhado pelo processo, criado no primeiro uso"""
+    global _padrao
+    with _trava_padrao:
+        if _padrao is None:
+            _padrao = ExecutorIsolado()
+            atexit.register(_padrao.fechar)
+        return _padrao
+
+
+def executar(chave, *args, contexto=None, tempo_limite=None, cancelado=None, modulo=None):
+    """Executa uma operação pelo caminho escolhido pelo modelo de custo
+
+    As operações baratas rodam no próprio processo, sem custo extra; as
+    custosas no pool padrão; acima dos limites o resultado é aproximado
+    (ou a chamada é recusada, conforme ``custo.limites()``). Com ``modulo``
+    o resultado é calculado módulo esse número, sem montar o inteiro.
+    """
+    import custo
+    nome = operacoes.obter(chave).nome
+    if modulo is not None:
+        return custo.modular(nome, args, modulo)
+    caminho = custo.planejar(nome, *args, contexto=contexto)
+    if caminho == custo.ISOLADO:
+        return padrao().executar(chave, *args, contexto=contexto, tempo_limite=tempo_limite,
+                                 cancelado=cancelado)
+    if caminho == custo.APROXIMADO:
+        return custo.aproximar(nome, *args, contexto=contexto)
+    return _calcular(chave, args, contexto)
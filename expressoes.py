@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compilador de expressões da calculadora
+Transforma textos como "sin(x)^2 + log(y, 2) / n!" em funções Python
+construídas com as operações de calculadora.py
+
+A expressão é analisada uma única vez e vira uma função com um parâmetro por
+variável; as formas compiladas ficam em um cache LRU limitado, indexado pelo
+texto da expressão, de modo que reavaliar a mesma fórmula com novos valores
+não passa mais pelo analisador.
+
+    >>> f = compilar("sin(x)^2 + log(y, 2) / n!")
+    >>> f(x=30, y=8, n=3)
+    0.75
+"""
+
+import keyword
+import math
+import re
+from functools import lru_cache
+
+import calculadora
+import operacoes
+
+TAMANHO_CACHE = 1024
+
+# Operadores binários: símbolo -> (precedência, função da calculadora)
+OPERADORES = {
+    "+": (1, calculadora.adicao),
+    "-": (1, calculadora.subtracao),
+    "*": (2, calculadora.multiplicacao),
+    "×": (2, calculadora.multiplicacao),
+    "/": (2, calculadora.divisao),
+    "÷": (2, calculadora.divisao),
+    "%": (2, calculadora.resto_divisao),
+    "//": (2, calculadora.divisao_inteira),
+}
+
+# Funções: nome -> (função da calculadora, mínimo e máximo de argumentos)
+FUNCOES = {
+    "sin": (calculadora.seno, 1, 1),
+    "sen": (calculadora.seno, 1, 1),
+    "seno": (calculadora.seno, 1, 1),
+    "cos": (calculadora.cosseno, 1, 1),
+    "cosseno": (calculadora.cosseno, 1, 1),
+    "tan": (calculadora.tangente, 1, 1),
+    "tg": (calculadora.tangente, 1, 1),
+    "tangente": (calculadora.tangente, 1, 1),
+    "sqrt": (calculadora.raiz_quadrada, 1, 1),
+    "raiz": (calculadora.raiz_quadrada, 1, 1),
+    "root": (calculadora.raiz_n_esima, 2, 2),
+    "raiz_n": (calculadora.raiz_n_esima, 2, 2),
+    "log": (calculadora.logaritmo, 1, 2),
+    "pow": (calculadora.potencia, 2, 2),
+    "mod": (calculadora.resto_divisao, 2, 2),
+    "div": (calculadora.divisao_inteira, 2, 2),
+    "fact": (calculadora.fatorial, 1, 1),
+    "fatorial": (calculadora.fatorial, 1, 1),
+}
+
+# Operações que podem ser arbitrariamente caras e por isso não são dobradas
+# durante a compilação (ex.: 9^9^9)
+_SEM_DOBRA = (calculadora.potencia, calculadora.fatorial)
+
+# Operações do registro dobradas na compilação: só as de custo limitado pelo
+# tamanho dos operandos. As demais (potencia_de_dez, quadrado, gama...) e as
+# de plugins ficam para a avaliação (ex.: potencia_de_dez(10^6))
+_OPERACOES_DOBRAVEIS = frozenset({
+    "adicao", "subtracao", "multiplicacao", "divisao", "resto_divisao", "divisao_inteira",
+    "raiz_quadrada", "raiz_n_esima", "raiz_cubica", "inverso", "exponencial",
+    "logaritmo", "logaritmo_natural", "logaritmo_decimal",
+    "seno", "cosseno", "tangente", "seno_rad", "cosseno_rad", "tangente_rad",
+    "seno_grad", "cosseno_grad", "tangente_grad", "constante_e", "constante_pi",
+})
+
+
+def _dobravel(funcao):
+    """Indica se uma chamada com argumentos constantes pode ser feita na compilação"""
+    if isinstance(funcao, operacoes.Operacao):
+        return funcao.nome in _OPERACOES_DOBRAVEIS
+    return funcao not in _SEM_DOBRA
+
+
+CONSTANTES = {
+    "pi": math.pi,
+    "π": math.pi,
+    "e": math.e,
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<numero>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<nome>[A-Za-z][A-Za-z0-9_]*|π)
+      | (?P<operador>\*\*|//|[-+*/%^!(),×÷])
+    )""", re.VERBOSE)
+
+
+class ExpressaoCompilada:
+    """Expressão já analisada, pronta para ser avaliada muitas vezes
+
+    ``funcao`` recebe as variáveis como argumentos nomeados (ou posicionais,
+    na ordem de ``variaveis``) e pode ser chamada diretamente nos laços mais
+    quentes; chamar a própria expressão traduz variáveis ausentes em
+    ValueError.
+    """
+
+    __slots__ = ("texto", "variaveis", "funcao", "codigo")
+
+    def __init__(self, texto, variaveis, funcao, codigo):
+        self.texto = texto
+        self.variaveis = variaveis
+        self.funcao = funcao
+        self.codigo = codigo
+
+    def __call__(self, *args, **variaveis):
+        try:
+            return self.funcao(*args, **variaveis)
+        except TypeError:
+            faltando = [v for v in self.variaveis[len(args):] if v not in variaveis]
+            if faltando:
+                raise ValueError(f"Erro: Variável não definida: {', '.join(faltando)}") from None
+            raise
+
+    def __repr__(self):
+        return f"ExpressaoCompilada({self.texto!r})"
+
+
+def _tokenizar(texto):
+    """Divide o texto em uma lista de tokens (tipo, valor)"""
+    tokens = []
+    posicao = 0
+    texto = texto.rstrip()
+    while posicao < len(texto):
+        encontrado = _TOKEN.match(texto, posicao)
+        if not encontrado:
+            raise ValueError(f"Erro: Caractere inválido na expressão: {texto[posicao:].strip()[0]!r}")
+        tipo = encontrado.lastgroup
+        valor = encontrado.group(tipo)
+        if valor == "**":
+            valor = "^"
+        tokens.append((tipo, valor))
+        posicao = encontrado.end()
+    tokens.append(("fim", None))
+    return tokens
+
+
+class _Analisador:
+    """Analisador descendente recursivo que gera código Python
+
+    Cada nó produz um par (código, constante); ``constante`` guarda o valor
+    já calculado quando a subexpressão não depende de variáveis.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.posicao = 0
+        self.variaveis = []
+        self.globais = {}
+
+    def _atual(self):
+        return self.tokens[self.posicao]
+
+    def _consumir(self, valor=None):
+        token = self.tokens[self.posicao]
+        if valor is not None and token[1] != valor:
+            encontrado = "fim da expressão" if token[0] == "fim" else repr(token[1])
+            raise ValueError(f"Erro: Esperado {valor!r}, encontrado {encontrado}")
+        self.posicao += 1
+        return token
+
+    def _referencia(self, funcao):
+        """Devolve o nome global pelo qual o código gerado chama a função"""
+        if isinstance(funcao, operacoes.Operacao):
+            nome = f"_op_{funcao.nome}"
+        else:
+            nome = f"_{funcao.__name__}"
+        self.globais[nome] = funcao
+        return nome
+
+    def _literal(self, valor):
+        if math.isfinite(valor):
+            return (repr(valor), valor)
+        nome = f"_c{len(self.globais)}"
+        self.globais[nome] = valor
+        return (nome, valor)
+
+    def _chamar(self, funcao, argumentos):
+        """Gera a chamada, dobrando constantes quando possível"""
+        if _dobravel(funcao) and all(constante is not None for _, constante in argumentos):
+            try:
+                return self._literal(funcao(*(constante for _, constante in argumentos)))
+            except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+                pass
+        codigo = ", ".join(codigo for codigo, _ in argumentos)
+        return (f"{self._referencia(funcao)}({codigo})", None)
+
+    def analisar(self):
+        no = self._expressao(1)
+        tipo, valor = self._atual()
+        if tipo != "fim":
+            raise ValueError(f"Erro: Token inesperado na expressão: {valor!r}")
+        return no
+
+    def _expressao(self, precedencia_minima):
+        esquerda = self._unario()
+        while True:
+            tipo, simbolo = self._atual()
+            if tipo != "operador" or simbolo not in OPERADORES:
+                return esquerda
+            precedencia, funcao = OPERADORES[simbolo]
+            if precedencia < precedencia_minima:
+                return esquerda
+            self._consumir()
+            direita = self._expressao(precedencia + 1)
+            esquerda = self._chamar(funcao, [esquerda, direita])
+
+    def _unario(self):
+        tipo, simbolo = self._atual()
+        if tipo == "operador" and simbolo in ("-", "+"):
+            self._consumir()
+            codigo, constante = self._unario()
+            if simbolo == "+":
+                return (codigo, constante)
+            if constante is not None:
+                return self._literal(-constante)
+            return (f"(-{codigo})", None)
+        return self._potencia()
+
+    def _potencia(self):
+        base = self._posfixo()
+        if self._atual() == ("operador", "^"):
+            self._consumir()
+            # Associativa à direita: 2^3^2 == 2^(3^2)
+            expoente = self._unario()
+            return self._chamar(calculadora.potencia, [base, expoente])
+        return base
+
+    def _posfixo(self):
+        no = self._primario()
+        while self._atual() == ("operador", "!"):
+            self._consumir()
+            no = self._chamar(calculadora.fatorial, [no])
+        return no
+
+    def _primario(self):
+        tipo, valor = self._consumir()
+        if tipo == "numero":
+            numero = float(valor) if any(c in valor for c in ".eE") else int(valor)
+            return self._literal(numero)
+        if tipo == "nome":
+            if self._atual() == ("operador", "("):
+                return self._funcao(valor)
+            if valor in CONSTANTES:
+                return self._literal(CONSTANTES[valor])
+            if keyword.iskeyword(valor):
+                raise ValueError(f"Erro: Nome de variável inválido: {valor!r}")
+            if valor not in self.variaveis:
+                self.variaveis.append(valor)
+            return (valor, None)
+        if valor == "(":
+            no = self._expressao(1)
+            self._consumir(")")
+            return no
+        encontrado = "fim da expressão" if tipo == "fim" else repr(valor)
+        raise ValueError(f"Erro: Token inesperado na expressão: {encontrado}")
+
+    def _funcao(self, nome):
+        if nome in FUNCOES:
+            funcao, minimo, maximo = FUNCOES[nome]
+        else:
+            # Demais operações do registro, inclusive as de plugins
+            try:
+                operacao = operacoes.obter(nome)
+            except ValueError:
+                raise ValueError(f"Erro: Função desconhecida: {nome!r}") from None
+            funcao, maximo = operacao, operacao.aridade
+            minimo = maximo - len(operacao.padroes)
+        self._consumir("(")
+        argumentos = []
+        if self._atual() != ("operador", ")"):
+            argumentos.append(self._expressao(1))
+            while self._atual() == ("operador", ","):
+                self._consumir()
+                argumentos.append(self._expressao(1))
+        self._consumir(")")
+        if not minimo <= len(argumentos) <= maximo:
+            raise ValueError(f"Erro: {nome}() recebe entre {minimo} e {maximo} argumentos, recebeu {len(argumentos)}")
+        return self._chamar(funcao, argumentos)
+
+
+def _montar(texto, analisador, codigo, globais):
+    variaveis = tuple(analisador.variaveis)
+    fonte = f"lambda {', '.join(variaveis)}: {codigo}"
+    funcao = eval(compile(fonte, f"<expressão {texto!r}>", "eval"), globais)
+    return ExpressaoCompilada(texto, variaveis, funcao, fonte)
+
+
+def _compilar(texto):
+    """Analisa e compila uma expressão, sem passar pelo cache"""
+    analisador = _Analisador(_tokenizar(texto))
+    codigo, _ = analisador.analisar()
+    return _montar(texto, analisador, codigo, analisador.globais)
+
+
+_compilar_em_cache = lru_cache(maxsize=TAMANHO_CACHE)(_compilar)
+
+
+def compilar(texto):
+    """Compila uma expressão, reaproveitando a forma compilada do cache"""
+    return _compilar_em_cache(texto)
+
+
+def avaliar(texto, **variaveis):
+    """Avalia uma expressão com os valores de variáveis informados"""
+    return _compilar_em_cache(texto)(**variaveis)
+
+
+def compilar_vetorial(texto, erros="levantar"):
+    """Compila uma expressão cujas variáveis são arrays inteiros
+
+    O código gerado é o mesmo da forma escalar, mas cada operação chama a
+    versão de calculadora_vetorial.py (com o modo ``erros`` dela), então a
+    expressão é avaliada sobre arrays NumPy sem um objeto Python por
+    elemento. As subexpressões constantes continuam dobradas na compilação.
+    """
+    # Importação local: o NumPy só é carregado por quem avalia arrays
+    from functools import partial
+
+    import calculadora_vetorial
+
+    analisador = _Analisador(_tokenizar(texto))
+    codigo, _ = analisador.analisar()
+    globais = {}
+    for nome, valor in analisador.globais.items():
+        if callable(valor):
+            operacao = valor.nome if isinstance(valor, operacoes.Operacao) else valor.__name__
+            vetorizada = getattr(calculadora_vetorial, operacao, None)
+            if vetorizada is None:
+                raise ValueError(f"Erro: Operação sem versão vetorizada: {operacao!r}")
+            valor = partial(vetorizada, erros=erros)
+        globais[nome] = valor
+    return _montar(texto, analisador, codigo, globais)
+
+
+def definir_tamanho_cache(tamanho):
+    """Redimensiona o cache de expressões compiladas (descarta o conteúdo atual)"""
+    global _compilar_em_cache
+    _compilar_em_cache = lru_cache(maxsize=tamanho)(_compilar)
+
+
+def limpar_cache():
+    """Descarta todas as expressões compiladas"""
+    _compilar_em_cache.cache_clear()
+
+
+def info_cache():
+    """Devolve acertos, falhas, tamanho máximo e tamanho atual do cache"""
+    return _compilar_em_cache.cache_info()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fatorial e função gama da calculadora
+Subsistema único usado pela CLI e pela interface Streamlit
+
+- ``fatorial_float``: tabela pré-calculada até 170! (o maior que cabe em
+  float), infinito acima disso e gama para não inteiros
+- ``fatorial_exato``: resultado inteiro exato via ``math.factorial``
+  (divisão e conquista em C), limitado a ``LIMITE_EXATO``
+- ``log_fatorial``: logaritmo natural do fatorial via ``lgamma`` ou Stirling,
+  para qualquer tamanho de n
+
+Todas as funções respondem em tempo limitado, qualquer que seja n.
+"""
+
+import math
+
+# Maior n cujo fatorial cabe em float64
+MAIOR_FATORIAL_FLOAT = 170
+
+# Acima deste n o fatorial exato leva mais de alguns décimos de segundo
+LIMITE_EXATO = 100_000
+
+TABELA_FATORIAL = tuple(float(math.factorial(i)) for i in range(MAIOR_FATORIAL_FLOAT + 1))
+
+
+def inteiro_ou_none(n):
+    """Devolve n como int se ele for um inteiro (inclusive float como 5.0)"""
+    if isinstance(n, int):
+        return n
+    if isinstance(n, float) and n.is_integer():
+        return int(n)
+    return None
+
+
+def gama(x):
+    """Calcula a função gama de x"""
+    if isinstance(x, float) and math.isnan(x):
+        return x
+    if x <= 0 and inteiro_ou_none(x) is not None:
+        raise ValueError("Erro: Função gama não é definida para inteiros não positivos!")
+    try:
+        return math.gamma(x)
+    except OverflowError:
+        return math.inf
+    except ValueError:
+        raise ValueError("Erro: Função gama não é definida para este valor!") from None
+
+
+def fatorial_exato(n):
+    """Calcula o fatorial exato (int) de um inteiro não negativo"""
+    inteiro = inteiro_ou_none(n)
+    if inteiro is None:
+        raise ValueError("Erro: Fatorial só é definido para números inteiros!")
+    if inteiro < 0:
+        raise ValueError("Erro: Fatorial não é definido para números negativos!")
+    if inteiro > LIMITE_EXATO:
+        raise ValueError(
+            f"Erro: Fatorial exato limitado a n ≤ {LIMITE_EXATO}; use o log do fatorial para valores maiores!"
+        )
+    return math.factorial(inteiro)
+
+
+def fatorial_float(n):
+    """Calcula n! como float; para n não inteiro usa gama(n + 1)"""
+    inteiro = inteiro_ou_none(n)
+    if inteiro is None:
+        return gama(n + 1)
+    if inteiro < 0:
+        raise ValueError("Erro: Fatorial não é definido para números negativos!")
+    if inteiro > MAIOR_FATORIAL_FLOAT:
+        return math.inf
+    return TABELA_FATORIAL[inteiro]
+
+
+def log_fatorial(n):
+    """Calcula o logaritmo natural de n!, para n de qualquer tamanho"""
+    inteiro = inteiro_ou_none(n)
+    if inteiro is not None and inteiro < 0:
+        raise ValueError("Erro: Fatorial não é definido para números negativos!")
+    if inteiro is None or inteiro < 2 ** 53:
+        return math.lgamma(n + 1)
+    # Stirling: para n tão grande os termos seguintes somem em float
+    try:
+        return inteiro * math.log(inteiro) - inteiro + 0.5 * math.log(2 * math.pi * inteiro)
+    except OverflowError:
+        return math.inf
+
+
+def log10_fatorial(n):
+    """Calcula o logaritmo na base 10 de n!"""
+    return log_fatorial(n) / math.log(10)
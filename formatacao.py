@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formatação de números da calculadora
+Converte resultados (int, float ou Decimal) em texto para o display, para
+relatórios e para exportação
+
+Modos, todos com um orçamento de algarismos significativos (``digitos``):
+
+- ``"auto"``: notação fixa ou científica, a que for mais curta (como ``%g``)
+- ``"fixo"``: sempre notação fixa ("1234.568")
+- ``"cientifico"``: mantissa e expoente ("1.235e+03")
+- ``"engenharia"``: expoente múltiplo de 3 ("1.235e+03", "12.35e-06")
+
+Com ``localidade="pt_BR"`` a vírgula é o separador decimal e o ponto separa
+os milhares ("1.234,568"). NaN, infinito e -0.0 têm representação própria:
+"NaN", "Infinity"/"-Infinity" e "0" (o sinal do zero é descartado).
+
+Cada número vira texto uma única vez: o formato é escolhido antes, a partir
+do expoente, em vez de formatar, medir e formatar de novo. Para muitos
+valores, ``formatador`` monta a função de formatação uma vez e
+``formatar_lote`` a aplica a uma sequência ou array inteiro; com
+``separador`` o lote vira um único texto e a troca de separadores do pt-BR
+é feita uma vez, no texto todo.
+"""
+
+import decimal
+import math
+from decimal import Decimal
+
+MODOS = ("auto", "fixo", "cientifico", "engenharia")
+LOCALIDADES = ("C", "pt_BR")
+
+DIGITOS_PADRAO = 10
+
+# Largura do display da interface Streamlit
+LARGURA_DISPLAY = 12
+
+NAN = "NaN"
+INFINITO = "Infinity"
+
+# Inteiros acima deste tamanho (em bits) passam perto do limite de dígitos da
+# conversão int -> str (4300 por padrão) e são convertidos através de Decimal
+MAIOR_INTEIRO_TEXTO = 10_000
+
+_PT_BR = str.maketrans({".": ",", ",": "."})
+
+# Contexto sem limite de expoente, para normalizar qualquer Decimal
+_SEM_LIMITE = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def texto_inteiro(valor):
+    """``str(valor)`` para inteiros de qualquer tamanho"""
+    if valor.bit_length() > MAIOR_INTEIRO_TEXTO:
+        # Decimal converte inteiros sem o limite de dígitos
+        return str(Decimal(valor))
+    return str(valor)
+
+
+def expoente(valor):
+    """Expoente decimal de um número não nulo e finito (floor(log10|valor|))"""
+    if isinstance(valor, Decimal):
+        return valor.adjusted()
+    absoluto = abs(valor)
+    e = math.floor(math.log10(absoluto))
+    if isinstance(valor, int):
+        # Inteiros grandes passam do maior float: a correção é feita em inteiros
+        if 10 ** e > absoluto:
+            return e - 1
+        if 10 ** (e + 1) <= absoluto:
+            return e + 1
+        return e
+    # log10 pode errar por 1 perto das potências de 10
+    if 10.0 ** e > absoluto:
+        return e - 1
+    if e < 308 and 10.0 ** (e + 1) <= absoluto:
+        return e + 1
+    return e
+
+
+def _especial(valor):
+    """Texto de NaN e infinitos, ou None para valores finitos"""
+    if isinstance(valor, float):
+        if valor - valor == 0:
+            return None
+        if valor != valor:
+            return NAN
+    elif isinstance(valor, Decimal):
+        if valor.is_finite():
+            return None
+        if valor.is_nan():
+            return NAN
+    else:
+        return None
+    return INFINITO if valor > 0 else f"-{INFINITO}"
+
+
+def _fixo(valor, digitos, agrupar):
+    milhar = "," if agrupar else ""
+    if isinstance(valor, int):
+        if valor.bit_length() > MAIOR_INTEIRO_TEXTO:
+            # Decimal formata inteiros sem o limite de dígitos
+            return format(Decimal(valor), milhar + "f")
+        return format(valor, milhar + "d")
+    if not valor:
+        return "0"
+    decimais = max(digitos - 1 - expoente(valor), 0)
+    texto = format(valor, f"{milhar}.{decimais}f")
+    if decimais:
+        texto = texto.rstrip("0").rstrip(".")
+    return texto
+
+
+def _cientifico(valor, digitos):
+    if isinstance(valor, int):
+        # Inteiros grandes podem não caber em float
+        valor = Decimal(valor)
+    if not valor:
+        # O expoente de Decimal(0) formatado seria a própria precisão ("0e+09")
+        return "0e+00"
+    mantissa, _, exp = format(valor, f".{digitos - 1}e").partition("e")
+    if "." in mantissa:
+        mantissa = mantissa.rstrip("0").rstrip(".")
+    # Decimal escreve o expoente sem zeros à esquerda ("e+6"); float usa dois dígitos
+    return f"{mantissa}e{int(exp):+03d}"
+
+
+def _engenharia(valor, digitos):
+    if isinstance(valor, int):
+        valor = Decimal(valor)
+    if not valor:
+        return "0e+00"
+    e = expoente(valor)
+    e3 = e - e % 3
+    decimais = max(digitos - 1 - (e - e3), 0)
+    mantissa = valor.scaleb(-e3) if isinstance(valor, Decimal) else valor / 10.0 ** e3
+    texto = format(mantissa, f".{decimais}f")
+    # O arredondamento pode levar a mantissa a 1000 (999.96 -> 1000.0)
+    if texto.lstrip("-").startswith("1000"):
+        e3 += 3
+        mantissa = valor.scaleb(-e3) if isinstance(valor, Decimal) else valor / 10.0 ** e3
+        texto = format(mantissa, f".{max(digitos - 1, 0)}f")
+    if "." in texto:
+        texto = texto.rstrip("0").rstrip(".")
+    sinal = "-" if e3 < 0 else "+"
+    return f"{texto}e{sinal}{abs(e3):02d}"
+
+
+def _auto(valor, digitos, agrupar):
+    if isinstance(valor, float):
+        return format(valor, f"{',' if agrupar else ''}.{digitos}g")
+    if isinstance(valor, int) and abs(valor) < 10 ** digitos:
+        return format(valor, "," if agrupar else "d")
+    # Inteiros grandes e Decimal: mesma regra do %g, com as funções acima
+    if not valor:
+        return "0"
+    if -4 <= expoente(valor) < digitos:
+        return _fixo(valor, digitos, agrupar)
+    return _cientifico(valor, digitos)
+
+
+def formatador(modo="auto", digitos=DIGITOS_PADRAO, localidade="C", agrupar=None):
+    """Monta uma função que formata um número com as opções dadas
+
+    ``agrupar`` separa os milhares na notação fixa; por padrão só no pt-BR.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Erro: Modo de formatação desconhecido: {modo!r}")
+    if localidade not in LOCALIDADES:
+        raise ValueError(f"Erro: Localidade desconhecida: {localidade!r}")
+    if digitos < 1:
+        raise ValueError("Erro: São necessários pelo menos 1 algarismo significativo!")
+    if agrupar is None:
+        agrupar = localidade == "pt_BR"
+
+    if modo == "fixo":
+        def formatar_finito(valor):
+            return _fixo(valor, digitos, agrupar)
+    elif modo == "cientifico":
+        def formatar_finito(valor):
+            return _cientifico(valor, digitos)
+    elif modo == "engenharia":
+        def formatar_finito(valor):
+            return _engenharia(valor, digitos)
+    else:
+        especificacao = f"{',' if agrupar else ''}.{digitos}g"
+
+        def formatar_finito(valor):
+            if valor.__class__ is float:
+                return format(valor, especificacao)
+            return _auto(valor, digitos, agrupar)
+
+    def formatar_valor(valor):
+        # Caminho rápido: float finito e não nulo
+        if valor.__class__ is float and valor - valor == 0 and valor:
+            return formatar_finito(valor)
+        especial = _especial(valor)
+        if especial is not None:
+            return especial
+        if valor == 0:
+            # Descarta o sinal de -0.0
+            valor = abs(valor)
+        return formatar_finito(valor)
+
+    if localidade == "pt_BR":
+        def formatar_local(valor):
+            return formatar_valor(valor).translate(_PT_BR)
+        formatar_local.lote = formatar_valor
+        return formatar_local
+    formatar_valor.lote = formatar_valor
+    return formatar_valor
+
+
+def formatar(valor, modo="auto", digitos=DIGITOS_PADRAO, localidade="C", agrupar=None):
+    """Formata um número; veja ``formatador`` para as opções"""
+    return formatador(modo, digitos, localidade, agrupar)(valor)
+
+
+def formatar_lote(valores, modo="auto", digitos=DIGITOS_PADRAO, localidade="C", agrupar=None,
+                  separador=None):
+    """Formata uma sequência ou array de números de uma vez
+
+    Devolve uma lista de textos ou, com ``separador``, um único texto com os
+    valores separados por ele (pronto para exportar uma coluna).
+    """
+    funcao = formatador(modo, digitos, localidade, agrupar)
+    if hasattr(valores, "tolist"):
+        # Arrays NumPy: tolist converte todos os elementos para float de uma vez
+        valores = valores.tolist()
+    if separador is None:
+        return list(map(funcao, valores))
+    texto = separador.join(map(funcao.lote, valores))
+    if localidade == "pt_BR":
+        texto = texto.translate(_PT_BR)
+    return texto
+
+
+def formatar_display(valor, largura=LARGURA_DISPLAY, precisao=0):
+    """Formata um resultado para o display da calculadora
+
+    Floats usam a representação mais curta (``repr``) quando ela cabe em
+    ``largura`` caracteres; senão, o maior número de casas que cabe, em
+    notação fixa ou científica. NaN aparece como "Error". Decimals (modo de
+    precisão) são mostrados com todos os dígitos em notação fixa se o
+    expoente for menor que ``precisao``.
+    """
+    if valor.__class__ is float:
+        if valor - valor == 0:
+            # "valor or 0.0" troca -0.0 por 0.0
+            texto = repr(valor or 0.0)
+            if len(texto) <= largura:
+                return texto
+            return _display_float(valor, texto, largura)
+        if valor != valor:
+            return "Error"
+        return INFINITO if valor > 0 else f"-{INFINITO}"
+    if isinstance(valor, int):
+        if valor.bit_length() > MAIOR_INTEIRO_TEXTO:
+            # Inteiros enormes (ex.: 5000!) passam do limite de dígitos de str()
+            return _display_cientifico(Decimal(valor), expoente(valor), largura)
+        texto = str(valor)
+        if len(texto) <= largura:
+            return texto
+        return _display_cientifico(Decimal(valor), len(texto) - 1 - (valor < 0), largura)
+    if isinstance(valor, Decimal):
+        if not valor.is_finite():
+            return "Error" if valor.is_nan() else _especial(valor)
+        contexto = decimal.getcontext()
+        # Resultados aproximados (custo.py) podem passar do expoente do contexto
+        valor = valor.normalize(None if contexto.Emin <= valor.adjusted() <= contexto.Emax else _SEM_LIMITE)
+        if not valor:
+            return "0"
+        if -precisao < valor.adjusted() < precisao:
+            return format(valor, "f")
+        texto = str(valor)
+        if precisao or len(texto) <= largura:
+            return texto
+        return _display_cientifico(valor, valor.adjusted(), largura)
+    return formatar_display(float(valor), largura)
+
+
+def _display_float(valor, texto, largura):
+    # O repr já diz a notação: sem "e" o valor está entre 1e-4 e 1e16 e
+    # cabe em notação fixa se a parte inteira couber
+    ponto = texto.find(".")
+    if "e" not in texto:
+        if ponto <= largura:
+            # Sem casas decimais o ponto também sai
+            decimais = max(largura - ponto - 1, 0)
+            fixo = f"{valor:.{decimais}f}"
+            # O arredondamento pode ganhar um dígito (9.99... -> 10.0...)
+            if len(fixo) <= largura:
+                return fixo
+            if decimais:
+                return f"{valor:.{decimais - 1}f}"
+        e = ponto - (valor < 0) - 1
+    else:
+        e = int(texto[texto.index("e") + 1:])
+    return _display_cientifico(valor, e, largura)
+
+
+def _display_cientifico(valor, e, largura):
+    # Sinal, "d.", "e", sinal do expoente e pelo menos 2 dígitos de expoente
+    decimais = largura - (valor < 0) - 2 - 2 - max(len(str(abs(e))), 2)
+    return f"{valor:.{max(decimais, 0)}e}"
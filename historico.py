@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico de cálculos da calculadora
+Registros estruturados (operação, operandos, resultado, momento e sessão)
+usados pela CLI e pela interface Streamlit
+
+- ``Historico``: os últimos registros em um buffer circular (deque com
+  tamanho máximo), opcionalmente ligado a um armazém persistente
+- ``ArmazemSQLite``: arquivo SQLite só de inclusão, com índices por momento,
+  operação e sessão; as buscas percorrem o arquivo página a página, então
+  meses de histórico podem ser consultados sem carregá-los na memória
+
+    armazem = historico.ArmazemSQLite(historico.caminho_padrao())
+    h = historico.Historico(armazem)
+    h.registrar("divisao", (10, 4), 2.5, "10 ÷ 4")
+    for registro in armazem.buscar(operacao="divisao", desde=ontem):
+        print(registro)
+"""
+
+import collections
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+import formatacao
+
+# Variável de ambiente que define o arquivo do histórico
+VARIAVEL_CAMINHO = "CALCULADORA_HISTORICO"
+
+CAPACIDADE_PADRAO = 10
+TAMANHO_PAGINA = 100
+
+
+def texto_resultado(valor):
+    """Texto de um resultado, inclusive inteiros de qualquer tamanho"""
+    if isinstance(valor, int):
+        return formatacao.texto_inteiro(valor)
+    return str(valor)
+
+
+@dataclasses.dataclass(frozen=True)
+class Registro:
+    """Um cálculo do histórico
+
+    ``momento`` é um timestamp Unix; ``descricao`` é o texto exibido
+    ("10 ÷ 4"), montado pela operação do registro.
+    """
+
+    operacao: str
+    operandos: tuple
+    resultado: object
+    descricao: str
+    momento: float
+    sessao: str
+    id: int = None
+
+    def __str__(self):
+        return f"{self.descricao} = {texto_resultado(self.resultado)}"
+
+
+def nova_sessao():
+    """Gera um identificador de sessão"""
+    return uuid.uuid4().hex
+
+
+def caminho_padrao():
+    """Arquivo do histórico: $CALCULADORA_HISTORICO ou ~/.calculadora/historico.sqlite3"""
+    caminho = os.environ.get(VARIAVEL_CAMINHO)
+    if caminho:
+        return caminho
+    return os.path.join(os.path.expanduser("~"), ".calculadora", "historico.sqlite3")
+
+
+# Decimal e complexos não existem em JSON e inteiros enormes (fatoriais
+# exatos) passam do limite de dígitos da conversão para texto; são guardados
+# como objetos. Outros valores sem representação em JSON viram texto
+def _codificar(valor):
+    if isinstance(valor, Decimal):
+        return {"decimal": str(valor)}
+    if isinstance(valor, complex):
+        return {"complexo": [valor.real, valor.imag]}
+    if isinstance(valor, int) and valor.bit_length() > formatacao.MAIOR_INTEIRO_TEXTO:
+        return {"hex": hex(valor)}
+    if isinstance(valor, (list, tuple)):
+        return [_codificar(v) for v in valor]
+    return valor
+
+
+def _decodificar(objeto):
+    if isinstance(objeto, dict) and "decimal" in objeto:
+        return Decimal(objeto["decimal"])
+    if isinstance(objeto, dict) and "hex" in objeto:
+        return int(objeto["hex"], 16)
+    if isinstance(objeto, dict) and "complexo" in objeto:
+        return complex(*objeto["complexo"])
+    return objeto
+
+
+def _para_json(valor):
+    return json.dumps(_codificar(valor), ensure_ascii=False, default=str)
+
+
+def _de_json(texto):
+    return json.loads(texto, object_hook=_decodificar)
+
+
+class ArmazemSQLite:
+    """Histórico persistente em um arquivo SQLite, só de inclusão"""
+
+    _ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS registros (
+            id INTEGER PRIMARY KEY,
+            momento REAL NOT NULL,
+            sessao TEXT NOT NULL,
+            operacao TEXT NOT NULL,
+            operandos TEXT NOT NULL,
+            resultado TEXT NOT NULL,
+            descricao TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS registros_momento ON registros (momento);
+        CREATE INDEX IF NOT EXISTS registros_operacao ON registros (operacao, momento);
+        CREATE INDEX IF NOT EXISTS registros_sessao ON registros (sessao, momento);
+    """
+
+    def __init__(self, caminho=":memory:"):
+        if caminho != ":memory:":
+            diretorio = os.path.dirname(os.path.abspath(caminho))
+            os.makedirs(diretorio, exist_ok=True)
+        self.caminho = caminho
+        # A interface Streamlit atende cada sessão em uma thread diferente
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.Lock()
+        with self._trava:
+            # WAL: leitores não bloqueiam a escrita; NORMAL evita um fsync por registro
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("PRAGMA synchronous=NORMAL")
+            self._conexao.executescript(self._ESQUEMA)
+
+    def fechar(self):
+        """Fecha o arquivo"""
+        with self._trava:
+            self._conexao.close()
+
+    def adicionar(self, registro):
+        """Inclui um registro e devolve seu id"""
+        with self._trava, self._conexao:
+            cursor = self._conexao.execute(
+                "INSERT INTO registros (momento, sessao, operacao, operandos, resultado, descricao)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (registro.momento, registro.sessao, registro.operacao,
+                 _para_json(registro.operandos), _para_json(registro.resultado), registro.descricao),
+            )
+            return cursor.lastrowid
+
+    @staticmethod
+    def _filtros(operacao, sessao, desde, ate, texto):
+        condicoes, parametros = [], []
+        if operacao is not None:
+            condicoes.append("operacao = ?")
+            parametros.append(operacao)
+        if sessao is not None:
+            condicoes.append("sessao = ?")
+            parametros.append(sessao)
+        if desde is not None:
+            condicoes.append("momento >= ?")
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append("momento < ?")
+            parametros.append(ate)
+        if texto:
+            condicoes.append("descricao LIKE ? ESCAPE '\\'")
+            escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            parametros.append(f"%{escapado}%")
+        return condicoes, parametros
+
+    def pagina(self, operacao=None, sessao=None, desde=None, ate=None, texto=None,
+               apos=None, tamanho=TAMANHO_PAGINA):
+        """Devolve uma página de registros, do mais recente ao mais antigo
+
+        Retorna ``(registros, cursor)``; passe ``cursor`` em ``apos`` para
+        obter a página seguinte. O cursor é None na última página. A
+        paginação continua de onde parou (momento, id) em vez de usar
+        OFFSET, então o custo de uma página não cresce com o histórico.
+        """
+        condicoes, parametros = self._filtros(operacao, sessao, desde, ate, texto)
+        if apos is not None:
+            condicoes.append("(momento, id) < (?, ?)")
+            parametros.extend(apos)
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT id, momento, sessao, operacao, operandos, resultado, descricao"
+                f" FROM registros {onde} ORDER BY momento DESC, id DESC LIMIT ?",
+                (*parametros, tamanho),
+            ).fetchall()
+        registros = [
+            Registro(operacao, tuple(_de_json(operandos)), _de_json(resultado), descricao,
+                     momento, sessao, id)
+            for id, momento, sessao, operacao, operandos, resultado, descricao in linhas
+        ]
+        cursor = (registros[-1].momento, registros[-1].id) if len(registros) == tamanho else None
+        return registros, cursor
+
+    def buscar(self, operacao=None, sessao=None, desde=None, ate=None, texto=None,
+               tamanho_pagina=TAMANHO_PAGINA):
+        """Percorre os registros que atendem aos filtros, do mais recente ao mais antigo
+
+        ``desde`` e ``ate`` são timestamps Unix; ``texto`` procura na
+        descrição. Só uma página fica na memória de cada vez.
+        """
+        apos = None
+        while True:
+            registros, apos = self.pagina(operacao, sessao, desde, ate, texto, apos, tamanho_pagina)
+            yield from registros
+            if apos is None:
+                return
+
+    def contar(self, operacao=None, sessao=None, desde=None, ate=None, texto=None):
+        """Conta os registros que atendem aos filtros"""
+        condicoes, parametros = self._filtros(operacao, sessao, desde, ate, texto)
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self._trava:
+            return self._conexao.execute(f"SELECT COUNT(*) FROM registros {onde}", parametros).fetchone()[0]
+
+    def operacoes(self, sessao=None):
+        """Lista as operações presentes no histórico (de uma sessão, se dada)"""
+        condicoes, parametros = self._filtros(None, sessao, None, None, None)
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self._trava:
+            linhas = self._conexao.execute(
+                f"SELECT DISTINCT operacao FROM registros {onde} ORDER BY operacao", parametros)
+            return [operacao for operacao, in linhas]
+
+
+class Historico:
+    """Últimos cálculos de uma sessão, com persistência opcional
+
+    Os ``capacidade`` registros mais recentes ficam em um buffer circular;
+    com um ``armazem`` cada registro também é gravado nele.
+    """
+
+    def __init__(self, armazem=None, capacidade=CAPACIDADE_PADRAO, sessao=None):
+        self.armazem = armazem
+        self.sessao = sessao or nova_sessao()
+        self._recentes = collections.deque(maxlen=capacidade)
+
+    def __len__(self):
+        return len(self._recentes)
+
+    def __iter__(self):
+        return iter(self._recentes)
+
+    def registrar(self, operacao, operandos, resultado, descricao):
+        """Guarda um cálculo e devolve o registro"""
+        registro = Registro(operacao, tuple(operandos), resultado, descricao, time.time(), self.sessao)
+        if self.armazem is not None:
+            registro = dataclasses.replace(registro, id=self.armazem.adicionar(registro))
+        self._recentes.append(registro)
+        return registro
+
+    def recentes(self, quantidade=None):
+        """Devolve os registros mais recentes do buffer, do mais antigo ao mais novo"""
+        if quantidade is None or quantidade >= len(self._recentes):
+            return list(self._recentes)
+        return list(self._recentes)[-quantidade:]
+
+    def limpar(self):
+        """Esvazia o buffer; o armazém persistente não é alterado"""
+        self._recentes.clear()
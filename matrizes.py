@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Matrizes e vetores da calculadora
+Operações elemento a elemento com as operações do registro, produto de
+matrizes, determinante, inversa, sistemas lineares e normas
+
+Matrizes são listas de linhas e vetores são listas de números; os
+elementos são tratados como float, como no menu da calculadora. Matrizes
+pequenas (o caso comum: 2×2, 3×3) são calculadas em Python puro, sem o
+custo de converter para o NumPy; acima de ``LIMITE_PURO`` operações o cálculo
+vai para o NumPy, que usa o BLAS/LAPACK instalado, e o resultado volta
+como lista. Arrays NumPy na entrada sempre usam o NumPy e dão arrays.
+Sem o NumPy instalado tudo roda em Python puro (exceto a norma 2 de
+matrizes, que precisa dos valores singulares).
+
+    >>> a = ler("2 1; 1 3")
+    >>> produto(a, [1, 2])
+    [4.0, 7.0]
+    >>> determinante(a)
+    5.0
+    >>> resolver(a, [4, 7])
+    [1.0, 2.0]
+    >>> elementos("√", [[4, 9], [16, 25]])
+    [[2.0, 3.0], [4.0, 5.0]]
+
+Os erros seguem a calculadora: ``elementos`` levanta o mesmo ValueError da
+operação escalar, e matrizes singulares ou de dimensões incompatíveis
+também dão ValueError.
+"""
+
+import math
+import operator
+import re
+
+import formatacao
+import operacoes
+
+# Operações escalares (ex.: m·k·n multiplicações no produto) até as quais o
+# Python puro é mais rápido que converter as listas para o NumPy e de volta:
+# produto, determinante e sistemas até 3×3
+LIMITE_PURO = 32
+# Elementos até os quais as operações elemento a elemento ficam no Python puro
+LIMITE_ELEMENTOS = 32
+
+# Maior matriz de inteiros com determinante exato, sem o arredondamento do LAPACK
+DIMENSAO_EXATA = 8
+# Inteiros exatos em float64
+_MAIOR_INTEIRO_EXATO = 2 ** 53
+
+_LINHAS = re.compile(r"[;\n]")
+_SEPARADORES = re.compile(r"[\s,]+")
+
+
+def _numpy(custo):
+    """O NumPy, quando o tamanho compensa e ele está instalado"""
+    if custo <= LIMITE_PURO:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _vetorizada(nome):
+    """Versão vetorizada da operação em calculadora_vetorial, se houver"""
+    try:
+        import calculadora_vetorial
+    except ImportError:
+        return None
+    return getattr(calculadora_vetorial, nome, None)
+
+
+def _e_array(valor):
+    return type(valor).__module__ == "numpy" and hasattr(valor, "shape")
+
+
+def _normalizar(valor):
+    """Vetor (lista de floats) ou matriz (lista de linhas de floats)"""
+    try:
+        linhas = list(valor)
+    except TypeError:
+        raise ValueError(f"Erro: Esperava um vetor ou uma matriz: {valor!r}") from None
+    if not linhas:
+        raise ValueError("Erro: A matriz está vazia!")
+    try:
+        if not isinstance(linhas[0], (str, bytes)) and hasattr(linhas[0], "__iter__"):
+            matriz = [list(map(float, linha)) for linha in linhas]
+            colunas = len(matriz[0])
+            if not colunas:
+                raise ValueError("Erro: A matriz está vazia!")
+            if any(len(linha) != colunas for linha in matriz):
+                raise ValueError("Erro: Todas as linhas da matriz devem ter o mesmo tamanho!")
+            return matriz
+        return list(map(float, linhas))
+    except TypeError:
+        raise ValueError(f"Erro: Esperava um vetor ou uma matriz: {valor!r}") from None
+
+
+def _e_matriz(valor):
+    return isinstance(valor[0], list)
+
+
+def _forma(valor):
+    if _e_array(valor):
+        return valor.shape
+    return (len(valor), len(valor[0])) if _e_matriz(valor) else (len(valor),)
+
+
+def _descrever_forma(forma):
+    return "×".join(map(str, forma)) or "escalar"
+
+
+def _incompativeis(a, b):
+    return ValueError(f"Erro: Dimensões incompatíveis: {_descrever_forma(a)} e {_descrever_forma(b)}!")
+
+
+def _quadrada(valor):
+    forma = _forma(valor)
+    if len(forma) != 2 or forma[0] != forma[1]:
+        raise ValueError(f"Erro: A matriz precisa ser quadrada, não {_descrever_forma(forma)}!")
+    return forma[0]
+
+
+def _singular():
+    return ValueError("Erro: A matriz é singular (determinante zero)!")
+
+
+def ler(texto):
+    """Lê uma matriz de texto: linhas separadas por ";" ou quebra de linha
+
+    Os números de cada linha são separados por espaços ou vírgulas. Uma
+    única linha dá um vetor.
+    """
+    linhas = []
+    for numero, linha in enumerate(_LINHAS.split(texto), 1):
+        linha = linha.strip().strip("[]")
+        if not linha:
+            continue
+        try:
+            linhas.append([float(x) for x in _SEPARADORES.split(linha) if x])
+        except ValueError:
+            raise ValueError(f"Erro: Linha {numero} da matriz: valor inválido!") from None
+    if not linhas:
+        raise ValueError("Erro: A matriz está vazia!")
+    return _normalizar(linhas[0] if len(linhas) == 1 else linhas)
+
+
+def formatar(valor, precisao=0):
+    """Texto da matriz ou do vetor, com as colunas alinhadas pela direita"""
+    if isinstance(valor, (int, float)):
+        return formatacao.formatar_display(valor, precisao=precisao)
+    if _e_array(valor):
+        valor = valor.tolist()
+    linhas = valor if isinstance(valor[0], list) else [valor]
+    textos = [[formatacao.formatar_display(x, precisao=precisao) for x in linha] for linha in linhas]
+    larguras = [max(map(len, coluna)) for coluna in zip(*textos)]
+    return "\n".join("  ".join(t.rjust(l) for t, l in zip(linha, larguras)) for linha in textos)
+
+
+def dimensoes(valor):
+    """(linhas, colunas) de uma matriz ou (n,) de um vetor"""
+    return _forma(valor if _e_array(valor) else _normalizar(valor))
+
+
+def transposta(a):
+    """Matriz transposta; um vetor continua o mesmo"""
+    if _e_array(a):
+        return a.T
+    a = _normalizar(a)
+    return [list(coluna) for coluna in zip(*a)] if _e_matriz(a) else a
+
+
+def _mapear(funcao, a, b):
+    """Aplica a função escalar elemento a elemento, com escalares repetidos"""
+    if b is None:
+        if _e_matriz(a):
+            return [[funcao(x) for x in linha] for linha in a]
+        return [funcao(x) for x in a]
+    if not isinstance(a, list):
+        return _mapear(lambda y: funcao(a, y), b, None)
+    if not isinstance(b, list):
+        return _mapear(lambda x: funcao(x, b), a, None)
+    if _e_matriz(a):
+        return [list(map(funcao, x, y)) for x, y in zip(a, b)]
+    return list(map(funcao, a, b))
+
+
+def elementos(chave, a, b=None):
+    """Aplica uma operação do registro elemento a elemento
+
+    ``a`` e ``b`` têm as mesmas dimensões, ou um deles é um número. O
+    resultado é o da operação escalar (calculadora.py), inclusive as
+    mensagens de erro; matrizes grandes usam a versão vetorizada
+    (calculadora_vetorial.py), com o mesmo resultado.
+    """
+    operacao = operacoes.obter(chave)
+    operandos = (a,) if b is None else (a, b)
+    if operacao.aridade != len(operandos):
+        raise ValueError(f"Erro: {operacao.nome} recebe {operacao.aridade} operandos, não {len(operandos)}!")
+    formas = []
+    normalizados = []
+    for operando in operandos:
+        if isinstance(operando, (int, float)):
+            normalizados.append(float(operando))
+            continue
+        operando = operando if _e_array(operando) else _normalizar(operando)
+        formas.append(_forma(operando))
+        normalizados.append(operando)
+    if not formas:
+        return operacao(*normalizados)
+    if len(formas) == 2 and tuple(formas[0]) != tuple(formas[1]):
+        raise _incompativeis(*formas)
+
+    arrays = any(_e_array(x) for x in normalizados)
+    if arrays or math.prod(formas[0]) > LIMITE_ELEMENTOS:
+        funcao = _vetorizada(operacao.nome)
+        if funcao is not None:
+            resultado = funcao(*normalizados)
+            return resultado if arrays else resultado.tolist()
+        if arrays:
+            # Sem versão vetorizada (ex.: x²), os arrays passam pelo caminho puro
+            import numpy as np
+            listas = [x.tolist() if _e_array(x) else x for x in normalizados]
+            return np.asarray(_mapear(operacao, *listas, *((None,) if b is None else ())))
+    return _mapear(operacao, *normalizados, *((None,) if b is None else ()))
+
+
+def adicao(a, b):
+    """Soma elemento a elemento"""
+    return elementos("adicao", a, b)
+
+
+def subtracao(a, b):
+    """Subtração elemento a elemento"""
+    return elementos("subtracao", a, b)
+
+
+def _produto_puro(a, b):
+    mul = operator.mul
+    if not _e_matriz(a):
+        if not _e_matriz(b):
+            return sum(map(mul, a, b))
+        return [sum(map(mul, a, coluna)) for coluna in zip(*b)]
+    if not _e_matriz(b):
+        return [sum(map(mul, linha, b)) for linha in a]
+    colunas = list(zip(*b))
+    return [[sum(map(mul, linha, coluna)) for coluna in colunas] for linha in a]
+
+
+def produto(a, b):
+    """Produto de matrizes, de matriz por vetor ou escalar de dois vetores"""
+    arrays = _e_array(a) or _e_array(b)
+    if not _e_array(a):
+        a = _normalizar(a)
+    if not _e_array(b):
+        b = _normalizar(b)
+    forma_a, forma_b = _forma(a), _forma(b)
+    if forma_a[-1] != forma_b[0]:
+        raise _incompativeis(forma_a, forma_b)
+    np = _numpy(math.prod(forma_a) * forma_b[-1] if len(forma_b) == 2 else math.prod(forma_a))
+    if arrays or np is not None:
+        if np is None:
+            import numpy as np
+        resultado = np.matmul(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+        if arrays:
+            return resultado
+        return resultado.tolist() if resultado.ndim else float(resultado)
+    return _produto_puro(a, b)
+
+
+def _bareiss(a):
+    """Determinante exato de uma matriz de inteiros (eliminação sem frações)"""
+    a = [linha[:] for linha in a]
+    n = len(a)
+    sinal, anterior = 1, 1
+    for k in range(n - 1):
+        if a[k][k] == 0:
+            troca = next((i for i in range(k + 1, n) if a[i][k]), None)
+            if troca is None:
+                return 0
+            a[k], a[troca] = a[troca], a[k]
+            sinal = -sinal
+        pivo = a[k][k]
+        for i in range(k + 1, n):
+            linha, fator = a[i], a[i][k]
+            for j in range(k + 1, n):
+                linha[j] = (linha[j] * pivo - fator * a[k][j]) // anterior
+        anterior = pivo
+    return sinal * a[-1][-1]
+
+
+def _determinante_pequeno(a):
+    """Determinante de uma matriz de até 3×3 pela fórmula direta"""
+    if len(a) == 1:
+        return a[0][0]
+    if len(a) == 2:
+        (p, q), (r, s) = a
+        return p * s - q * r
+    (p, q, r), (s, t, u), (v, w, x) = a
+    return p * (t * x - u * w) - q * (s * x - u * v) + r * (s * w - t * v)
+
+
+def _eliminar(a, b=None):
+    """Eliminação de Gauss com pivoteamento parcial, em uma cópia
+
+    Cada linha de ``b`` é acrescentada à linha de ``a`` correspondente.
+    Devolve ``(linhas, sinal)``: as linhas, com a parte de ``a`` triangular
+    superior, e o sinal das trocas de linha; ``linhas`` é None se a matriz
+    for singular.
+    """
+    n = len(a)
+    linhas = [linha + extra for linha, extra in zip(a, b)] if b is not None else [linha[:] for linha in a]
+    sinal = 1
+    for k in range(n):
+        troca = max(range(k, n), key=lambda i: abs(linhas[i][k]))
+        linha_pivo = linhas[troca]
+        pivo = linha_pivo[k]
+        if pivo == 0:
+            return None, sinal
+        if troca != k:
+            linhas[k], linhas[troca] = linha_pivo, linhas[k]
+            sinal = -sinal
+        resto = linha_pivo[k:]
+        for i in range(k + 1, n):
+            linha = linhas[i]
+            fator = linha[k] / pivo
+            if fator:
+                linha[k:] = [x - fator * y for x, y in zip(linha[k:], resto)]
+    return linhas, sinal
+
+
+def _substituir(linhas, n):
+    """Resolve o sistema triangular de ``_eliminar`` para cada coluna acrescentada"""
+    x = [None] * n
+    for i in range(n - 1, -1, -1):
+        linha = linhas[i]
+        direita = linha[n:]
+        for k in range(i + 1, n):
+            coeficiente = linha[k]
+            if coeficiente:
+                direita = [d - coeficiente * xk for d, xk in zip(direita, x[k])]
+        pivo = linha[i]
+        x[i] = [d / pivo for d in direita]
+    return x
+
+
+def determinante(a):
+    """Determinante de uma matriz quadrada
+
+    Até 3×3 usa a fórmula direta; matrizes de inteiros até
+    ``DIMENSAO_EXATA`` dão o determinante exato (algoritmo de Bareiss); as
+    demais usam o LAPACK, ou a eliminação de Gauss sem o NumPy.
+    """
+    if not _e_array(a):
+        a = _normalizar(a)
+    n = _quadrada(a)
+    if not _e_array(a):
+        if n <= 3:
+            return _determinante_pequeno(a)
+        if n <= DIMENSAO_EXATA and all(x.is_integer() and abs(x) < _MAIOR_INTEIRO_EXATO
+                                       for linha in a for x in linha):
+            return float(_bareiss([[int(x) for x in linha] for linha in a]))
+    np = _numpy(n ** 3)
+    if _e_array(a) or np is not None:
+        if np is None:
+            import numpy as np
+        return float(np.linalg.det(np.asarray(a, dtype=np.float64)))
+    linhas, sinal = _eliminar(a)
+    if linhas is None:
+        return 0.0
+    return sinal * math.prod(linhas[i][i] for i in range(n))
+
+
+def resolver(a, b):
+    """Solução x de a·x = b; ``b`` é um vetor ou uma matriz de lados direitos"""
+    arrays = _e_array(a) or _e_array(b)
+    if not _e_array(a):
+        a = _normalizar(a)
+    if not _e_array(b):
+        b = _normalizar(b)
+    n = _quadrada(a)
+    forma_b = _forma(b)
+    if forma_b[0] != n:
+        raise _incompativeis(_forma(a), forma_b)
+    np = _numpy(n ** 3)
+    if arrays or np is not None:
+        if np is None:
+            import numpy as np
+        try:
+            resultado = np.linalg.solve(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+        except np.linalg.LinAlgError:
+            raise _singular() from None
+        return resultado if arrays else resultado.tolist()
+    vetor = not _e_matriz(b)
+    linhas, _ = _eliminar(a, [[x] for x in b] if vetor else b)
+    if linhas is None:
+        raise _singular()
+    x = _substituir(linhas, n)
+    return [linha[0] for linha in x] if vetor else x
+
+
+def inversa(a):
+    """Matriz inversa"""
+    if _e_array(a):
+        import numpy as np
+        try:
+            return np.linalg.inv(a)
+        except np.linalg.LinAlgError:
+            raise _singular() from None
+    a = _normalizar(a)
+    n = _quadrada(a)
+    if n == 2:
+        (p, q), (r, s) = a
+        det = p * s - q * r
+        if det == 0:
+            raise _singular()
+        return [[s / det, -q / det], [-r / det, p / det]]
+    identidade = [[float(i == j) for j in range(n)] for i in range(n)]
+    return resolver(a, identidade)
+
+
+def norma(a, ordem=None):
+    """Norma de um vetor (1, 2 ou inf) ou de uma matriz ("fro", 1, 2 ou inf)
+
+    Sem ``ordem``: a norma euclidiana do vetor ou a de Frobenius da matriz.
+    """
+    if _e_array(a):
+        import numpy as np
+        return float(np.linalg.norm(a, ordem))
+    a = _normalizar(a)
+    if not _e_matriz(a):
+        if ordem in (None, 2):
+            return math.hypot(*a)
+        if ordem == 1:
+            return math.fsum(map(abs, a))
+        if ordem == math.inf:
+            return max(map(abs, a))
+    else:
+        if ordem in (None, "fro"):
+            return math.hypot(*(x for linha in a for x in linha))
+        if ordem == 1:
+            return max(math.fsum(map(abs, coluna)) for coluna in zip(*a))
+        if ordem == math.inf:
+            return max(math.fsum(map(abs, linha)) for linha in a)
+        if ordem == 2:
+            try:
+                import numpy as np
+            except ImportError:
+                raise ValueError("Erro: A norma 2 de matrizes precisa do NumPy!") from None
+            return float(np.linalg.norm(np.asarray(a), 2))
+    raise ValueError(f"Erro: Norma desconhecida: {ordem!r}")
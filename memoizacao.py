@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memoização opcional das operações puras da calculadora
+Guarda resultados já calculados para argumentos repetidos, com tamanho e
+política de remoção (LRU ou LFU) configuráveis e contadores de acertos,
+falhas e remoções
+
+A chave leva em conta o tipo de cada argumento (2 e 2.0 são entradas
+diferentes, pois ``potencia(2, 3)`` devolve int e ``potencia(2.0, 3)`` float),
+distingue -0.0 de 0.0 e trata todos os NaN como a mesma chave. Decimals
+entram com sinal, dígitos e expoente (``Decimal("2")`` e ``Decimal("2.0")``
+são iguais, mas dão resultados com escalas diferentes no modo de precisão). Erros de
+domínio não são guardados. Cada cache tem sua própria trava, então pode ser
+compartilhado entre threads.
+
+A memoização compensa nas operações caras: fatorial exato, potências
+grandes e todo o modo de precisão (Decimal), cujas versões também são
+memoizadas, com a precisão do contexto na chave. Para uma soma ou um seno
+em float o acerto custa mais do que o cálculo, por isso ela é desligada por
+padrão:
+
+    memoizacao.ativar(tamanho=4096, politica="lfu")
+    ...
+    print(memoizacao.texto_prometheus())
+    memoizacao.desativar()
+"""
+
+import decimal
+import math
+import threading
+from collections import OrderedDict
+
+import operacoes
+import precisao
+
+POLITICAS = ("lru", "lfu")
+
+_NAN = object()
+_MENOS_ZERO = object()
+
+
+def _normalizar(a):
+    if a.__class__ is float:
+        if a != a:
+            return _NAN
+        if a == 0.0 and math.copysign(1.0, a) < 0:
+            return _MENOS_ZERO
+    elif a.__class__ is decimal.Decimal:
+        return a.as_tuple()
+    return a
+
+
+def chave(args):
+    """Monta a chave de cache para uma tupla de argumentos"""
+    for a in args:
+        if a.__class__ is float and (a == 0.0 or a != a) or a.__class__ is decimal.Decimal:
+            # Caminho lento: -0.0 e NaN precisam de marcadores próprios e
+            # Decimals, do expoente
+            return tuple(map(_normalizar, args)), tuple(map(type, args))
+    return args, tuple(map(type, args))
+
+
+class CacheMemoizacao:
+    """Cache limitado com política LRU ou LFU e contadores de uso"""
+
+    def __init__(self, tamanho=1024, politica="lru"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Erro: Política de cache desconhecida: {politica!r}")
+        if tamanho < 1:
+            raise ValueError("Erro: O cache precisa ter tamanho de pelo menos 1!")
+        self.tamanho = tamanho
+        self.politica = politica
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self._trava = threading.Lock()
+        self._valores = OrderedDict() if politica == "lru" else {}
+        # Só usados pela LFU: frequência de cada chave e chaves por frequência
+        self._frequencias = {}
+        self._baldes = {}
+        self._menor_frequencia = 0
+
+    def __len__(self):
+        return len(self._valores)
+
+    def obter(self, chave, ausente=None):
+        """Devolve o valor guardado para a chave, ou ``ausente``"""
+        # acquire/release explícitos custam menos que o bloco with no caminho quente
+        self._trava.acquire()
+        try:
+            valor = self._valores.get(chave, ausente)
+            if valor is ausente:
+                self.falhas += 1
+            else:
+                self.acertos += 1
+                if self.politica == "lru":
+                    self._valores.move_to_end(chave)
+                else:
+                    self._incrementar(chave)
+            return valor
+        finally:
+            self._trava.release()
+
+    def guardar(self, chave, valor):
+        """Guarda um valor, removendo outro se o cache estiver cheio"""
+        with self._trava:
+            if chave in self._valores:
+                self._valores[chave] = valor
+                return
+            if len(self._valores) >= self.tamanho:
+                self._remover()
+            self._valores[chave] = valor
+            if self.politica == "lfu":
+                self._frequencias[chave] = 1
+                self._baldes.setdefault(1, OrderedDict())[chave] = None
+                self._menor_frequencia = 1
+
+    def limpar(self):
+        """Descarta o conteúdo e zera os contadores"""
+        with self._trava:
+            self._valores.clear()
+            self._frequencias.clear()
+            self._baldes.clear()
+            self.acertos = self.falhas = self.remocoes = 0
+
+    def estatisticas(self):
+        """Devolve os contadores do cache"""
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "remocoes": self.remocoes,
+            "tamanho": len(self._valores),
+            "capacidade": self.tamanho,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+    def _incrementar(self, chave):
+        frequencia = self._frequencias[chave]
+        balde = self._baldes[frequencia]
+        del balde[chave]
+        if not balde:
+            del self._baldes[frequencia]
+            if self._menor_frequencia == frequencia:
+                self._menor_frequencia = frequencia + 1
+        self._frequencias[chave] = frequencia + 1
+        self._baldes.setdefault(frequencia + 1, OrderedDict())[chave] = None
+
+    def _remover(self):
+        if self.politica == "lru":
+            self._valores.popitem(last=False)
+        else:
+            balde = self._baldes[self._menor_frequencia]
+            chave_removida, _ = balde.popitem(last=False)
+            if not balde:
+                del self._baldes[self._menor_frequencia]
+            del self._valores[chave_removida]
+            del self._frequencias[chave_removida]
+        self.remocoes += 1
+
+
+def memoizar(funcao, tamanho=1024, politica="lru"):
+    """Envolve uma função pura com um cache; o cache fica em ``.cache``"""
+    cache = CacheMemoizacao(tamanho, politica)
+    ausente = object()
+
+    def memoizada(*args):
+        k = chave(args)
+        try:
+            valor = cache.obter(k, ausente)
+        except TypeError:
+            # Argumentos que não podem ser chave de dicionário
+            return memoizada.__wrapped__(*args)
+        if valor is ausente:
+            # __wrapped__ a cada chamada: outra camada pode sair de baixo desta
+            valor = memoizada.__wrapped__(*args)
+            cache.guardar(k, valor)
+        return valor
+
+    memoizada.__name__ = funcao.__name__
+    memoizada.__doc__ = funcao.__doc__
+    memoizada.__wrapped__ = funcao
+    memoizada.cache = cache
+    return memoizada
+
+
+def memoizar_precisao(funcao, tamanho=1024, politica="lru"):
+    """Como ``memoizar``, para as funções de precisao.py
+
+    A precisão e o arredondamento do contexto fazem parte da chave.
+    """
+    cache = CacheMemoizacao(tamanho, politica)
+    ausente = object()
+
+    def memoizada(*args, contexto=None):
+        atual = contexto or decimal.getcontext()
+        k = (chave(args), atual.prec, atual.rounding)
+        try:
+            valor = cache.obter(k, ausente)
+        except TypeError:
+            return memoizada.__wrapped__(*args, contexto=contexto)
+        if valor is ausente:
+            valor = memoizada.__wrapped__(*args, contexto=contexto)
+            cache.guardar(k, valor)
+        return valor
+
+    memoizada.__name__ = funcao.__name__
+    memoizada.__doc__ = funcao.__doc__
+    memoizada.__wrapped__ = funcao
+    memoizada.cache = cache
+    return memoizada
+
+
+# Nome da operação -> envoltório instalado, enquanto a memoização estiver ativa
+_MEMOIZADAS = {}
+_MEMOIZADAS_PRECISAO = {}
+
+
+def ativar(tamanho=1024, politica="lru", nomes=None):
+    """Liga a memoização nas operações puras do registro e do modo de precisão
+
+    Cada operação ganha seu próprio cache; ``nomes`` restringe a lista de
+    operações memoizadas.
+    """
+    desativar()
+    for operacao in operacoes.listar():
+        if not operacao.pura or operacao.aridade == 0:
+            continue
+        if nomes is not None and operacao.nome not in nomes:
+            continue
+        memoizada = _MEMOIZADAS[operacao.nome] = memoizar(operacao.funcao, tamanho, politica)
+        operacoes.envolver(operacao, memoizada)
+        if operacao.nome in precisao.OPERACOES:
+            memoizada = memoizar_precisao(precisao.OPERACOES[operacao.nome], tamanho, politica)
+            _MEMOIZADAS_PRECISAO[operacao.nome] = precisao.OPERACOES[operacao.nome] = memoizada
+
+
+def desativar():
+    """Desliga a memoização, tirando só os envoltórios dela
+
+    As métricas, ligadas antes ou depois, continuam no lugar.
+    """
+    for nome, memoizada in _MEMOIZADAS.items():
+        operacoes.desenvolver(nome, memoizada)
+    for nome, memoizada in _MEMOIZADAS_PRECISAO.items():
+        precisao.OPERACOES[nome] = operacoes.tirar_envoltorio(precisao.OPERACOES[nome], memoizada)
+    _MEMOIZADAS.clear()
+    _MEMOIZADAS_PRECISAO.clear()
+
+
+def estatisticas():
+    """Devolve os contadores de cada operação memoizada
+
+    As operações do modo de precisão aparecem com o sufixo "_decimal".
+    """
+    dados = {nome: memoizada.cache.estatisticas() for nome, memoizada in _MEMOIZADAS.items()}
+    for nome, memoizada in _MEMOIZADAS_PRECISAO.items():
+        dados[f"{nome}_decimal"] = memoizada.cache.estatisticas()
+    return dados
+
+
+def texto_prometheus():
+    """Exporta os contadores no formato de texto do Prometheus"""
+    linhas = []
+    metricas = (
+        ("acertos", "counter", "Acertos do cache de memoização"),
+        ("falhas", "counter", "Falhas do cache de memoização"),
+        ("remocoes", "counter", "Entradas removidas do cache de memoização"),
+        ("tamanho", "gauge", "Entradas no cache de memoização"),
+    )
+    dados = estatisticas()
+    for nome, tipo, ajuda in metricas:
+        metrica = f"calculadora_memoizacao_{nome}"
+        if tipo == "counter":
+            metrica += "_total"
+        linhas.append(f"# HELP {metrica} {ajuda}")
+        linhas.append(f"# TYPE {metrica} {tipo}")
+        for operacao, valores in dados.items():
+            linhas.append(f'{metrica}{{operacao="{operacao}"}} {valores[nome]}')
+    return "\n".join(linhas) + "\n"
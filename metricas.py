@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas e perfil das operações da calculadora
+Mostra quais operações dominam a carga e onde o tempo é gasto
+
+Com ``ativar()`` cada operação do registro (as funções de calculadora.py e
+as científicas da interface Streamlit) e do modo de precisão passa a contar:
+
+- chamadas e erros, com os erros agrupados pela mensagem do ``ValueError``
+  (demais exceções pelo nome da classe);
+- um histograma de latência, em segundos;
+- um histograma do tamanho dos operandos, em bits (o maior da chamada).
+
+Caminhos inteiros, como o ``teclar`` da interface Streamlit (um clique em
+um botão), são medidos com o decorador ``medir_caminho``. O
+retrato sai em JSON (``estatisticas``) ou no formato de texto do Prometheus
+(``texto_prometheus``).
+
+Assim como na memoização, a instrumentação troca as funções do registro;
+desligada, só os envoltórios dela saem e o custo é zero. ``medir_caminho``
+devolve a própria função quando as métricas estão desligadas. Ligue as
+métricas antes da memoização, para que a latência inclua os acertos do cache.
+
+Para a CLI há dois modos de perfil opcionais: ``perfil`` (cProfile,
+determinístico) e ``Amostrador`` (amostragem da pilha em intervalos fixos,
+com custo baixo mesmo em sessões longas).
+
+    metricas.ativar()
+    ...
+    print(metricas.texto_prometheus())
+"""
+
+import bisect
+import collections
+import contextlib
+import cProfile
+import functools
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from decimal import Decimal
+
+import operacoes
+import precisao
+
+# Limites superiores dos baldes dos histogramas (o último balde é +Inf)
+BALDES_LATENCIA = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+BALDES_BITS = (8, 16, 32, 64, 128, 1024, 8192, 65536, 1 << 20)
+
+# Mensagens de erro distintas guardadas por operação; as demais vão para "outros"
+MAXIMO_MENSAGENS = 50
+
+# log2(10): bits por dígito decimal
+_BITS_POR_DIGITO = 3.3219280948873626
+
+
+def tamanho_bits(valor):
+    """Tamanho de um operando em bits (magnitude para floats e Decimals)"""
+    if valor.__class__ is int:
+        return valor.bit_length()
+    if valor.__class__ is float:
+        if valor - valor != 0:
+            return 0
+        # Bits da parte inteira; frações contam como 0
+        return max(math.frexp(valor)[1], 0)
+    if isinstance(valor, str):
+        # Operandos do modo de precisão podem chegar como texto
+        try:
+            valor = Decimal(valor)
+        except ArithmeticError:
+            return 0
+    if isinstance(valor, Decimal):
+        if not valor.is_finite() or not valor:
+            return 0
+        return max(int((valor.adjusted() + 1) * _BITS_POR_DIGITO), 0)
+    return 0
+
+
+_balde = bisect.bisect_left
+_frexp = math.frexp
+
+
+def _bits_argumentos(args):
+    """Tamanho do maior operando de uma chamada, em bits"""
+    bits = 0
+    for a in args:
+        classe = a.__class__
+        if classe is int:
+            tamanho = a.bit_length()
+        elif classe is float:
+            # Expoente binário: bits da parte inteira (0 para NaN e infinito)
+            tamanho = _frexp(a)[1]
+        else:
+            tamanho = tamanho_bits(a)
+        if tamanho > bits:
+            bits = tamanho
+    return bits
+
+
+class MetricasOperacao:
+    """Contadores e histogramas de uma operação (ou de um caminho)"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        """Zera todos os contadores"""
+        with self._trava:
+            self.chamadas = 0
+            self.erros = collections.Counter()
+            self.latencias = [0] * (len(BALDES_LATENCIA) + 1)
+            self.soma_latencia = 0.0
+            self.tamanhos = [0] * (len(BALDES_BITS) + 1)
+            self.soma_tamanhos = 0
+
+    def registrar(self, duracao, bits=None, erro=None):
+        """Conta uma chamada que levou ``duracao`` segundos"""
+        # acquire/release explícitos custam menos que o bloco with no caminho quente
+        self._trava.acquire()
+        try:
+            self.chamadas += 1
+            self.soma_latencia += duracao
+            self.latencias[_balde(BALDES_LATENCIA, duracao)] += 1
+            if bits is not None:
+                self.soma_tamanhos += bits
+                self.tamanhos[_balde(BALDES_BITS, bits)] += 1
+            if erro is not None:
+                if erro not in self.erros and len(self.erros) >= MAXIMO_MENSAGENS:
+                    erro = "outros"
+                self.erros[erro] += 1
+        finally:
+            self._trava.release()
+
+    def estatisticas(self):
+        """Devolve um retrato dos contadores"""
+        with self._trava:
+            return {
+                "chamadas": self.chamadas,
+                "erros": dict(self.erros),
+                "latencia": {
+                    "baldes": dict(zip([*map(str, BALDES_LATENCIA), "+Inf"], self.latencias)),
+                    "soma": self.soma_latencia,
+                },
+                "tamanho_bits": {
+                    "baldes": dict(zip([*map(str, BALDES_BITS), "+Inf"], self.tamanhos)),
+                    "soma": self.soma_tamanhos,
+                },
+            }
+
+
+def _descrever_erro(erro):
+    if isinstance(erro, ValueError):
+        return str(erro)
+    return type(erro).__name__
+
+
+def instrumentar(funcao, metricas):
+    """Envolve uma função para contar suas chamadas em ``metricas``"""
+    relogio = time.perf_counter
+
+    def instrumentada(*args):
+        bits = _bits_argumentos(args)
+        inicio = relogio()
+        try:
+            # __wrapped__ a cada chamada: outra camada pode sair de baixo desta
+            resultado = instrumentada.__wrapped__(*args)
+        except Exception as e:
+            metricas.registrar(relogio() - inicio, bits, _descrever_erro(e))
+            raise
+        metricas.registrar(relogio() - inicio, bits)
+        return resultado
+
+    functools.update_wrapper(instrumentada, funcao)
+    instrumentada.metricas = metricas
+    return instrumentada
+
+
+def instrumentar_precisao(funcao, metricas):
+    """Como ``instrumentar``, para as funções de precisao.py"""
+    relogio = time.perf_counter
+
+    def instrumentada(*args, contexto=None):
+        bits = _bits_argumentos(args)
+        inicio = relogio()
+        try:
+            resultado = instrumentada.__wrapped__(*args, contexto=contexto)
+        except Exception as e:
+            metricas.registrar(relogio() - inicio, bits, _descrever_erro(e))
+            raise
+        metricas.registrar(relogio() - inicio, bits)
+        return resultado
+
+    functools.update_wrapper(instrumentada, funcao)
+    instrumentada.metricas = metricas
+    return instrumentada
+
+
+# Nome da operação -> envoltório instalado, enquanto as métricas estiverem ativas
+_INSTRUMENTADAS = {}
+_INSTRUMENTADAS_PRECISAO = {}
+# Nome da operação (com "_decimal" no modo de precisão) ou do caminho -> métricas
+_OPERACOES = {}
+_CAMINHOS = {}
+_ativas = False
+
+
+def ativas():
+    """Indica se as métricas estão ligadas"""
+    return _ativas
+
+
+def ativar(nomes=None):
+    """Liga as métricas nas operações do registro e do modo de precisão
+
+    ``nomes`` restringe a lista de operações instrumentadas. Os contadores
+    de uma ativação anterior são mantidos.
+    """
+    global _ativas
+    desativar()
+    for operacao in operacoes.listar():
+        if nomes is not None and operacao.nome not in nomes:
+            continue
+        medidas = _OPERACOES.setdefault(operacao.nome, MetricasOperacao())
+        instrumentada = _INSTRUMENTADAS[operacao.nome] = instrumentar(operacao.funcao, medidas)
+        operacoes.envolver(operacao, instrumentada)
+        if operacao.nome in precisao.OPERACOES:
+            medidas = _OPERACOES.setdefault(f"{operacao.nome}_decimal", MetricasOperacao())
+            instrumentada = instrumentar_precisao(precisao.OPERACOES[operacao.nome], medidas)
+            _INSTRUMENTADAS_PRECISAO[operacao.nome] = precisao.OPERACOES[operacao.nome] = instrumentada
+    _ativas = True
+
+
+def desativar():
+    """Desliga as métricas, tirando só os envoltórios delas
+
+    A memoização, ligada antes ou depois, continua no lugar.
+    """
+    global _ativas
+    for nome, instrumentada in _INSTRUMENTADAS.items():
+        operacoes.desenvolver(nome, instrumentada)
+    for nome, instrumentada in _INSTRUMENTADAS_PRECISAO.items():
+        precisao.OPERACOES[nome] = operacoes.tirar_envoltorio(precisao.OPERACOES[nome], instrumentada)
+    _INSTRUMENTADAS.clear()
+    _INSTRUMENTADAS_PRECISAO.clear()
+    _ativas = False
+
+
+def zerar():
+    """Zera os contadores de todas as operações e caminhos"""
+    for medidas in (*_OPERACOES.values(), *_CAMINHOS.values()):
+        medidas.zerar()
+
+
+def medir_caminho(nome):
+    """Decorador que mede um caminho inteiro (ex.: o ``teclar`` da interface)
+
+    A decisão é tomada ao decorar: com as métricas desligadas a função é
+    devolvida sem alteração. Os operandos não entram no histograma de tamanho.
+    """
+    def decorar(funcao):
+        if not _ativas:
+            return funcao
+        medidas = _CAMINHOS.setdefault(nome, MetricasOperacao())
+        relogio = time.perf_counter
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = relogio()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                medidas.registrar(relogio() - inicio, erro=_descrever_erro(e))
+                raise
+            medidas.registrar(relogio() - inicio)
+            return resultado
+        return medida
+    return decorar
+
+
+def estatisticas():
+    """Retrato de todas as métricas: ``{"operacoes": {...}, "caminhos": {...}}``
+
+    Só aparecem as operações e caminhos chamados pelo menos uma vez.
+    """
+    return {
+        grupo: {nome: m.estatisticas() for nome, m in sorted(medidas.items()) if m.chamadas}
+        for grupo, medidas in (("operacoes", _OPERACOES), ("caminhos", _CAMINHOS))
+    }
+
+
+def texto_json():
+    """Exporta o retrato em JSON"""
+    return json.dumps(estatisticas(), ensure_ascii=False, indent=2)
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histograma(linhas, metrica, rotulos, dados):
+    acumulado = 0
+    for limite, quantidade in dados["baldes"].items():
+        acumulado += quantidade
+        linhas.append(f'{metrica}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+    linhas.append(f"{metrica}_sum{{{rotulos}}} {dados['soma']}")
+    linhas.append(f"{metrica}_count{{{rotulos}}} {acumulado}")
+
+
+def texto_prometheus():
+    """Exporta as métricas no formato de texto do Prometheus"""
+    dados = estatisticas()
+    linhas = []
+    for grupo, rotulo in (("operacoes", "operacao"), ("caminhos", "caminho")):
+        prefixo = "calculadora" if grupo == "operacoes" else "calculadora_caminho"
+        itens = dados[grupo]
+        if not itens:
+            continue
+        linhas.append(f"# HELP {prefixo}_chamadas_total Chamadas por {rotulo}")
+        linhas.append(f"# TYPE {prefixo}_chamadas_total counter")
+        for nome, valores in itens.items():
+            linhas.append(f'{prefixo}_chamadas_total{{{rotulo}="{_rotulo(nome)}"}} {valores["chamadas"]}')
+        linhas.append(f"# HELP {prefixo}_erros_total Erros por {rotulo} e mensagem")
+        linhas.append(f"# TYPE {prefixo}_erros_total counter")
+        for nome, valores in itens.items():
+            for mensagem, quantidade in valores["erros"].items():
+                linhas.append(f'{prefixo}_erros_total{{{rotulo}="{_rotulo(nome)}",'
+                              f'mensagem="{_rotulo(mensagem)}"}} {quantidade}')
+        linhas.append(f"# HELP {prefixo}_latencia_segundos Latência por {rotulo}")
+        linhas.append(f"# TYPE {prefixo}_latencia_segundos histogram")
+        for nome, valores in itens.items():
+            _histograma(linhas, f"{prefixo}_latencia_segundos", f'{rotulo}="{_rotulo(nome)}"', valores["latencia"])
+        if grupo == "operacoes":
+            linhas.append("# HELP calculadora_operandos_bits Tamanho do maior operando da chamada, em bits")
+            linhas.append("# TYPE calculadora_operandos_bits histogram")
+            for nome, valores in itens.items():
+                _histograma(linhas, "calculadora_operandos_bits", f'operacao="{_rotulo(nome)}"',
+                            valores["tamanho_bits"])
+    return "\n".join(linhas) + "\n"
+
+
+@contextlib.contextmanager
+def perfil(saida=None, ordenar="cumulative", linhas=25):
+    """Executa o bloco sob o cProfile e escreve o relatório ao sair"""
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        yield perfilador
+    finally:
+        perfilador.disable()
+        estatisticas_perfil = pstats.Stats(perfilador, stream=saida or sys.stderr)
+        estatisticas_perfil.sort_stats(ordenar).print_stats(linhas)
+
+
+class Amostrador:
+    """Perfil por amostragem da pilha de uma thread
+
+    A cada ``intervalo`` segundos uma thread auxiliar lê a pilha da thread
+    alvo (por padrão, a que criou o amostrador) e conta a função do topo
+    (tempo próprio) e todas as funções da pilha (tempo acumulado). O
+    programa medido roda sem instrumentação.
+    """
+
+    def __init__(self, intervalo=0.005, thread=None):
+        self.intervalo = intervalo
+        self.alvo = thread if thread is not None else threading.get_ident()
+        self.amostras = 0
+        self.proprio = collections.Counter()
+        self.acumulado = collections.Counter()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *excecao):
+        self.parar()
+
+    def iniciar(self):
+        """Começa a amostragem em uma thread auxiliar"""
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._amostrar, name="amostrador", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Encerra a amostragem"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.alvo)
+            if quadro is None:
+                continue
+            self.amostras += 1
+            self.proprio[self._local(quadro)] += 1
+            vistos = set()
+            while quadro is not None:
+                vistos.add(self._local(quadro))
+                quadro = quadro.f_back
+            self.acumulado.update(vistos)
+
+    @staticmethod
+    def _local(quadro):
+        codigo = quadro.f_code
+        return f"{os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno}({codigo.co_name})"
+
+    def relatorio(self, linhas=25):
+        """Texto com as funções que mais aparecem nas amostras"""
+        if not self.amostras:
+            return "Nenhuma amostra coletada\n"
+        saida = [f"{self.amostras} amostras a cada {self.intervalo * 1000:g} ms",
+                 f"{'próprio':>8} {'acumulado':>10}  função"]
+        for local, quantidade in self.acumulado.most_common(linhas):
+            saida.append(f"{self.proprio[local] / self.amostras:8.1%} {quantidade / self.amostras:10.1%}  {local}")
+        return "\n".join(saida) + "\n"
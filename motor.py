@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de cálculo da calculadora, sem interface
+Lógica de cálculo usada pelas interfaces (Streamlit, CLI) e por workers,
+sem depender de nenhuma delas: ler o número do display, calcular uma
+operação binária, aplicar uma função científica no modo de ângulo atual e
+formatar o resultado
+
+    >>> calcular(10, 4, "÷")
+    2.5
+    >>> operacao, argumentos, resultado = funcao_cientifica("sin", 100.0, "GRAD")
+    >>> resultado
+    1.0
+    >>> formatar_display(calcular(Decimal(1), Decimal(3), "÷", 30), 30)
+    '0.3333333333333333333333333333'
+
+``digitos`` é 0 no modo float; acima de 0 os números são Decimal com esse
+número de dígitos. Importar este módulo carrega só o registro de operações
+e a formatação; os motores pesados são carregados no primeiro uso:
+
+- ``precisao`` (Decimal de alta precisão), quando ``digitos`` > 0
+- ``calculadora_vetorial`` (NumPy), em ``calcular_vetor``
+- ``multiprocessing``, quando uma operação custosa vai para o pool de
+  ``execucao``
+- o modelo de custo (``custo``) e os motores de fatoriais, raízes e
+  trigonometria, na primeira operação que os usa
+
+Os dois primeiros também ficam acessíveis como ``motor.precisao`` e
+``motor.vetorial``.
+"""
+
+import importlib
+from decimal import Decimal
+from functools import lru_cache
+
+import execucao
+import formatacao
+import operacoes
+
+# Nos modos RAD e GRAD as funções trigonométricas usam as versões na unidade do modo
+FUNCOES_POR_MODO = {
+    "RAD": {"sin": "sin_rad", "cos": "cos_rad", "tan": "tan_rad"},
+    "GRAD": {"sin": "sin_grad", "cos": "cos_grad", "tan": "tan_grad"},
+}
+# Ordem dos modos de ângulo no botão DRG
+PROXIMO_MODO = {"DEG": "RAD", "RAD": "GRAD", "GRAD": "DEG"}
+
+# Nome público -> módulo carregado no primeiro acesso
+_BACKENDS = {"precisao": "precisao", "vetorial": "calculadora_vetorial"}
+
+
+def __getattr__(nome):
+    """Carrega ``motor.precisao`` e ``motor.vetorial`` no primeiro acesso"""
+    modulo = _BACKENDS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = globals()[nome] = importlib.import_module(modulo)
+    return valor
+
+
+def _backend(nome):
+    backend = globals().get(nome)
+    return backend if backend is not None else __getattr__(nome)
+
+
+@lru_cache(maxsize=None)
+def contexto(digitos):
+    """Contexto decimal para ``digitos`` dígitos, ou None no modo float"""
+    if not digitos:
+        return None
+    # localcontext copia o contexto, então um por precisão basta
+    return _backend("precisao").criar_contexto(digitos)
+
+
+def ler_numero(texto, digitos=0):
+    """Lê o número do display, como Decimal no modo de precisão"""
+    if digitos:
+        try:
+            return Decimal(texto)
+        except ArithmeticError:
+            raise ValueError(f"could not convert string to Decimal: {texto!r}")
+    return float(texto)
+
+
+def calcular(primeiro, segundo, chave, digitos=0):
+    """Calcula uma operação binária; com operação desconhecida devolve o segundo"""
+    try:
+        operacao = operacoes.obter(chave)
+    except ValueError:
+        return segundo
+    try:
+        # Operações custosas (ex.: fatorial de 50000) rodam em um worker com tempo limite
+        return execucao.executar(operacao.nome, primeiro, segundo, contexto=contexto(digitos))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Erro no cálculo: {e}")
+
+
+def funcao_cientifica(chave, valor, modo_angulo="DEG", digitos=0):
+    """Aplica uma função científica ao valor no modo de ângulo dado
+
+    Devolve ``(operacao, argumentos, resultado)``, para o histórico.
+    """
+    funcoes_modo = FUNCOES_POR_MODO.get(modo_angulo)
+    if funcoes_modo:
+        chave = funcoes_modo.get(chave, chave)
+    operacao = operacoes.obter(chave)
+    argumentos = (valor,) * operacao.aridade
+    resultado = execucao.executar(operacao.nome, *argumentos, contexto=contexto(digitos))
+    return operacao, argumentos, resultado
+
+
+def calcular_vetor(chave, *arrays, **opcoes):
+    """Aplica uma operação a arrays inteiros com calculadora_vetorial
+
+    ``opcoes`` são repassadas à função vetorizada (``erros``, ``exato``...).
+    """
+    nome = operacoes.obter(chave).nome
+    funcao = getattr(_backend("vetorial"), nome, None)
+    if funcao is None:
+        raise ValueError(f"Erro: Operação sem versão vetorizada: {nome!r}")
+    return funcao(*arrays, **opcoes)
+
+
+def formatar_display(valor, digitos=0):
+    """Formata o valor para o display; Decimal usa os dígitos do modo de precisão"""
+    if isinstance(valor, Decimal):
+        return formatacao.formatar_display(valor, precisao=digitos)
+    return formatacao.formatar_display(valor)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de operações da calculadora
+Catálogo único das operações usadas pela CLI, pela interface Streamlit e pelo
+modo em lote, com os metadados de cada uma
+
+Cada operação é encontrada pelo nome ("divisao") ou pelo símbolo ("÷") em um
+único dicionário, então o custo do despacho não depende de quantas operações
+existem. Plugins podem registrar novas operações:
+
+    @operacoes.operacao("dobro", aridade=1, simbolo="2x", formato="2×{0}")
+    def dobro(a):
+        return a * 2
+"""
+
+import math
+
+import calculadora
+
+
+class Operacao:
+    """Uma operação da calculadora e seus metadados
+
+    ``formato`` descreve a operação a partir dos operandos ("{0} + {1}");
+    ``padroes`` guarda os valores dos últimos operandos quando opcionais;
+    ``rotulos`` são usados pela CLI ao pedir cada operando e ``inteiro``
+    indica que ela deve pedir números inteiros. ``pura`` indica que o
+    resultado depende apenas dos operandos (pode ser memoizado). Operações
+    não são alteradas depois de registradas: ``copiar`` faz uma cópia.
+    """
+
+    __slots__ = ("nome", "funcao", "aridade", "simbolo", "formato",
+                 "validador", "padroes", "rotulos", "inteiro", "pura")
+
+    def __init__(self, nome, funcao, aridade, simbolo, formato, validador=None,
+                 padroes=(), rotulos=(), inteiro=False, pura=True):
+        self.nome = nome
+        self.funcao = funcao
+        self.aridade = aridade
+        self.simbolo = simbolo
+        self.formato = formato
+        self.validador = validador
+        self.padroes = padroes
+        self.rotulos = rotulos
+        self.inteiro = inteiro
+        self.pura = pura
+
+    def __repr__(self):
+        return f"Operacao({self.nome!r}, simbolo={self.simbolo!r}, aridade={self.aridade})"
+
+    def copiar(self, **campos):
+        """Cópia da operação com alguns campos trocados (ex.: ``funcao``)"""
+        return Operacao(**{campo: getattr(self, campo) for campo in self.__slots__} | campos)
+
+    def __call__(self, *args):
+        """Executa a operação; a validação de domínio fica a cargo da função"""
+        return self.funcao(*args)
+
+    def verificar_quantidade(self, quantidade):
+        """Verifica se a quantidade de operandos é aceita pela operação"""
+        if not self.aridade - len(self.padroes) <= quantidade <= self.aridade:
+            raise ValueError(f"Erro: Número de operandos inválido para {self.nome}: {quantidade}")
+
+    def validar(self, *args):
+        """Verifica o domínio dos operandos sem calcular o resultado"""
+        if self.validador is not None:
+            self.validador(*args)
+
+    def descrever(self, *args):
+        """Monta a descrição da operação, como "10 ÷ 4" """
+        faltando = self.aridade - len(args)
+        if faltando > 0:
+            args += self.padroes[len(self.padroes) - faltando:]
+        return self.formato.format(*args)
+
+
+# Nome e símbolo -> operação
+_INDICE = {}
+
+
+def registrar(operacao, substituir=False):
+    """Registra uma operação pelo nome e pelo símbolo
+
+    Um nome ou símbolo já usado por outra operação é um erro, a menos que
+    ``substituir`` seja verdadeiro; registrar de novo a mesma operação não
+    muda nada.
+    """
+    if not substituir:
+        for chave in (operacao.nome, operacao.simbolo):
+            existente = _INDICE.get(chave)
+            if existente is not None and existente is not operacao:
+                raise ValueError(f"Erro: Já existe uma operação registrada como {chave!r}")
+    antiga = _INDICE.get(operacao.nome)
+    if antiga is not None and _INDICE.get(antiga.simbolo) is antiga:
+        del _INDICE[antiga.simbolo]
+    _INDICE[operacao.nome] = operacao
+    _INDICE[operacao.simbolo] = operacao
+    return operacao
+
+
+def operacao(nome, aridade, simbolo, formato, **metadados):
+    """Decorador que registra uma função como operação"""
+    def decorar(funcao):
+        registrar(Operacao(nome, funcao, aridade, simbolo, formato, **metadados))
+        return funcao
+    return decorar
+
+
+def obter(chave):
+    """Obtém uma operação pelo nome ou símbolo"""
+    try:
+        return _INDICE[chave]
+    except KeyError:
+        raise ValueError(f"Erro: Operação desconhecida: {chave!r}") from None
+
+
+def executar(chave, *args):
+    """Executa uma operação pelo nome ou símbolo"""
+    return obter(chave)(*args)
+
+
+def listar():
+    """Lista as operações registradas, na ordem de registro"""
+    return list({id(op): op for op in _INDICE.values()}.values())
+
+
+def envolver(operacao, envoltorio):
+    """Registra a operação com ``envoltorio`` no lugar da função
+
+    O envoltório deve chamar o seu próprio ``__wrapped__`` a cada chamada
+    (não a função capturada ao envolver): assim ``desenvolver`` tira uma
+    camada sem desfazer as outras (ex.: métricas sobre memoização).
+    """
+    return registrar(operacao.copiar(funcao=envoltorio), substituir=True)
+
+
+def tirar_envoltorio(funcao, envoltorio):
+    """Tira ``envoltorio`` da cadeia de ``__wrapped__`` que começa em ``funcao``
+
+    O envoltório é achado pela identidade e o de fora passa a chamar o de
+    dentro. Devolve a nova função de fora.
+    """
+    if funcao is envoltorio:
+        return envoltorio.__wrapped__
+    externo = funcao
+    while (interno := getattr(externo, "__wrapped__", None)) is not None:
+        if interno is envoltorio:
+            externo.__wrapped__ = envoltorio.__wrapped__
+            break
+        externo = interno
+    return funcao
+
+
+def desenvolver(nome, envoltorio):
+    """Tira um envoltório registrado por ``envolver``, mantendo os demais"""
+    operacao = _INDICE.get(nome)
+    if operacao is None:
+        return
+    funcao = tirar_envoltorio(operacao.funcao, envoltorio)
+    if funcao is not operacao.funcao:
+        registrar(operacao.copiar(funcao=funcao), substituir=True)
+
+
+# Operações da calculadora.py
+_DOIS_NUMEROS = ("o primeiro número", "o segundo número")
+
+for _op in (
+    Operacao("adicao", calculadora.adicao, 2, "+", "{0} + {1}", rotulos=_DOIS_NUMEROS),
+    Operacao("subtracao", calculadora.subtracao, 2, "-", "{0} - {1}", rotulos=_DOIS_NUMEROS),
+    Operacao("multiplicacao", calculadora.multiplicacao, 2, "×", "{0} × {1}", rotulos=_DOIS_NUMEROS),
+    Operacao("divisao", calculadora.divisao, 2, "÷", "{0} ÷ {1}",
+             calculadora.validar_divisor, rotulos=_DOIS_NUMEROS),
+    Operacao("potencia", calculadora.potencia, 2, "^", "{0} ^ {1}", rotulos=("a base", "o expoente")),
+    Operacao("potencia_modular", calculadora.potencia_modular, 3, "powmod", "{0} ^ {1} mod {2}",
+             calculadora.validar_potencia_modular, rotulos=("a base", "o expoente", "o módulo"), inteiro=True),
+    Operacao("raiz_quadrada", calculadora.raiz_quadrada, 1, "√", "√{0}",
+             calculadora.validar_raiz_quadrada, rotulos=("o número",)),
+    Operacao("raiz_n_esima", calculadora.raiz_n_esima, 2, "ⁿ√", "{1}√{0}",
+             calculadora.validar_raiz_n_esima, rotulos=("o número", "o índice da raiz")),
+    Operacao("resto_divisao", calculadora.resto_divisao, 2, "%", "{0} % {1}",
+             calculadora.validar_divisor, rotulos=_DOIS_NUMEROS),
+    Operacao("divisao_inteira", calculadora.divisao_inteira, 2, "//", "{0} // {1}",
+             calculadora.validar_divisor, rotulos=_DOIS_NUMEROS),
+    Operacao("fatorial", calculadora.fatorial, 1, "!", "{0}!",
+             calculadora.validar_fatorial, rotulos=("um número inteiro",), inteiro=True),
+    Operacao("logaritmo", calculadora.logaritmo, 2, "logb", "log_{1}({0})",
+             calculadora.validar_logaritmo, padroes=(10,),
+             rotulos=("o número", "a base do logaritmo (Enter para base 10)")),
+    Operacao("seno", calculadora.seno, 1, "sin", "sen({0}°)", rotulos=("o ângulo em graus",)),
+    Operacao("cosseno", calculadora.cosseno, 1, "cos", "cos({0}°)", rotulos=("o ângulo em graus",)),
+    Operacao("tangente", calculadora.tangente, 1, "tan", "tan({0}°)", rotulos=("o ângulo em graus",)),
+):
+    registrar(_op)
+
+
+# Funções científicas da interface Streamlit
+def _validar_positivo(a):
+    if a <= 0:
+        raise ValueError("Erro: Logaritmo só é definido para números positivos!")
+
+
+def _validar_nao_zero(a):
+    calculadora.validar_divisor(1, a)
+
+
+@operacao("logaritmo_natural", 1, "ln", "ln({0})", validador=_validar_positivo)
+def logaritmo_natural(a):
+    """Calcula o logaritmo natural de um número"""
+    _validar_positivo(a)
+    return math.log(a)
+
+
+@operacao("logaritmo_decimal", 1, "log", "log({0})", validador=_validar_positivo)
+def logaritmo_decimal(a):
+    """Calcula o logaritmo na base 10 de um número"""
+    _validar_positivo(a)
+    return math.log10(a)
+
+
+@operacao("fatorial_real", 1, "n!", "{0}!")
+def fatorial_real(n):
+    """Calcula n! como float, usando a função gama para não inteiros"""
+    return calculadora.fatoriais.fatorial_float(n)
+
+
+@operacao("log_fatorial", 1, "ln!", "ln({0}!)")
+def log_fatorial(n):
+    """Calcula o logaritmo natural de n!, sem montar o fatorial"""
+    return calculadora.fatoriais.log_fatorial(n)
+
+
+@operacao("gama", 1, "Γ", "Γ({0})")
+def gama(x):
+    """Calcula a função gama de x"""
+    return calculadora.fatoriais.gama(x)
+
+
+@operacao("raiz_cubica", 1, "∛", "∛{0}")
+def raiz_cubica(a):
+    """Calcula a raiz cúbica de um número (real também para negativos)"""
+    return calculadora.raizes.raiz_real(a, 3)
+
+
+@operacao("quadrado", 1, "x²", "({0})²")
+def quadrado(a):
+    """Eleva um número ao quadrado"""
+    if a.__class__ is int and 2 * a.bit_length() > calculadora.BITS_SEM_VERIFICACAO:
+        calculadora.custo.verificar("quadrado", a)
+    try:
+        return a ** 2
+    except OverflowError:
+        calculadora.custo.verificar("quadrado", a)
+        raise
+
+
+@operacao("cubo", 1, "x³", "({0})³")
+def cubo(a):
+    """Eleva um número ao cubo"""
+    if a.__class__ is int and 3 * a.bit_length() > calculadora.BITS_SEM_VERIFICACAO:
+        calculadora.custo.verificar("cubo", a)
+    try:
+        return a ** 3
+    except OverflowError:
+        calculadora.custo.verificar("cubo", a)
+        raise
+
+
+@operacao("inverso", 1, "1/x", "1/{0}", validador=_validar_nao_zero)
+def inverso(a):
+    """Calcula o inverso de um número"""
+    _validar_nao_zero(a)
+    return 1 / a
+
+
+@operacao("exponencial", 1, "e^x", "e^{0}")
+def exponencial(a):
+    """Calcula e elevado a um número"""
+    return math.exp(a)
+
+
+@operacao("potencia_de_dez", 1, "10^x", "10^{0}")
+def potencia_de_dez(a):
+    """Calcula 10 elevado a um número"""
+    if a.__class__ is int and 4 * a > calculadora.BITS_SEM_VERIFICACAO:
+        # 10 ** a tem cerca de 3,3 × a bits
+        calculadora.custo.verificar("potencia_de_dez", a)
+    try:
+        return 10 ** a
+    except OverflowError:
+        calculadora.custo.verificar("potencia_de_dez", a)
+        # Sobra o expoente muito negativo: o resultado fica abaixo do menor float
+        return 0.0
+
+
+@operacao("seno_rad", 1, "sin_rad", "sin({0})")
+def seno_rad(angulo_radianos):
+    """Calcula o seno de um ângulo em radianos"""
+    return math.sin(angulo_radianos)
+
+
+@operacao("cosseno_rad", 1, "cos_rad", "cos({0})")
+def cosseno_rad(angulo_radianos):
+    """Calcula o cosseno de um ângulo em radianos"""
+    return math.cos(angulo_radianos)
+
+
+@operacao("tangente_rad", 1, "tan_rad", "tan({0})")
+def tangente_rad(angulo_radianos):
+    """Calcula a tangente de um ângulo em radianos"""
+    return math.tan(angulo_radianos)
+
+
+@operacao("seno_grad", 1, "sin_grad", "sin({0} grad)")
+def seno_grad(angulo_grados):
+    """Calcula o seno de um ângulo em grados"""
+    return calculadora.trigonometria.seno(angulo_grados, "GRAD")
+
+
+@operacao("cosseno_grad", 1, "cos_grad", "cos({0} grad)")
+def cosseno_grad(angulo_grados):
+    """Calcula o cosseno de um ângulo em grados"""
+    return calculadora.trigonometria.cosseno(angulo_grados, "GRAD")
+
+
+@operacao("tangente_grad", 1, "tan_grad", "tan({0} grad)")
+def tangente_grad(angulo_grados):
+    """Calcula a tangente de um ângulo em grados"""
+    return calculadora.trigonometria.tangente(angulo_grados, "GRAD")
+
+
+registrar(Operacao("constante_e", lambda: math.e, 0, "e", "e"))
+registrar(Operacao("constante_pi", lambda: math.pi, 0, "π", "π"))
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planilha reativa da calculadora
+Células com nome e fórmula ("a = 3", "b = sqrt(a) * 2", "c = log(b, 10)")
+ligadas em um grafo de dependências
+
+Cada fórmula é compilada por expressoes.py, com as operações da calculadora;
+as variáveis da fórmula são as células das quais ela depende. Ao editar uma
+célula, só as células abaixo dela no grafo são recalculadas, em ordem
+topológica, e as demais mantêm o valor guardado. O recálculo para nos ramos
+em que um valor não mudou: se ``b = a * 0`` continua 0, o que depende de
+``b`` não é recalculado.
+
+    >>> p = Planilha()
+    >>> p.executar("a = 9")
+    ['a']
+    >>> p.executar("b = sqrt(a) * 2")
+    ['b']
+    >>> p.executar("a = 16")
+    ['a', 'b']
+    >>> p.valor("b")
+    8.0
+
+Células com erro (domínio, referência a célula inexistente) guardam a
+mensagem em ``erro`` e passam o erro às que dependem delas; referências
+circulares são recusadas na própria edição.
+"""
+
+import keyword
+import re
+
+import expressoes
+
+_NOME = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+
+
+class Celula:
+    """Célula da planilha: fórmula compilada, valor e erro do último cálculo"""
+
+    __slots__ = ("nome", "texto", "expressao", "valor", "erro")
+
+    def __init__(self, nome, texto, expressao):
+        self.nome = nome
+        self.texto = texto
+        self.expressao = expressao
+        self.valor = None
+        self.erro = None
+
+    @property
+    def dependencias(self):
+        """Nomes das células usadas na fórmula"""
+        return self.expressao.variaveis
+
+    def __repr__(self):
+        return f"Celula({self.nome!r}, {self.texto!r})"
+
+
+def _validar_nome(nome):
+    if not _NOME.fullmatch(nome) or keyword.iskeyword(nome):
+        raise ValueError(f"Erro: Nome de célula inválido: {nome!r}")
+    if nome in expressoes.CONSTANTES:
+        raise ValueError(f"Erro: {nome!r} é uma constante e não pode ser o nome de uma célula")
+
+
+def separar_linha(linha):
+    """Separa uma linha "nome = fórmula" em (nome, fórmula)"""
+    nome, igual, texto = linha.partition("=")
+    nome, texto = nome.strip(), texto.strip()
+    if not igual or not texto:
+        raise ValueError(f"Erro: Use o formato 'nome = fórmula': {linha.strip()!r}")
+    _validar_nome(nome)
+    return nome, texto
+
+
+def _mesmo_valor(a, b):
+    # NaN != NaN, então a identidade vem antes; 1 == 1.0, então o tipo também conta
+    return a is b or (a.__class__ is b.__class__ and a == b)
+
+
+class Planilha:
+    """Conjunto de células com recálculo incremental"""
+
+    def __init__(self):
+        self._celulas = {}
+        # Nome -> células cuja fórmula usa esse nome (a célula pode ainda não existir)
+        self._dependentes = {}
+
+    def __len__(self):
+        return len(self._celulas)
+
+    def __iter__(self):
+        """Percorre as células na ordem em que foram criadas"""
+        return iter(self._celulas.values())
+
+    def __contains__(self, nome):
+        return nome in self._celulas
+
+    def __getitem__(self, nome):
+        try:
+            return self._celulas[nome]
+        except KeyError:
+            raise ValueError(f"Erro: Célula não definida: {nome!r}") from None
+
+    def valor(self, nome):
+        """Valor de uma célula; levanta ValueError se ela tem erro"""
+        celula = self[nome]
+        if celula.erro is not None:
+            raise ValueError(celula.erro)
+        return celula.valor
+
+    def valores(self):
+        """Dicionário nome -> valor (None nas células com erro)"""
+        return {nome: celula.valor for nome, celula in self._celulas.items()}
+
+    def _abaixo(self, nome):
+        """A célula e todas as que dependem dela, em ordem topológica"""
+        dependentes = self._dependentes
+        visitados = {nome}
+        ordem = []
+        # Busca em profundidade iterativa: cadeias longas não estouram a pilha
+        pilha = [(nome, iter(dependentes.get(nome, ())))]
+        while pilha:
+            atual, filhos = pilha[-1]
+            for filho in filhos:
+                if filho not in visitados:
+                    visitados.add(filho)
+                    pilha.append((filho, iter(dependentes.get(filho, ()))))
+                    break
+            else:
+                pilha.pop()
+                ordem.append(atual)
+        ordem.reverse()
+        return ordem
+
+    def _calcular(self, celula):
+        """Recalcula a célula; devolve True se o valor (ou o erro) mudou"""
+        celulas = self._celulas
+        argumentos = []
+        erro = None
+        for dependencia in celula.expressao.variaveis:
+            origem = celulas.get(dependencia)
+            if origem is None:
+                erro = f"Erro: Célula não definida: {dependencia!r}"
+                break
+            if origem.erro is not None:
+                erro = f"Erro: A célula {dependencia!r} tem erro"
+                break
+            argumentos.append(origem.valor)
+        valor = None
+        if erro is None:
+            try:
+                valor = celula.expressao.funcao(*argumentos)
+            except (ValueError, ArithmeticError, TypeError) as e:
+                mensagem = str(e)
+                erro = mensagem if mensagem.startswith("Erro") else f"Erro: {mensagem}"
+        mudou = erro != celula.erro or not _mesmo_valor(valor, celula.valor)
+        celula.valor = valor
+        celula.erro = erro
+        return mudou
+
+    def _propagar(self, nome, ordem=None):
+        """Recalcula as células abaixo de ``nome`` cujas dependências mudaram"""
+        if ordem is None:
+            ordem = self._abaixo(nome)
+        celulas = self._celulas
+        mudaram = {nome}
+        recalculadas = [nome] if nome in celulas else []
+        for atual in ordem[1:]:
+            celula = celulas.get(atual)
+            if celula is None or mudaram.isdisjoint(celula.expressao.variaveis):
+                continue
+            recalculadas.append(atual)
+            if self._calcular(celula):
+                mudaram.add(atual)
+        return recalculadas
+
+    def _ligar(self, nome, dependencias):
+        for dependencia in dependencias:
+            self._dependentes.setdefault(dependencia, {})[nome] = None
+
+    def _desligar(self, nome, dependencias):
+        for dependencia in dependencias:
+            usuarios = self._dependentes.get(dependencia)
+            if usuarios is not None:
+                usuarios.pop(nome, None)
+                if not usuarios:
+                    del self._dependentes[dependencia]
+
+    def definir(self, nome, texto):
+        """Cria ou altera uma célula; devolve os nomes das células recalculadas"""
+        _validar_nome(nome)
+        texto = texto.strip()
+        antiga = self._celulas.get(nome)
+        if antiga is not None and antiga.texto == texto:
+            return []
+        expressao = expressoes.compilar(texto)
+        if nome in expressao.variaveis:
+            raise ValueError(f"Erro: Referência circular: {nome!r} depende de si mesma")
+        # As células abaixo desta não mudam com a edição: servem para achar
+        # ciclos e, depois, como ordem do recálculo
+        abaixo = self._abaixo(nome)
+        if len(abaixo) > 1:
+            conjunto = set(abaixo)
+            for dependencia in expressao.variaveis:
+                if dependencia in conjunto:
+                    raise ValueError(f"Erro: Referência circular: {dependencia!r} depende de {nome!r}")
+
+        if antiga is not None:
+            self._desligar(nome, antiga.dependencias)
+            celula = antiga
+            celula.texto = texto
+            celula.expressao = expressao
+        else:
+            celula = self._celulas[nome] = Celula(nome, texto, expressao)
+        self._ligar(nome, expressao.variaveis)
+        if not self._calcular(celula):
+            return [nome]
+        return self._propagar(nome, abaixo)
+
+    def remover(self, nome):
+        """Remove uma célula; devolve os nomes das células recalculadas"""
+        celula = self[nome]
+        self._desligar(nome, celula.dependencias)
+        del self._celulas[nome]
+        return self._propagar(nome)
+
+    def executar(self, linha):
+        """Executa uma linha "nome = fórmula"; devolve as células recalculadas"""
+        return self.definir(*separar_linha(linha))
+
+    def sincronizar(self, texto):
+        """Ajusta a planilha a um texto com uma célula por linha
+
+        Só as linhas que mudaram são aplicadas; células que não aparecem mais
+        no texto são removidas. Linhas vazias e comentários (#) são ignorados.
+        Devolve ``(recalculadas, erros)``, com os erros das linhas recusadas.
+        """
+        linhas = {}
+        erros = []
+        for numero, linha in enumerate(texto.splitlines(), 1):
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            try:
+                nome, formula = separar_linha(linha)
+            except ValueError as e:
+                erros.append(f"Linha {numero}: {e}")
+                continue
+            linhas[nome] = formula
+
+        recalculadas = {}
+        for nome in [nome for nome in self._celulas if nome not in linhas]:
+            recalculadas.update(dict.fromkeys(self.remover(nome)))
+        for nome, formula in linhas.items():
+            try:
+                recalculadas.update(dict.fromkeys(self.definir(nome, formula)))
+            except ValueError as e:
+                erros.append(f"{nome}: {e}")
+        return [nome for nome in recalculadas if nome in self._celulas], erros
+
+    def texto(self):
+        """A planilha como texto, uma célula "nome = fórmula" por linha"""
+        return "\n".join(f"{celula.nome} = {celula.texto}" for celula in self._celulas.values())
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo de precisão arbitrária da calculadora
+Versões em ``decimal.Decimal`` das operações do registro, para quando 15-17
+dígitos de float não bastam (ex.: 30 a 50 dígitos significativos)
+
+A precisão vem de um ``decimal.Context``: cada sessão cria o seu com
+``criar_contexto(digitos)`` e o passa para ``executar``. As constantes
+(π, e, ln 10) e os coeficientes das séries de Taylor são calculados uma vez
+por precisão e guardados em cache. As funções trigonométricas trabalham em
+graus, como em calculadora.py, reduzindo o ângulo de forma exata antes de
+somar a série. O caminho em float continua sendo o padrão.
+
+    >>> contexto = criar_contexto(40)
+    >>> executar("adicao", Decimal("0.1"), Decimal("0.2"), contexto=contexto)
+    Decimal('0.3')
+"""
+
+import decimal
+from decimal import Decimal, localcontext
+from functools import lru_cache
+
+import fatoriais
+import operacoes
+import raizes
+
+PRECISAO_PADRAO = 30
+
+# Dígitos extras usados nos cálculos intermediários
+_GUARDA = 10
+
+# Maior expoente decimal em que a raiz n-ésima procura uma raiz exata
+_EXPOENTE_RAIZ_EXATA = 1000
+
+
+def criar_contexto(digitos=PRECISAO_PADRAO):
+    """Cria um contexto decimal com a precisão pedida"""
+    if digitos < 1:
+        raise ValueError("Erro: A precisão deve ter pelo menos 1 dígito!")
+    return decimal.Context(
+        prec=digitos,
+        rounding=decimal.ROUND_HALF_EVEN,
+        traps=[decimal.InvalidOperation, decimal.DivisionByZero, decimal.Overflow],
+    )
+
+
+@lru_cache(maxsize=None)
+def pi(digitos):
+    """Calcula π com a precisão pedida (série de Machin, em cache)"""
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+
+        def arctan_inverso(x):
+            # arctan(1/x) = 1/x - 1/(3x³) + 1/(5x⁵) - ...
+            x2 = x * x
+            termo = Decimal(1) / x
+            soma = termo
+            n = 1
+            while True:
+                termo /= -x2
+                n += 2
+                anterior = soma
+                soma += termo / n
+                if soma == anterior:
+                    return soma
+
+        resultado = 16 * arctan_inverso(5) - 4 * arctan_inverso(239)
+        c.prec = digitos
+        return +resultado
+
+
+@lru_cache(maxsize=None)
+def e(digitos):
+    """Calcula a constante e com a precisão pedida (em cache)"""
+    with localcontext() as c:
+        c.prec = digitos
+        return Decimal(1).exp()
+
+
+@lru_cache(maxsize=None)
+def ln10(digitos):
+    """Calcula ln(10) com a precisão pedida (em cache)"""
+    with localcontext() as c:
+        c.prec = digitos
+        return Decimal(10).ln()
+
+
+@lru_cache(maxsize=None)
+def _coeficientes_seno(digitos):
+    """Coeficientes (-1)^k / (2k+1)! da série do seno, até ficarem desprezíveis"""
+    with localcontext() as c:
+        c.prec = digitos
+        limite = Decimal(10) ** -(digitos + 1)
+        coeficientes = []
+        fatorial = Decimal(1)
+        n = 1
+        while True:
+            coeficiente = (-1) ** len(coeficientes) / fatorial
+            if abs(coeficiente) < limite:
+                return tuple(coeficientes)
+            coeficientes.append(coeficiente)
+            fatorial *= (n + 1) * (n + 2)
+            n += 2
+
+
+def _seno_serie(x, digitos):
+    """Soma a série do seno para |x| ≤ π/4 (em radianos)"""
+    x2 = x * x
+    potencia = x
+    soma = Decimal(0)
+    for coeficiente in _coeficientes_seno(digitos):
+        anterior = soma
+        soma += coeficiente * potencia
+        if soma == anterior:
+            break
+        potencia *= x2
+    return soma
+
+
+def _seno_graus(graus, digitos, deslocamento=0):
+    """Seno de (graus + deslocamento), com redução exata do argumento"""
+    if not graus.is_finite():
+        # O expoente de NaN e infinito não é um número; nem há redução possível
+        if graus.is_nan():
+            raise ValueError("Erro: O ângulo não é um número!")
+        raise ValueError("Erro: Funções trigonométricas não são definidas para ângulo infinito!")
+    with localcontext() as c:
+        # Precisão suficiente para que a soma e o resto da divisão por 360 sejam exatos
+        c.prec = max(digitos, graus.adjusted() + 1) + _GUARDA - min(graus.as_tuple().exponent, 0)
+        r = (graus + deslocamento) % 360
+        if r < 0:
+            r += 360
+        sinal = 1
+        if r >= 180:
+            r -= 180
+            sinal = -1
+        if r > 90:
+            r = 180 - r
+        c.prec = digitos + _GUARDA
+        if r == 0:
+            return Decimal(0)
+        if r == 90:
+            return Decimal(sinal)
+        if r > 45:
+            # sen(r) = cos(90 - r) = √(1 - sen²(90 - r))
+            s = _seno_serie((90 - r) * pi(c.prec) / 180, c.prec)
+            resultado = (1 - s * s).sqrt()
+        else:
+            resultado = _seno_serie(r * pi(c.prec) / 180, c.prec)
+        return sinal * resultado
+
+
+def _validar(a, mensagem):
+    if not a:
+        raise ValueError(mensagem)
+
+
+def _decimal(valor):
+    """Converte um operando em Decimal; floats usam a representação curta"""
+    if isinstance(valor, Decimal):
+        return valor
+    if isinstance(valor, float):
+        return Decimal(repr(valor))
+    return Decimal(valor)
+
+
+def _com_contexto(funcao):
+    """Executa a função no contexto informado e arredonda o resultado"""
+    def executar_com_contexto(*args, contexto=None):
+        contexto = contexto or decimal.getcontext()
+        try:
+            with localcontext(contexto) as c:
+                resultado = funcao(*(_decimal(a) for a in args), digitos=c.prec)
+                return +resultado
+        except decimal.DivisionByZero:
+            raise ValueError("Erro: Divisão por zero não é permitida!") from None
+        except decimal.InvalidOperation:
+            raise ValueError("Erro: Operação inválida no modo de precisão!") from None
+        except (decimal.Overflow, OverflowError):
+            raise ValueError("Erro: Resultado grande demais para o modo de precisão!") from None
+    executar_com_contexto.__name__ = funcao.__name__
+    executar_com_contexto.__doc__ = funcao.__doc__
+    return executar_com_contexto
+
+
+@_com_contexto
+def adicao(a, b, digitos):
+    """Realiza a adição de dois números"""
+    return a + b
+
+
+@_com_contexto
+def subtracao(a, b, digitos):
+    """Realiza a subtração de dois números"""
+    return a - b
+
+
+@_com_contexto
+def multiplicacao(a, b, digitos):
+    """Realiza a multiplicação de dois números"""
+    return a * b
+
+
+@_com_contexto
+def divisao(a, b, digitos):
+    """Realiza a divisão de dois números"""
+    _validar(b != 0, "Erro: Divisão por zero não é permitida!")
+    return a / b
+
+
+@_com_contexto
+def potencia(a, b, digitos):
+    """Eleva 'a' à potência de 'b'"""
+    _validar(not (a == 0 and b < 0), "Erro: Zero não pode ser elevado a expoente negativo!")
+    _validar(a >= 0 or b == b.to_integral_value(),
+             "Erro: Base negativa com expoente fracionário resulta em número complexo!")
+    return a ** b
+
+
+@_com_contexto
+def raiz_quadrada(a, digitos):
+    """Calcula a raiz quadrada de um número"""
+    _validar(a >= 0, "Erro: Não é possível calcular raiz quadrada de número negativo!")
+    return a.sqrt()
+
+
+def _raiz_exata(a, n):
+    """Raiz exata de a quando numerador e denominador são potências perfeitas"""
+    k = int(n)
+    if abs(a.adjusted()) > _EXPOENTE_RAIZ_EXATA or abs(k) > raizes.LIMITE_INDICE_EXATO:
+        return None
+    p, q = a.as_integer_ratio()
+    if k < 0:
+        p, q, k = q, p, -k
+    raiz_p = raizes.raiz_exata(p, k)
+    raiz_q = raizes.raiz_exata(q, k) if raiz_p is not None else None
+    if raiz_q is None:
+        return None
+    return Decimal(raiz_p) / Decimal(raiz_q)
+
+
+@_com_contexto
+def raiz_n_esima(a, n, digitos):
+    """Calcula a raiz n-ésima de um número (raiz real para índice ímpar)"""
+    inteiro = n == n.to_integral_value()
+    _validar(not (a < 0 and inteiro and n % 2 == 0),
+             "Erro: Não é possível calcular raiz par de número negativo!")
+    _validar(n != 0, "Erro: Índice da raiz não pode ser zero!")
+    _validar(a >= 0 or inteiro, "Erro: Raiz de número negativo resulta em número complexo!")
+    if a == 0:
+        return Decimal(0)
+    if a.is_infinite():
+        return a
+    exata = _raiz_exata(a, n) if inteiro else None
+    if exata is not None:
+        return exata
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        modulo = abs(a)
+        if not inteiro:
+            raiz = (modulo.ln() / n).exp()
+        else:
+            # Newton: x <- ((n-1)x + a/x^(n-1)) / n, partindo de exp(ln(a)/n)
+            k = abs(int(n))
+            raiz = (modulo.ln() / k).exp()
+            for _ in range(20):
+                proxima = ((k - 1) * raiz + modulo / raiz ** (k - 1)) / k
+                if proxima == raiz:
+                    break
+                raiz = proxima
+            if n < 0:
+                raiz = 1 / raiz
+        return -raiz if a < 0 else raiz
+
+
+@_com_contexto
+def resto_divisao(a, b, digitos):
+    """Calcula o resto da divisão (módulo), com o sinal do divisor"""
+    _validar(b != 0, "Erro: Divisão por zero não é permitida!")
+    resto = a % b
+    if resto and (resto < 0) != (b < 0):
+        resto += b
+    return resto
+
+
+@_com_contexto
+def divisao_inteira(a, b, digitos):
+    """Realiza a divisão inteira de dois números (arredondando para baixo)"""
+    _validar(b != 0, "Erro: Divisão por zero não é permitida!")
+    quociente = a // b
+    if a % b and (a < 0) != (b < 0):
+        quociente -= 1
+    return quociente
+
+
+@_com_contexto
+def fatorial(n, digitos):
+    """Calcula o fatorial de um número inteiro"""
+    _validar(n >= 0, "Erro: Fatorial não é definido para números negativos!")
+    _validar(n.is_finite() and n == n.to_integral_value(),
+             "Erro: Fatorial só é definido para números inteiros!")
+    return Decimal(fatoriais.fatorial_exato(int(n)))
+
+
+@_com_contexto
+def logaritmo(a, base=Decimal(10), digitos=None):
+    """Calcula o logaritmo de um número"""
+    _validar(a > 0, "Erro: Logaritmo só é definido para números positivos!")
+    _validar(base > 0 and base != 1, "Erro: Base do logaritmo deve ser positiva e diferente de 1!")
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        if base == 10:
+            return a.log10()
+        return a.ln() / base.ln()
+
+
+@_com_contexto
+def logaritmo_natural(a, digitos):
+    """Calcula o logaritmo natural de um número"""
+    _validar(a > 0, "Erro: Logaritmo só é definido para números positivos!")
+    return a.ln()
+
+
+@_com_contexto
+def logaritmo_decimal(a, digitos):
+    """Calcula o logaritmo na base 10 de um número"""
+    _validar(a > 0, "Erro: Logaritmo só é definido para números positivos!")
+    return a.log10()
+
+
+@_com_contexto
+def exponencial(a, digitos):
+    """Calcula e elevado a um número"""
+    return a.exp()
+
+
+@_com_contexto
+def potencia_de_dez(a, digitos):
+    """Calcula 10 elevado a um número"""
+    return Decimal(10) ** a
+
+
+@_com_contexto
+def quadrado(a, digitos):
+    """Eleva um número ao quadrado"""
+    return a * a
+
+
+@_com_contexto
+def cubo(a, digitos):
+    """Eleva um número ao cubo"""
+    return a * a * a
+
+
+@_com_contexto
+def inverso(a, digitos):
+    """Calcula o inverso de um número"""
+    _validar(a != 0, "Erro: Divisão por zero não é permitida!")
+    return 1 / a
+
+
+@_com_contexto
+def seno(angulo_graus, digitos):
+    """Calcula o seno de um ângulo em graus"""
+    return _seno_graus(angulo_graus, digitos)
+
+
+@_com_contexto
+def cosseno(angulo_graus, digitos):
+    """Calcula o cosseno de um ângulo em graus"""
+    return _seno_graus(angulo_graus, digitos, 90)
+
+
+@_com_contexto
+def tangente(angulo_graus, digitos):
+    """Calcula a tangente de um ângulo em graus"""
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        cos = _seno_graus(angulo_graus, digitos, 90)
+        _validar(cos != 0, "Erro: Tangente não é definida para este ângulo!")
+        return _seno_graus(angulo_graus, digitos) / cos
+
+
+def _em_graus(radianos, digitos):
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        return radianos * 180 / pi(c.prec)
+
+
+@_com_contexto
+def seno_rad(angulo_radianos, digitos):
+    """Calcula o seno de um ângulo em radianos"""
+    return _seno_graus(_em_graus(angulo_radianos, digitos), digitos)
+
+
+@_com_contexto
+def cosseno_rad(angulo_radianos, digitos):
+    """Calcula o cosseno de um ângulo em radianos"""
+    return _seno_graus(_em_graus(angulo_radianos, digitos), digitos, 90)
+
+
+@_com_contexto
+def tangente_rad(angulo_radianos, digitos):
+    """Calcula a tangente de um ângulo em radianos"""
+    graus = _em_graus(angulo_radianos, digitos)
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        return _seno_graus(graus, digitos) / _seno_graus(graus, digitos, 90)
+
+
+def _em_graus_de_grados(grados):
+    """Converte grados em graus (× 0.9) sem arredondar"""
+    with localcontext() as c:
+        c.prec = len(grados.as_tuple().digits) + 2
+        return grados * 9 / 10
+
+
+@_com_contexto
+def seno_grad(angulo_grados, digitos):
+    """Calcula o seno de um ângulo em grados"""
+    return _seno_graus(_em_graus_de_grados(angulo_grados), digitos)
+
+
+@_com_contexto
+def cosseno_grad(angulo_grados, digitos):
+    """Calcula o cosseno de um ângulo em grados"""
+    return _seno_graus(_em_graus_de_grados(angulo_grados), digitos, 90)
+
+
+@_com_contexto
+def tangente_grad(angulo_grados, digitos):
+    """Calcula a tangente de um ângulo em grados"""
+    graus = _em_graus_de_grados(angulo_grados)
+    with localcontext() as c:
+        c.prec = digitos + _GUARDA
+        cos = _seno_graus(graus, digitos, 90)
+        _validar(cos != 0, "Erro: Tangente não é definida para este ângulo!")
+        return _seno_graus(graus, digitos) / cos
+
+
+@_com_contexto
+def constante_e(digitos):
+    """Devolve a constante e na precisão atual"""
+    return e(digitos)
+
+
+@_com_contexto
+def constante_pi(digitos):
+    """Devolve π na precisão atual"""
+    return pi(digitos)
+
+
+@_com_contexto
+def raiz_cubica(a, digitos):
+    """Calcula a raiz cúbica de um número (real também para negativos)"""
+    return raiz_n_esima(a, Decimal(3), contexto=decimal.getcontext())
+
+
+# Nome no registro de operações -> versão decimal
+OPERACOES = {
+    funcao.__name__: funcao
+    for funcao in (
+        adicao, subtracao, multiplicacao, divisao, potencia, raiz_quadrada, raiz_n_esima, raiz_cubica,
+        resto_divisao, divisao_inteira, fatorial, logaritmo, logaritmo_natural,
+        logaritmo_decimal, exponencial, potencia_de_dez, quadrado, cubo, inverso,
+        seno, cosseno, tangente, seno_rad, cosseno_rad, tangente_rad,
+        seno_grad, cosseno_grad, tangente_grad,
+        constante_e, constante_pi,
+    )
+}
+
+
+def executar(chave, *args, contexto=None):
+    """Executa uma operação do registro (nome ou símbolo) em Decimal"""
+    nome = operacoes.obter(chave).nome
+    funcao = OPERACOES.get(nome)
+    if funcao is None:
+        raise ValueError(f"Erro: Operação não disponível no modo de precisão: {nome}")
+    return funcao(*args, contexto=contexto)
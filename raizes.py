@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Raízes n-ésimas da calculadora
+Subsistema único usado pela CLI, pela interface Streamlit, pelas expressões
+e pela versão vetorizada
+
+``a ** (1 / n)`` erra de três formas: 1/n já é arredondado, então
+1000 ** (1/3) dá 9.999999999999998; com base negativa o resultado é um
+número complexo, e não a raiz real de índice ímpar; e inteiros maiores que
+um float nem podem ser convertidos. Aqui:
+
+- ``raiz_inteira``: parte inteira exata da raiz de um int de qualquer
+  tamanho, pelo método de Newton em inteiros
+- ``raiz_exata``: a raiz inteira quando o número é uma potência perfeita,
+  ou None
+- ``raiz_real``: raiz real corretamente arredondada (o float mais próximo
+  da raiz exata) para índices inteiros, inclusive raízes ímpares de
+  negativos e índices negativos; potências perfeitas dão o valor exato
+
+A versão vetorizada, sobre arrays NumPy, está em calculadora_vetorial.py.
+"""
+
+import math
+
+# Bits calculados da raiz antes do arredondamento para float (53 + guarda)
+_BITS_RAIZ = 66
+
+# Acima deste índice a raiz exata pede inteiros grandes demais (n × 66 bits);
+# a raiz vem de ** e pode errar no último bit
+LIMITE_INDICE_EXATO = 4096
+
+
+def _newton(a, n, x):
+    """Parte inteira da raiz de a > 0, partindo da estimativa x > 0"""
+    # Um passo a partir de qualquer x > 0 cai acima da raiz; daí em diante a
+    # sequência decresce até a parte inteira
+    m = n - 1
+    x = (m * x + a // x ** m) // n
+    # Com a estimativa em float um passo já chega à raiz ou a raiz + 1
+    if x ** n <= a:
+        return x
+    if (x - 1) ** n <= a:
+        return x - 1
+    while True:
+        y = (m * x + a // x ** m) // n
+        if y >= x:
+            return x
+        x = y
+
+
+def raiz_inteira(a, n):
+    """Parte inteira da raiz n-ésima de um inteiro (truncada em direção a zero)"""
+    if n < 1:
+        raise ValueError("Erro: Índice da raiz inteira deve ser positivo!")
+    if a < 0:
+        if n % 2 == 0:
+            raise ValueError("Erro: Não é possível calcular raiz par de número negativo!")
+        return -raiz_inteira(-a, n)
+    if n == 1 or a < 2:
+        return a
+    if n == 2:
+        return math.isqrt(a)
+    if a.bit_length() <= n:
+        # 1 ≤ raiz < 2
+        return 1
+    # Estimativa em float a partir dos bits mais altos; o resto vem de Newton
+    deslocamento = max(0, a.bit_length() // n - 52)
+    estimativa = int(2.0 ** (math.log2(a >> (deslocamento * n)) / n)) + 1
+    return _newton(a, n, estimativa << deslocamento)
+
+
+def raiz_exata(a, n):
+    """Raiz n-ésima inteira de a se a for uma potência perfeita, senão None"""
+    if a < 0 and n % 2 == 0:
+        return None
+    # Uma potência n-ésima tem múltiplo de n zeros no fim
+    zeros = (a & -a).bit_length() - 1 if a else 0
+    if zeros % n:
+        return None
+    raiz = raiz_inteira(a, n)
+    return raiz if raiz ** n == a else None
+
+
+def _raiz_racional(p, q, n):
+    """Raiz n-ésima de p/q > 0 (inteiros) arredondada para o float mais próximo"""
+    # Com s bits depois da vírgula a raiz tem ~66 bits: R = floor(raiz × 2^s)
+    s = _BITS_RAIZ - (p.bit_length() - q.bit_length()) // n
+    if s >= 0:
+        numerador, denominador = p << (n * s), q
+    else:
+        numerador, denominador = p, q << (-n * s)
+    raiz = raiz_inteira(numerador // denominador, n)
+    if raiz ** n * denominador != numerador:
+        # Bit "grudento": a raiz não é exata, então fica acima de R; como R
+        # tem bits além dos 53 do float, marcar o último desempata certo
+        raiz |= 1
+    try:
+        return math.ldexp(float(raiz), -s)
+    except OverflowError:
+        return math.inf
+
+
+def _indice(n):
+    """Índice inteiro (também de floats como 3.0), ou None"""
+    if isinstance(n, int):
+        return n
+    if isinstance(n, float) and n.is_integer():
+        return int(n)
+    return None
+
+
+def raiz_real(a, n):
+    """Raiz real n-ésima de a, corretamente arredondada para índices inteiros"""
+    k = _indice(n)
+    if k is None:
+        # Índice fracionário: a raiz é a ** (1/n), definida só para a ≥ 0
+        if a < 0:
+            raise ValueError("Erro: Raiz de número negativo resulta em número complexo!")
+        return float(a) ** (1 / n)
+    if k == 0:
+        raise ValueError("Erro: Índice da raiz não pode ser zero!")
+    if a < 0 and k % 2 == 0:
+        raise ValueError("Erro: Não é possível calcular raiz par de número negativo!")
+    if a == 0:
+        if k < 0:
+            raise ValueError("Erro: Zero não pode ser elevado a expoente negativo!")
+        return 0.0
+    negativo = a < 0
+    modulo = -a if negativo else a
+    if isinstance(modulo, float) and not math.isfinite(modulo):
+        # Infinito ou NaN
+        raiz = modulo if k > 0 else 0.0
+    elif abs(k) > LIMITE_INDICE_EXATO:
+        raiz = float(modulo) ** (1 / k)
+    else:
+        p, q = modulo.as_integer_ratio()
+        if k < 0:
+            p, q, k = q, p, -k
+        if q == 1 and p.bit_length() < 1024:
+            # Caminho rápido: potência perfeita de um inteiro (27, 1000, 1024...)
+            candidata = round(float(p) ** (1 / k))
+            if candidata ** k == p:
+                return float(-candidata if negativo else candidata)
+        raiz = _raiz_racional(p, q, k)
+    return -raiz if negativo else raiz
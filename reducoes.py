@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reduções n-árias da calculadora
+Soma, produto e produto escalar de sequências inteiras, em uma chamada, no
+lugar de encadear ``adicao`` e ``multiplicacao`` elemento a elemento
+
+- ``soma``: ``"exata"`` (padrão) usa ``math.fsum``, que dá a soma
+  corretamente arredondada, qualquer que seja a ordem ou o cancelamento;
+  ``"pareada"`` soma em árvore, com erro da ordem de ε·log₂(n) em vez do
+  ε·n da soma encadeada, na velocidade da soma simples;
+- ``produto``: acumula as mantissas e, à parte, os expoentes binários
+  (espaço log₂), então os produtos parciais nunca transbordam nem viram
+  zero no meio do caminho (1e200 × 1e200 × 1e-300 dá 1e100); um resultado
+  acima do maior float sai como Decimal aproximado, como em custo.py;
+- ``produto_escalar``: soma corretamente arredondada dos produtos.
+
+Os valores podem vir de listas, arrays NumPy (lidos em blocos, sem cópia
+inteira), ``array.array`` ou qualquer iterador, inclusive um fluxo lido de
+arquivo, consumido uma única vez e com memória constante:
+
+    >>> soma([0.1] * 10)
+    1.0
+    >>> produto([1e200, 1e200, 1e-300])
+    1e+100
+    >>> produto_escalar([1e16, 1.0, -1e16], [1.0, 1.0, 1.0])
+    1.0
+    >>> import io, estatisticas
+    >>> soma(estatisticas.ler_numeros(io.StringIO("0.1\\n0.2\\n0.3\\n")))
+    0.6
+
+Os valores são tratados como float, como no menu da calculadora.
+"""
+
+import array
+import decimal
+import itertools
+import math
+import operator
+from collections.abc import Sequence
+from decimal import Decimal, localcontext
+
+import custo
+
+METODOS_SOMA = ("exata", "pareada")
+
+# Elementos lidos por vez de um array NumPy (e, no produto, de qualquer fonte)
+TAMANHO_BLOCO = 4096
+# Folhas da soma pareada: blocos somados em sequência antes de entrar na árvore
+BLOCO_PAREADO = 128
+# Fatores multiplicados entre as normalizações da mantissa no produto: com
+# mantissas em [0.5, 1), 1000 fatores não chegam ao menor float (2^-1022)
+BLOCO_PRODUTO = 1000
+
+_ERRO_VALORES = "Erro: Os valores devem ser números!"
+_ERRO_GRANDE = "Erro: Valor grande demais para um float!"
+
+
+def _e_array(valores):
+    return type(valores).__module__ == "numpy" and hasattr(valores, "ravel")
+
+
+def _blocos(valores, tamanho):
+    """Blocos de até ``tamanho`` valores, sem copiar a entrada inteira
+
+    Sequências e arrays são fatiados; iteradores são lidos aos poucos.
+    """
+    if _e_array(valores):
+        plano = valores.ravel()
+        return (plano[inicio:inicio + tamanho].tolist() for inicio in range(0, plano.size, tamanho))
+    if isinstance(valores, (Sequence, array.array)):
+        return (valores[inicio:inicio + tamanho] for inicio in range(0, len(valores), tamanho))
+    iterador = iter(valores)
+    return iter(lambda: list(itertools.islice(iterador, tamanho)), [])
+
+
+def _blocos_array(valores):
+    """Floats de um array NumPy, convertidos bloco a bloco"""
+    return itertools.chain.from_iterable(_blocos(valores, TAMANHO_BLOCO))
+
+
+def _fsum(valores):
+    """``math.fsum`` com os erros da calculadora"""
+    try:
+        return math.fsum(valores)
+    except TypeError:
+        raise ValueError(_ERRO_VALORES) from None
+    except OverflowError as e:
+        if "intermediate" in str(e):
+            raise ValueError("Erro: A soma não cabe em um float!") from None
+        raise ValueError(_ERRO_GRANDE) from None
+    except ValueError as e:
+        if "fsum" not in str(e):
+            raise
+        # -inf + inf: NaN, como na soma encadeada
+        return math.nan
+
+
+def _soma_pareada(valores):
+    """Soma em árvore de um fluxo, com uma pilha de O(log n) somas parciais
+
+    Cada folha é um bloco de ``BLOCO_PAREADO`` valores; duas somas do mesmo
+    nível viram uma do nível seguinte, como nos bits de um contador.
+    """
+    pilha = []
+    for bloco in _blocos(valores, BLOCO_PAREADO):
+        parcial = sum(bloco, 0.0)
+        nivel = 0
+        while pilha and pilha[-1][0] == nivel:
+            parcial += pilha.pop()[1]
+            nivel += 1
+        pilha.append((nivel, parcial))
+    total = 0.0
+    # As menores somas (do topo da pilha) primeiro
+    for _, parcial in reversed(pilha):
+        total += parcial
+    return total
+
+
+def soma(valores, metodo="exata"):
+    """Soma de todos os valores, em uma passada
+
+    ``metodo`` é ``"exata"`` (corretamente arredondada) ou ``"pareada"``
+    (soma em árvore, mais rápida; em arrays NumPy é a soma do próprio NumPy).
+    """
+    if metodo not in METODOS_SOMA:
+        raise ValueError(f"Erro: Método de soma desconhecido: {metodo!r}")
+    if metodo == "exata":
+        return _fsum(_blocos_array(valores) if _e_array(valores) else valores)
+    if _e_array(valores):
+        return float(valores.sum(dtype="float64"))
+    try:
+        return _soma_pareada(valores)
+    except TypeError:
+        raise ValueError(_ERRO_VALORES) from None
+    except OverflowError:
+        raise ValueError(_ERRO_GRANDE) from None
+
+
+def _aproximado(mantissa, expoente):
+    """mantissa × 2^expoente como Decimal, fora do alcance de um float"""
+    with localcontext() as c:
+        c.prec = custo.DIGITOS_APROXIMACAO
+        c.Emax, c.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+        return Decimal(mantissa) * Decimal(2) ** expoente
+
+
+def produto(valores):
+    """Produto de todos os valores, sem transbordamento nos produtos parciais
+
+    A mantissa acumulada é normalizada a cada bloco (``math.frexp``) e o
+    expoente binário é somado à parte, como inteiro. O erro é o mesmo da
+    multiplicação encadeada, sem os infinitos e zeros intermediários.
+    """
+    frexp = math.frexp
+    mantissa, expoente = 1.0, 0
+    try:
+        for bloco in _blocos(valores, BLOCO_PRODUTO):
+            for m, e in map(frexp, bloco):
+                mantissa *= m
+                expoente += e
+            mantissa, e = frexp(mantissa)
+            expoente += e
+    except TypeError:
+        raise ValueError(_ERRO_VALORES) from None
+    except OverflowError:
+        raise ValueError(_ERRO_GRANDE) from None
+    if not mantissa or not math.isfinite(mantissa):
+        # Zero, infinito ou NaN: o expoente não muda o resultado
+        return mantissa
+    try:
+        return math.ldexp(mantissa, expoente)
+    except OverflowError:
+        return _aproximado(mantissa, expoente)
+
+
+def produto_escalar(a, b):
+    """Soma dos produtos a[i]·b[i], corretamente arredondada
+
+    Cada produto é arredondado uma vez e a soma não acumula erro: o erro
+    fica abaixo de ε·Σ|a[i]·b[i]|, sem o fator n da soma encadeada.
+    """
+    if _e_array(a) and _e_array(b):
+        if a.size != b.size:
+            raise ValueError(f"Erro: Os vetores têm tamanhos diferentes: {a.size} e {b.size}!")
+        a, b = a.ravel(), b.ravel()
+        produtos = itertools.chain.from_iterable(
+            (a[inicio:inicio + TAMANHO_BLOCO] * b[inicio:inicio + TAMANHO_BLOCO]).tolist()
+            for inicio in range(0, a.size, TAMANHO_BLOCO))
+    else:
+        fontes = [_blocos_array(x) if _e_array(x) else x for x in (a, b)]
+        produtos = itertools.starmap(operator.mul, zip(*fontes, strict=True))
+    try:
+        return _fsum(produtos)
+    except ValueError as e:
+        if "zip()" not in str(e):
+            raise
+        raise ValueError("Erro: Os vetores têm tamanhos diferentes!") from None
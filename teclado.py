@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Máquina de estados do teclado da calculadora
+O estado da calculadora de botões (display, valor anterior, operação
+pendente, memória, modo de ângulo e precisão) e a transição de cada tecla,
+sem depender do Streamlit
+
+``Estado.aplicar(tecla)`` é pura: devolve um novo estado e não altera o
+atual. As teclas são os rótulos dos botões da interface ("7", "+", "x^y",
+"sin", "M+", "⌫", "DRG"...) e ``tecla_precisao(digitos)`` troca o modo de
+precisão. O cálculo feito pela tecla, se houve, fica em ``calculo``, para
+quem quiser guardar o histórico.
+
+    >>> estado = reproduzir(["1", "2", "+", "3", "="])
+    >>> estado.display
+    '15.0'
+    >>> estado.calculo
+    ('+', (12.0, 3.0), 15.0)
+
+``reproduzir`` passa um registro de teclas inteiro por um único estado, sem
+criar um objeto por tecla: dígitos, memória e edição do display passam a
+milhões de teclas por segundo, e cada cálculo custa o da própria operação.
+Serve para reproduzir um relato de erro a partir das teclas digitadas e
+para testar a máquina com sequências aleatórias (``aleatorias``):
+
+    python teclado.py teclas.txt --passos
+    python teclado.py --aleatorias 100000 --semente 7
+
+Cada estado ocupa um objeto com ``__slots__``, pequeno o bastante para
+milhares de sessões simultâneas.
+"""
+
+import random
+import time
+
+import motor
+
+# Dígitos do display, sem contar o ponto e o sinal
+DIGITOS_DISPLAY = 12
+
+# Rótulo do botão -> chave da operação binária
+OPERACOES_BINARIAS = {"+": "+", "-": "-", "×": "×", "÷": "÷", "x^y": "^", "^": "^"}
+
+# Funções científicas, aplicadas ao valor do display
+FUNCOES = ("sin", "cos", "tan", "ln", "log", "√", "∛", "n!", "x²", "x³", "1/x", "e^x", "10^x", "π", "e")
+
+_PREFIXO_PRECISAO = "prec:"
+
+
+def tecla_precisao(digitos):
+    """Tecla que troca o modo de precisão (0 volta ao float) e limpa o display"""
+    return f"{_PREFIXO_PRECISAO}{digitos}"
+
+
+def _mensagem(e):
+    mensagem = str(e)
+    return mensagem if mensagem.startswith("Erro") else f"Erro: {mensagem}"
+
+
+class Estado:
+    """Estado da calculadora de botões
+
+    ``calculo`` é ``(chave, argumentos, resultado)`` do cálculo feito pela
+    última tecla, ou None; ``erro`` é a mensagem do erro causado por ela.
+    """
+
+    __slots__ = ("display", "anterior", "operacao", "aguardando", "memoria",
+                 "modo_angulo", "digitos", "erro", "calculo")
+
+    def __init__(self, display="0", anterior=None, operacao=None, aguardando=False,
+                 memoria=0, modo_angulo="DEG", digitos=0, erro=None, calculo=None):
+        self.display = display
+        self.anterior = anterior
+        self.operacao = operacao
+        self.aguardando = aguardando
+        self.memoria = memoria
+        self.modo_angulo = modo_angulo
+        self.digitos = digitos
+        self.erro = erro
+        self.calculo = calculo
+
+    def copiar(self):
+        """Cópia independente do estado"""
+        novo = Estado.__new__(Estado)
+        novo.display = self.display
+        novo.anterior = self.anterior
+        novo.operacao = self.operacao
+        novo.aguardando = self.aguardando
+        novo.memoria = self.memoria
+        novo.modo_angulo = self.modo_angulo
+        novo.digitos = self.digitos
+        novo.erro = self.erro
+        novo.calculo = self.calculo
+        return novo
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Estado):
+            return NotImplemented
+        return all(getattr(self, nome) == getattr(outro, nome) for nome in Estado.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        campos = ", ".join(f"{nome}={getattr(self, nome)!r}" for nome in Estado.__slots__)
+        return f"Estado({campos})"
+
+    def aplicar(self, tecla):
+        """Novo estado depois da tecla; o estado atual não muda"""
+        novo = self.copiar()
+        novo._teclar(tecla)
+        return novo
+
+    # Transições: alteram o próprio estado e só são chamadas em cópias
+
+    def _teclar(self, tecla):
+        self.erro = None
+        self.calculo = None
+        acao = _ACOES.get(tecla)
+        if acao is not None:
+            acao[0](self, acao[1])
+        elif isinstance(tecla, str) and tecla.startswith(_PREFIXO_PRECISAO):
+            self._precisao(tecla[len(_PREFIXO_PRECISAO):])
+        else:
+            raise ValueError(f"Erro: Tecla desconhecida: {tecla!r}")
+
+    def _ler(self):
+        return motor.ler_numero(self.display, self.digitos)
+
+    def _formatar(self, valor):
+        return motor.formatar_display(valor, self.digitos)
+
+    def _falhar(self, e):
+        self.display = "Error"
+        self.erro = _mensagem(e)
+
+    def _digitar(self, digito):
+        if self.aguardando:
+            self.display = digito
+            self.aguardando = False
+        else:
+            novo = digito if self.display == "0" else self.display + digito
+            if len(novo.replace(".", "").replace("-", "")) <= DIGITOS_DISPLAY:
+                self.display = novo
+
+    def _ponto(self, _):
+        if "." not in self.display:
+            self._digitar(".")
+
+    def _operacao(self, chave):
+        try:
+            valor = self._ler()
+            if self.anterior is None:
+                self.anterior = valor
+            elif self.operacao:
+                atual = self.anterior or 0
+                resultado = motor.calcular(atual, valor, self.operacao, self.digitos)
+                self.display = self._formatar(resultado)
+                self.anterior = resultado
+                self.calculo = (self.operacao, (atual, valor), resultado)
+            self.aguardando = True
+            self.operacao = chave
+        except Exception as e:
+            self._falhar(e)
+
+    def _igual(self, _):
+        try:
+            valor = self._ler()
+            if self.anterior is not None and self.operacao:
+                resultado = motor.calcular(self.anterior, valor, self.operacao, self.digitos)
+                self.display = self._formatar(resultado)
+                self.calculo = (self.operacao, (self.anterior, valor), resultado)
+                self.anterior = None
+                self.operacao = None
+                self.aguardando = True
+        except Exception as e:
+            self._falhar(e)
+
+    def _funcao(self, chave):
+        try:
+            operacao, argumentos, resultado = motor.funcao_cientifica(
+                chave, self._ler(), self.modo_angulo, self.digitos)
+            self.display = self._formatar(resultado)
+            self.calculo = (operacao.nome, argumentos, resultado)
+            self.aguardando = True
+        except Exception as e:
+            self._falhar(e)
+
+    def _limpar(self, _):
+        self.display = "0"
+        self.anterior = None
+        self.operacao = None
+        self.aguardando = False
+
+    def _apagar(self, _):
+        self.display = self.display[:-1] if len(self.display) > 1 else "0"
+
+    def _trocar_sinal(self, _):
+        try:
+            self.display = self._formatar(self._ler() * -1)
+        except ValueError:
+            pass
+
+    def _porcento(self, _):
+        try:
+            self.display = self._formatar(self._ler() / 100)
+        except ValueError:
+            pass
+
+    def _modo_angulo(self, _):
+        self.modo_angulo = motor.PROXIMO_MODO[self.modo_angulo]
+
+    def _memoria_limpar(self, _):
+        self.memoria = 0
+
+    def _memoria_ler(self, _):
+        self.display = self._formatar(self.memoria)
+        self.aguardando = True
+
+    def _memoria_somar(self, sinal):
+        try:
+            self.memoria += sinal * float(self.display)
+        except ValueError as e:
+            self.erro = _mensagem(e)
+
+    def _precisao(self, texto):
+        try:
+            digitos = int(texto)
+        except ValueError:
+            raise ValueError(f"Erro: Precisão inválida: {texto!r}") from None
+        self.digitos = digitos
+        self._limpar(None)
+
+
+# Tecla -> (transição, argumento)
+_ACOES = {
+    **{digito: (Estado._digitar, digito) for digito in "0123456789"},
+    **{rotulo: (Estado._operacao, chave) for rotulo, chave in OPERACOES_BINARIAS.items()},
+    **{funcao: (Estado._funcao, funcao) for funcao in FUNCOES},
+    ".": (Estado._ponto, None),
+    "=": (Estado._igual, None),
+    "C": (Estado._limpar, None),
+    "⌫": (Estado._apagar, None),
+    "±": (Estado._trocar_sinal, None),
+    "%": (Estado._porcento, None),
+    "DRG": (Estado._modo_angulo, None),
+    "MC": (Estado._memoria_limpar, None),
+    "MR": (Estado._memoria_ler, None),
+    "M+": (Estado._memoria_somar, 1),
+    "M-": (Estado._memoria_somar, -1),
+}
+
+# Todas as teclas, exceto as de precisão
+TECLAS = tuple(_ACOES)
+
+
+def reproduzir(teclas, estado=None, calculos=None):
+    """Aplica as teclas em ordem e devolve o estado final
+
+    O estado dado não é alterado. Com uma lista em ``calculos``, cada
+    cálculo feito é acrescentado a ela, na ordem.
+    """
+    estado = Estado() if estado is None else estado.copiar()
+    acoes = _ACOES
+    teclar = estado._teclar
+    if calculos is None:
+        for tecla in teclas:
+            # Caminho rápido das teclas conhecidas, o mesmo de _teclar
+            acao = acoes.get(tecla)
+            if acao is None:
+                teclar(tecla)
+                continue
+            estado.erro = None
+            estado.calculo = None
+            acao[0](estado, acao[1])
+    else:
+        for tecla in teclas:
+            teclar(tecla)
+            if estado.calculo is not None:
+                calculos.append(estado.calculo)
+    return estado
+
+
+def passos(teclas, estado=None):
+    """Gera (tecla, estado) depois de cada tecla, cada estado um objeto novo"""
+    estado = Estado() if estado is None else estado
+    for tecla in teclas:
+        estado = estado.aplicar(tecla)
+        yield tecla, estado
+
+
+def aleatorias(quantidade, semente=None, teclas=TECLAS):
+    """Lista de teclas aleatórias, reprodutível pela ``semente``"""
+    return random.Random(semente).choices(teclas, k=quantidade)
+
+
+def ler_teclas(linhas):
+    """Teclas de um registro em texto, separadas por espaços ou linhas
+
+    Linhas vazias e comentários (#) são ignorados.
+    """
+    for linha in linhas:
+        linha = linha.strip()
+        if linha and not linha.startswith("#"):
+            yield from linha.split()
+
+
+def main(argv=None):
+    """Reproduz um registro de teclas ou uma sequência aleatória"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Reproduz teclas na máquina de estados da calculadora")
+    parser.add_argument("arquivo", nargs="?", help="registro de teclas ('-' lê a entrada padrão)")
+    parser.add_argument("--aleatorias", type=int, metavar="N", help="gera N teclas aleatórias")
+    parser.add_argument("--semente", type=int, help="semente das teclas aleatórias")
+    parser.add_argument("--passos", action="store_true", help="mostra o display depois de cada tecla")
+    args = parser.parse_args(argv)
+
+    if args.aleatorias is not None:
+        semente = random.randrange(1 << 32) if args.semente is None else args.semente
+        teclas = aleatorias(args.aleatorias, semente)
+        print(f"semente: {semente}", file=sys.stderr)
+    elif args.arquivo:
+        try:
+            if args.arquivo == "-":
+                teclas = list(ler_teclas(sys.stdin))
+            else:
+                with open(args.arquivo, encoding="utf-8") as arquivo:
+                    teclas = list(ler_teclas(arquivo))
+        except OSError as e:
+            parser.exit(1, f"{e}\n")
+    else:
+        parser.error("informe um arquivo de teclas ou --aleatorias N")
+
+    inicio = time.perf_counter()
+    try:
+        if args.passos:
+            estado = Estado()
+            for numero, (tecla, estado) in enumerate(passos(teclas), 1):
+                print(f"{numero:>6}  {tecla:<5} {estado.display}"
+                      + (f"  ({estado.erro})" if estado.erro else ""))
+        else:
+            estado = reproduzir(teclas)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    segundos = time.perf_counter() - inicio
+    print(repr(estado))
+    print(f"{len(teclas)} teclas em {segundos:.3f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
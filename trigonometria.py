@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trigonometria exata em graus da calculadora
+Seno, cosseno e tangente em graus (DEG), radianos (RAD) e grados (GRAD)
+
+Converter graus em radianos antes de chamar ``math.sin`` introduz o erro de
+π/180 no argumento: sen(180°) dá 1.22e-16 e tan(90°) dá 1.6e16. Aqui o
+ângulo é reduzido na própria unidade, onde a redução é exata:
+
+1. o sinal é separado (seno e tangente são ímpares, cosseno é par);
+2. ``math.fmod`` reduz o ângulo a uma volta (360° ou 400 grad) sem erro;
+3. o resto da divisão por um quarto de volta dá o quadrante e o ângulo
+   dentro dele, também sem erro;
+4. ângulos acima de meio quarto (45°) viram a cofunção do complemento, de
+   modo que só ângulos de 0° a 45° chegam a ``math.sin``/``math.cos``.
+
+Ângulos inteiros (o caso comum na calculadora) são lidos direto de tabelas
+pré-calculadas da volta inteira, com um único resto de divisão; as tabelas
+têm os valores exatos nos ângulos notáveis: sen(30°) é 0.5, cos(90°) é 0,
+tan(45°) é 1 e tan(90°) é um erro. Em radianos não há
+redução exata possível (π não é representável), então RAD usa ``math``
+diretamente.
+
+A versão vetorizada, sobre arrays NumPy, está em calculadora_vetorial.py e
+usa as mesmas tabelas.
+"""
+
+import math
+
+UNIDADES = ("DEG", "RAD", "GRAD")
+
+# Quarto de volta em cada unidade com redução exata
+QUARTO_DE_VOLTA = {"DEG": 90, "GRAD": 100}
+
+
+def _tabela_seno(quarto):
+    """Seno dos ângulos inteiros de 0 a um quarto de volta, na unidade dada"""
+    radianos = math.pi / (2 * quarto)
+    # Cada valor vem do ângulo mais próximo de 0 (seno ou cosseno do complemento)
+    tabela = [
+        math.sin(k * radianos) if 2 * k <= quarto else math.cos((quarto - k) * radianos)
+        for k in range(quarto + 1)
+    ]
+    tabela[0] = 0.0
+    tabela[quarto] = 1.0
+    if quarto % 2 == 0:
+        tabela[quarto // 2] = math.sqrt(0.5)
+    if quarto % 3 == 0:
+        tabela[quarto // 3] = 0.5
+        tabela[2 * quarto // 3] = math.sqrt(3) / 2
+    return tuple(tabela)
+
+
+# Unidade -> seno de 0, 1, ..., um quarto de volta
+TABELAS_SENO = {unidade: _tabela_seno(quarto) for unidade, quarto in QUARTO_DE_VOLTA.items()}
+
+ERRO_TANGENTE = "Erro: Tangente não é definida para este ângulo!"
+
+
+def _tabelas_volta(unidade):
+    """Seno, cosseno e tangente dos ângulos inteiros de uma volta inteira
+
+    A tangente é None onde não é definida.
+    """
+    quadrante = TABELAS_SENO[unidade]
+    quarto = len(quadrante) - 1
+    # sen(90° + r) = sen(90° - r) e sen(180° + r) = -sen(r); "0.0 - s" evita -0.0
+    meia_volta = quadrante[:-1] + quadrante[:0:-1]
+    senos = meia_volta + tuple(0.0 - s for s in meia_volta)
+    # cos(x) = sen(x + 90°)
+    cossenos = senos[quarto:] + senos[:quarto]
+    tangentes = tuple(s / c + 0.0 if c else None for s, c in zip(senos, cossenos))
+    return senos, cossenos, tangentes
+
+
+def _verificar_unidade(unidade):
+    if unidade not in UNIDADES:
+        raise ValueError(f"Erro: Unidade de ângulo desconhecida: {unidade!r}")
+
+
+def reduzir(angulo, unidade="DEG"):
+    """Reduz um ângulo ao primeiro quadrante, sem erro de arredondamento
+
+    Devolve ``(negativo, quadrante, resto)``: o ângulo é
+    ±(quadrante × quarto de volta + resto), com quadrante de 0 a 3 e
+    0 ≤ resto < quarto de volta.
+    """
+    quarto = QUARTO_DE_VOLTA[unidade]
+    negativo = angulo < 0
+    if negativo:
+        angulo = -angulo
+    if isinstance(angulo, int):
+        quadrante, resto = divmod(angulo % (4 * quarto), quarto)
+        return negativo, quadrante, resto
+    if angulo != angulo:
+        # NaN se propaga até o resultado
+        return negativo, 0, angulo
+    if angulo == math.inf:
+        raise ValueError("Erro: Funções trigonométricas não são definidas para ângulo infinito!")
+    volta = math.fmod(angulo, 4 * quarto)
+    resto = math.fmod(volta, quarto)
+    # volta - resto é um múltiplo exato do quarto de volta
+    return negativo, int((volta - resto) / quarto), resto
+
+
+def _seno_cosseno_quadrante(resto, unidade):
+    """Seno e cosseno de um ângulo do primeiro quadrante"""
+    tabela = TABELAS_SENO[unidade]
+    quarto = len(tabela) - 1
+    if resto.__class__ is int or resto.is_integer():
+        indice = int(resto)
+        return tabela[indice], tabela[quarto - indice]
+    if 2 * resto <= quarto:
+        radianos = resto * (math.pi / (2 * quarto))
+        return math.sin(radianos), math.cos(radianos)
+    # Acima de meio quarto, usa o complemento (a subtração é exata)
+    radianos = (quarto - resto) * (math.pi / (2 * quarto))
+    return math.cos(radianos), math.sin(radianos)
+
+
+def _seno_cosseno(angulo, unidade):
+    negativo, quadrante, resto = reduzir(angulo, unidade)
+    s, c = _seno_cosseno_quadrante(resto, unidade)
+    # sen e cos de (q × 90° + r) em cada quadrante; "0.0 - x" evita -0.0
+    if quadrante == 1:
+        s, c = c, 0.0 - s
+    elif quadrante == 2:
+        s, c = 0.0 - s, 0.0 - c
+    elif quadrante == 3:
+        s, c = 0.0 - c, s
+    if negativo:
+        s = 0.0 - s
+    return s, c
+
+
+# Unidade -> (senos, cossenos, tangentes) dos ângulos inteiros de uma volta
+TABELAS_VOLTA = {unidade: _tabelas_volta(unidade) for unidade in QUARTO_DE_VOLTA}
+
+
+def _indice_inteiro(angulo, volta):
+    """Posição do ângulo na tabela da volta, ou None se ele não for inteiro"""
+    if angulo.__class__ is int:
+        return angulo % volta
+    if angulo.__class__ is float and angulo.is_integer():
+        # O resto de um float inteiro por 360 é exato
+        return int(angulo % volta)
+    return None
+
+
+def _tabelas(unidade):
+    tabelas = TABELAS_VOLTA.get(unidade)
+    if tabelas is None:
+        _verificar_unidade(unidade)
+    return tabelas
+
+
+def seno(angulo, unidade="DEG"):
+    """Calcula o seno de um ângulo na unidade dada"""
+    if unidade == "RAD":
+        return math.sin(angulo)
+    senos = _tabelas(unidade)[0]
+    indice = _indice_inteiro(angulo, len(senos))
+    if indice is not None:
+        return senos[indice]
+    return _seno_cosseno(angulo, unidade)[0]
+
+
+def cosseno(angulo, unidade="DEG"):
+    """Calcula o cosseno de um ângulo na unidade dada"""
+    if unidade == "RAD":
+        return math.cos(angulo)
+    cossenos = _tabelas(unidade)[1]
+    indice = _indice_inteiro(angulo, len(cossenos))
+    if indice is not None:
+        return cossenos[indice]
+    return _seno_cosseno(angulo, unidade)[1]
+
+
+def tangente(angulo, unidade="DEG"):
+    """Calcula a tangente de um ângulo na unidade dada"""
+    if unidade == "RAD":
+        return math.tan(angulo)
+    tangentes = _tabelas(unidade)[2]
+    indice = _indice_inteiro(angulo, len(tangentes))
+    if indice is not None:
+        resultado = tangentes[indice]
+    else:
+        s, c = _seno_cosseno(angulo, unidade)
+        # Somar 0.0 troca -0.0 (ex.: 0 / -1 em 180°) por 0.0
+        resultado = s / c + 0.0 if c else None
+    if resultado is None:
+        raise ValueError(ERRO_TANGENTE)
+    return resultado